@@ -1,31 +1,181 @@
-from flask import Flask
-from flask_session import Session
+import click
+from flask import Flask, before_render_template, g, request, template_rendered
+from app.extensions import init_logging, init_sessions, init_data_manager, init_metrics, init_profiler, init_password_hasher, init_cache, init_face_engine, init_face_index, init_face_ann, init_photo_store, init_renditions, init_ingestion
+from config import APP_CONFIG, METRICS_CONFIG
+from logging_setup import new_request_id, request_id_var
+from rows import format_date
+from session_store import load_secret_key
 import os
 
-def create_app():
+def create_app(data_manager=None):
     """Factory function para criar a aplicação Flask"""
     app = Flask(__name__)
     
-    # Configurações básicas
-    app.config['SECRET_KEY'] = 'sua_chave_secreta_aqui'
-    app.config['SESSION_TYPE'] = 'filesystem'
-    app.config['PERMANENT_SESSION_LIFETIME'] = 1800  # 30 minutos
-    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    # Registros com nível, em texto ou JSON, escritos por uma thread à parte
+    init_logging(app)
+    
+    # Configurações básicas. A chave assina as sessões: sem PHOTOCAP_SECRET_KEY,
+    # uma chave aleatória é criada uma vez e compartilhada pelos workers do nó
+    app.config['SECRET_KEY'] = APP_CONFIG['SECRET_KEY'] or load_secret_key(os.path.join(app.instance_path, 'secret_key'))
+    app.config['MAX_CONTENT_LENGTH'] = APP_CONFIG['MAX_CONTENT_LENGTH']  # Formulários comuns
+    # O upload de fotos lê o corpo em streaming e aplica este limite a cada arquivo
+    app.config['MAX_FILE_SIZE'] = APP_CONFIG['MAX_FILE_SIZE']
+    for key in ('PHOTOS_PER_PAGE', 'EVENTS_PER_PAGE', 'RECENT_EVENTS', 'UPLOAD_EVENTS',
+                'FACE_SEARCH_EVENTS'):
+        app.config[key] = APP_CONFIG[key]
     
     # Configuração da pasta de uploads
     app.config['UPLOAD_FOLDER'] = 'uploads'
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
         os.makedirs(app.config['UPLOAD_FOLDER'])
     
-    # Inicializar extensões
-    Session(app)
+    # Fotos e versões podem ser entregues pelo servidor web (X-Sendfile ou
+    # X-Accel-Redirect do nginx), liberando o worker logo após os cabeçalhos
+    app.config['USE_X_SENDFILE'] = APP_CONFIG['USE_X_SENDFILE']
+    app.config['X_ACCEL_PREFIX'] = APP_CONFIG['X_ACCEL_PREFIX']
+    app.config['X_ACCEL_ROOT'] = os.path.abspath(APP_CONFIG['X_ACCEL_ROOT'] or app.config['UPLOAD_FOLDER'])
+    
+    # Sessões de login: cookie assinado (padrão, sem E/S por requisição),
+    # SQLite local ou Flask-Session em arquivos
+    init_sessions(app)
+    
+    # Gerenciador de dados único do processo, compartilhado pelos blueprints.
+    # A conexão é testada em segundo plano; o estado fica em /readyz.
+    # Bancos embutidos (SQLite) abrem em milissegundos e já criam o schema aqui
+    manager = init_data_manager(app, data_manager)
+    # Eventos e listas de fotos mudam só quando um fotógrafo cria um evento ou
+    # envia fotos: as leituras repetidas vêm do cache, invalidado nessas gravações
+    init_cache(app, manager)
+    # Latência por rota e consultas/tempo/linhas por método do DatabaseManager,
+    # em /metrics e no cabeçalho Server-Timing; perfil opcional das requisições lentas
+    metrics = init_metrics(app, manager)
+    profiler = init_profiler(app)
+    # PBKDF2 do login e do cadastro em um pool de processos com fila limitada
+    init_password_hasher(app, manager)
+    if manager.backend.embedded:
+        manager.test_connection()
+    else:
+        manager.check_connection_async()
+    
+    # Pipeline de reconhecimento facial (detecção + embeddings em CPU) e
+    # índice de embeddings por evento, compartilhado entre workers via mmap,
+    # além do índice aproximado usado na busca em todos os eventos
+    engine = init_face_engine(app)
+    store = init_face_index(app, manager, engine)
+    init_face_ann(app, manager, store)
+    
+    # Fotos armazenadas pelo hash do conteúdo, versões redimensionadas em cache
+    # e processamento de uploads em segundo plano
+    photo_store = init_photo_store(app, manager)
+    renditions = init_renditions(app, photo_store)
+    init_ingestion(app, manager, engine, photo_store, renditions)
+    
+    # As linhas trazem as datas do banco; os templates as formatam com {{ data|format_date }}
+    app.add_template_filter(format_date)
     
     # Registrar blueprints
-    from app.routes import auth, dashboard, events, search
+    from app.routes import auth, dashboard, events, search, health, photos
     
     app.register_blueprint(auth.bp)
     app.register_blueprint(dashboard.bp)
     app.register_blueprint(events.bp)
     app.register_blueprint(search.bp)
+    app.register_blueprint(health.bp)
+    app.register_blueprint(photos.bp)
+    
+    # ID de correlação da requisição: vem do proxy (X-Request-ID) ou é gerado,
+    # aparece em todos os registros feitos durante ela e volta na resposta
+    @app.before_request
+    def assign_request_id():
+        g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+        g.request_id_token = request_id_var.set(g.request_id)
+    
+    @app.after_request
+    def add_request_id_header(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+    
+    @app.teardown_request
+    def clear_request_id(exc=None):
+        token = g.pop('request_id_token', None)
+        if token is not None:
+            request_id_var.reset(token)
+    
+    @app.before_request
+    def start_request_timer():
+        if metrics is not None:
+            g.request_timer = metrics.start_request()
+        # No modo ASGI as corrotinas dividem a thread do loop: a amostragem por thread não as separa
+        if profiler is not None and not request.environ.get('photocap.async'):
+            g.profile = profiler.start()
+    
+    @app.after_request
+    def record_request_timing(response):
+        endpoint = request.endpoint or 'not_found'
+        timer = g.pop('request_timer', None)
+        if timer is not None:
+            if METRICS_CONFIG['server_timing']:
+                response.headers['Server-Timing'] = timer.server_timing()
+            metrics.finish_request(timer, endpoint, request.method, response.status_code)
+        if profiler is not None:
+            profiler.stop(g.pop('profile', None), endpoint, g.get('request_id', '-'))
+        return response
+    
+    if metrics is not None:
+        @before_render_template.connect_via(app)
+        def template_started(sender, **extra):
+            timer = g.get('request_timer')
+            if timer is not None:
+                timer.template_started()
+        
+        @template_rendered.connect_via(app)
+        def template_finished(sender, **extra):
+            timer = g.get('request_timer')
+            if timer is not None:
+                timer.template_finished()
+    
+    @app.cli.command('sweep-photos')
+    def sweep_photos():
+        """Remove do PhotoStore os arquivos que nenhuma foto usa"""
+        removed = photo_store.sweep(manager.get_referenced_hashes)
+        print(f"🧹 {removed} arquivo(s) sem referência removido(s)")
+    
+    @app.cli.command('claim-events')
+    @click.argument('username')
+    @click.option('--event', 'event_ids', type=int, multiple=True, help='Só estes eventos (padrão: todos sem dono)')
+    def claim_events(username, event_ids):
+        """Atribui ao fotógrafo os eventos sem dono (criados antes da coluna OwnerId)"""
+        assigned = manager.assign_event_owner(username, list(event_ids))
+        if assigned is None:
+            raise click.ClickException(f'{username} não é um fotógrafo cadastrado')
+        print(f"📌 {assigned} evento(s) atribuído(s) a {username}")
+    
+    @app.cli.command('reanalyze-faces')
+    def reanalyze_faces():
+        """Refaz a análise facial das fotos com embeddings de outro descritor (ex.: após trocar o modelo)"""
+        row_bytes = engine.dimension * 4
+        updated = 0
+        for event in manager.get_all_events():
+            stale = {analysis['PhotoId'] for analysis in manager.get_photo_analyses(event.EventId)
+                     if len(analysis['Embedding']) != row_bytes}
+            for photo_id in sorted(stale):
+                photo = manager.get_photo_by_id(photo_id)
+                if not photo:
+                    continue
+                if photo['ContentHash'] and photo_store.exists(photo['ContentHash']):
+                    with open(photo_store.path_for(photo['ContentHash']), 'rb') as handle:
+                        image = handle.read()
+                else:
+                    image = manager.get_photo_image(photo_id)
+                if image is None:
+                    continue
+                try:
+                    faces = engine.extract(image)
+                except ValueError:
+                    continue
+                if manager.replace_photo_faces(photo_id, event.EventId, faces):
+                    updated += 1
+        print(f"🔁 {updated} foto(s) reanalisada(s)")
     
     return app 
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""Versões assíncronas das rotas de leitura, atendidas pelo modo ASGI (asgi.py)
+
+Cada corrotina substitui a view do Flask com o mesmo endpoint e os mesmos
+templates: as consultas vão para o AsyncDatabaseManager e o loop de eventos
+fica livre enquanto o banco responde. As views de fotos não esperam pelo
+banco, e sim pelo disco: rodam como estão no pool de E/S, e o corpo
+do arquivo é enviado pelo loop, sem prender uma thread enquanto um cliente
+lento baixa a foto. As demais rotas continuam no Flask.
+"""
+import asyncio
+
+from flask import abort, current_app, flash, redirect, render_template, request, url_for
+from app.extensions import async_data_manager, async_io
+from app.routes import photos, search
+
+
+async def dashboard_index():
+    """Página inicial"""
+    recent_events = await async_data_manager.get_recent_events(current_app.config['RECENT_EVENTS'])
+    return render_template('dashboard/index.html', events=recent_events)
+
+
+async def search_index():
+    """Página de busca"""
+    event_name = request.args.get('event_name', '')
+    events = await async_data_manager.search_events(event_name) if event_name else []
+    return render_template('search/search.html', events=events, event_name=event_name)
+
+
+async def event_details(event_id):
+    """Detalhes do evento com a primeira página de fotos"""
+    # Evento, página e total em paralelo (cada um em uma conexão do pool)
+    try:
+        event, (photos_page, next_cursor), photo_count = await asyncio.gather(
+            async_data_manager.get_event_by_id(event_id),
+            async_data_manager.get_photos_page(event_id, current_app.config['PHOTOS_PER_PAGE'],
+                                               request.args.get('cursor')),
+            async_data_manager.count_photos(event_id)
+        )
+    except ValueError:
+        return redirect(url_for('search.event_details', event_id=event_id))
+
+    if not event:
+        flash('Evento não encontrado')
+        return redirect(url_for('search.index'))
+
+    return render_template('search/event_details.html',
+                           event=event,
+                           photos=photos_page,
+                           photo_count=photo_count,
+                           next_cursor=next_cursor)
+
+
+async def event_photos(event_id):
+    """Próxima página de fotos do evento em JSON (rolagem infinita)"""
+    try:
+        photos_page, next_cursor = await async_data_manager.get_photos_page(
+            event_id, current_app.config['PHOTOS_PER_PAGE'], request.args.get('cursor'))
+    except ValueError:
+        abort(400)
+    return search.photos_page_json(event_id, photos_page, next_cursor)
+
+
+async def rendition(kind, content_hash):
+    """Versão redimensionada (gerada no pool de E/S se ainda não estiver no cache)"""
+    return await async_io.run(photos.rendition, kind, content_hash)
+
+
+async def original(photo_id):
+    """Arquivo original da foto"""
+    return await async_io.run(photos.original, photo_id)
+
+
+# Endpoint do Flask -> corrotina que o atende no modo ASGI
+ASYNC_VIEWS = {
+    'dashboard.index': dashboard_index,
+    'search.index': search_index,
+    'search.event_details': event_details,
+    'search.event_photos': event_photos,
+    'photos.rendition': rendition,
+    'photos.original': original
+}
@@ -0,0 +1,260 @@
+import os
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+
+def init_data_manager(app, manager=None):
+    """Cria o DatabaseManager único do processo e o registra na aplicação"""
+    if manager is None:
+        from db_manager import DatabaseManager
+        manager = DatabaseManager()
+    app.extensions['data_manager'] = manager
+    return manager
+
+
+def init_logging(app):
+    """Configura os registros do processo (LOGGING_CONFIG): nível, formato e escrita em segundo plano"""
+    from config import LOGGING_CONFIG
+    from logging_setup import setup_logging
+    handler = setup_logging(LOGGING_CONFIG['level'], LOGGING_CONFIG['format'], LOGGING_CONFIG['queue_size'])
+    app.extensions['log_handler'] = handler
+    return handler
+
+
+def init_sessions(app):
+    """Configura onde ficam as sessões de login (SESSION_CONFIG['backend'])"""
+    from config import SESSION_CONFIG
+    backend = SESSION_CONFIG['backend']
+    app.config['PERMANENT_SESSION_LIFETIME'] = SESSION_CONFIG['lifetime']
+    app.config['SESSION_COOKIE_HTTPONLY'] = True
+    app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    
+    if backend == 'cookie':
+        # Interface padrão do Flask: a sessão inteira no cookie, assinada com SECRET_KEY
+        return app.session_interface
+    if backend == 'sqlite':
+        from session_store import SQLiteSessionInterface
+        app.session_interface = SQLiteSessionInterface(SESSION_CONFIG['path'],
+                                                       sweep_interval=SESSION_CONFIG['sweep_interval'])
+        return app.session_interface
+    if backend == 'filesystem':
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = 'filesystem'
+        Session(app)
+        return app.session_interface
+    raise ValueError(f'Backend de sessão desconhecido: {backend}')
+
+
+def init_password_hasher(app, manager):
+    """Cria o pool de hash de senhas e o liga ao DatabaseManager"""
+    from config import PASSWORD_CONFIG
+    from password_hasher import PasswordHasher
+    hasher = PasswordHasher(**PASSWORD_CONFIG)
+    manager.password_hasher = hasher
+    app.extensions['password_hasher'] = hasher
+    return hasher
+
+
+def init_metrics(app, manager):
+    """Cria as métricas do processo e instrumenta o DatabaseManager (METRICS_CONFIG)"""
+    from config import METRICS_CONFIG
+    if not METRICS_CONFIG['enabled']:
+        app.extensions['metrics'] = None
+        return None
+    from metrics import Metrics
+    metrics = Metrics(
+        shared_dir=METRICS_CONFIG['shared_dir'] or os.path.join(app.config['UPLOAD_FOLDER'], 'metrics'),
+        export_interval=METRICS_CONFIG['export_interval']
+    )
+    manager.metrics = metrics
+    metrics.instrument(manager)
+    app.extensions['metrics'] = metrics
+    return metrics
+
+
+def init_profiler(app):
+    """Cria o perfilador das requisições lentas, se PROFILER_CONFIG['threshold_ms'] > 0"""
+    from config import PROFILER_CONFIG
+    if PROFILER_CONFIG['threshold_ms'] <= 0:
+        app.extensions['profiler'] = None
+        return None
+    from request_profiler import SlowRequestProfiler
+    profiler = SlowRequestProfiler(
+        os.path.abspath(PROFILER_CONFIG['folder'] or os.path.join(app.config['UPLOAD_FOLDER'], 'profiles')),
+        PROFILER_CONFIG['threshold_ms'] / 1000,
+        interval=PROFILER_CONFIG['interval_ms'] / 1000,
+        sample_rate=PROFILER_CONFIG['sample_rate'],
+        keep=PROFILER_CONFIG['keep']
+    )
+    app.extensions['profiler'] = profiler
+    return profiler
+
+
+def init_cache(app, manager):
+    """Cria o cache de consultas de catálogo e o liga ao DatabaseManager"""
+    from config import CACHE_CONFIG
+    from db_cache import create_cache
+    cache = create_cache(
+        CACHE_CONFIG['backend'],
+        path=CACHE_CONFIG['path'] or os.path.join(app.config['UPLOAD_FOLDER'], 'cache.db'),
+        max_entries=CACHE_CONFIG['max_entries'],
+        ttl=CACHE_CONFIG['ttl'],
+        touch_interval=CACHE_CONFIG['touch_interval']
+    )
+    manager.cache = cache
+    app.extensions['cache'] = cache
+    return cache
+
+
+def init_face_engine(app, engine=None):
+    """Cria o pipeline de reconhecimento facial do processo"""
+    if engine is None:
+        from face_engine import FaceEngine
+        engine = FaceEngine()
+    app.extensions['face_engine'] = engine
+    return engine
+
+
+def init_face_index(app, manager, engine):
+    """Cria o índice facial em disco e o liga ao DatabaseManager
+
+    O índice é reconstruído a partir de ``get_photo_analyses`` quando não
+    existe e recebe as novas faces a cada ``save_photo``.
+    """
+    from face_index import FaceIndexStore
+    store = FaceIndexStore(
+        engine.config['index_folder'],
+        engine.dimension,
+        loader=lambda event_id: manager.get_photo_analyses(event_id)
+    )
+    manager.face_index = store
+    app.extensions['face_index'] = store
+    return store
+
+
+def init_face_ann(app, manager, store):
+    """Cria o índice aproximado (IVF) sobre as faces de todos os eventos"""
+    from config import FACE_ANN_CONFIG
+    from face_ann import FaceANNIndex
+    ann = FaceANNIndex(
+        store,
+        FACE_ANN_CONFIG,
+        event_source=lambda: [event['EventId'] for event in manager.get_all_events()]
+    )
+    app.extensions['face_ann'] = ann
+    return ann
+
+
+def init_photo_store(app, manager):
+    """Cria o armazenamento de fotos por hash e o liga ao DatabaseManager"""
+    from config import PHOTO_STORE_CONFIG
+    from photo_store import PhotoStore
+    store = PhotoStore(os.path.abspath(PHOTO_STORE_CONFIG['folder'] or os.path.join(app.config['UPLOAD_FOLDER'], 'store')))
+    manager.photo_store = store
+    app.extensions['photo_store'] = store
+    return store
+
+
+def init_renditions(app, store):
+    """Cria o serviço de versões redimensionadas (miniatura, prévia, marca d'água)"""
+    from config import RENDITION_CONFIG
+    from renditions import RenditionService
+    service = RenditionService(
+        store,
+        # Caminho absoluto: send_file resolve caminhos relativos a partir da pasta da aplicação
+        os.path.abspath(RENDITION_CONFIG['folder'] or os.path.join(app.config['UPLOAD_FOLDER'], 'renditions')),
+        grid_size=RENDITION_CONFIG['grid_size'],
+        preview_size=RENDITION_CONFIG['preview_size'],
+        quality=RENDITION_CONFIG['quality'],
+        max_bytes=RENDITION_CONFIG['max_mb'] * 1024 * 1024,
+        watermark_text=RENDITION_CONFIG['watermark_text']
+    )
+    app.extensions['renditions'] = service
+    return service
+
+
+def init_ingestion(app, manager, engine, store, renditions):
+    """Cria a fila de processamento de uploads em segundo plano"""
+    from config import INGEST_CONFIG, PHOTO_STORE_CONFIG
+    from ingestion import IngestionQueue
+    queue = IngestionQueue(
+        manager,
+        engine,
+        store,
+        renditions,
+        app.config['UPLOAD_FOLDER'],
+        workers=INGEST_CONFIG['workers'],
+        batch_size=INGEST_CONFIG['batch_size'],
+        perceptual_hash=PHOTO_STORE_CONFIG['perceptual_hash'],
+        near_duplicate_distance=PHOTO_STORE_CONFIG['near_duplicate_distance']
+    )
+    app.extensions['ingestion'] = queue
+    return queue
+
+
+def init_async(app, manager):
+    """Cria o DatabaseManager assíncrono e o pool de E/S de arquivos do modo ASGI (ASYNC_CONFIG)"""
+    from config import ASYNC_CONFIG
+    from async_db import AsyncDatabaseManager, ThreadRunner
+    async_manager = AsyncDatabaseManager(manager, ASYNC_CONFIG['db_threads'] or None)
+    io = ThreadRunner(ASYNC_CONFIG['io_threads'], 'io-async')
+    app.extensions['async_data_manager'] = async_manager
+    app.extensions['async_io'] = io
+    return async_manager, io
+
+
+def get_data_manager():
+    """Retorna o DatabaseManager da aplicação atual"""
+    return current_app.extensions['data_manager']
+
+
+def get_face_engine():
+    """Retorna o FaceEngine da aplicação atual"""
+    return current_app.extensions['face_engine']
+
+
+def get_face_index():
+    """Retorna o FaceIndexStore da aplicação atual"""
+    return current_app.extensions['face_index']
+
+
+def get_face_ann():
+    """Retorna o FaceANNIndex da aplicação atual"""
+    return current_app.extensions['face_ann']
+
+
+def get_photo_store():
+    """Retorna o PhotoStore da aplicação atual"""
+    return current_app.extensions['photo_store']
+
+
+def get_renditions():
+    """Retorna o RenditionService da aplicação atual"""
+    return current_app.extensions['renditions']
+
+
+def get_ingestion():
+    """Retorna a IngestionQueue da aplicação atual"""
+    return current_app.extensions['ingestion']
+
+
+def get_async_data_manager():
+    """Retorna o AsyncDatabaseManager da aplicação atual (modo ASGI)"""
+    return current_app.extensions['async_data_manager']
+
+
+def get_async_io():
+    """Retorna o pool de E/S de arquivos da aplicação atual (modo ASGI)"""
+    return current_app.extensions['async_io']
+
+
+# Proxies usados pelos blueprints; resolvem para as instâncias da aplicação atual
+data_manager = LocalProxy(get_data_manager)
+face_engine = LocalProxy(get_face_engine)
+face_index = LocalProxy(get_face_index)
+face_ann = LocalProxy(get_face_ann)
+photo_store = LocalProxy(get_photo_store)
+renditions = LocalProxy(get_renditions)
+ingestion = LocalProxy(get_ingestion)
+async_data_manager = LocalProxy(get_async_data_manager)
+async_io = LocalProxy(get_async_io)
@@ -1,11 +1,11 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from db_manager import DatabaseManager
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, make_response
+from app.extensions import data_manager
+from password_hasher import PasswordHasherBusy
+import logging
 import os
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
-
-# Inicializar o gerenciador de dados
-data_manager = DatabaseManager()
+logger = logging.getLogger(__name__)
 
 def clean_cpf(cpf):
     """Remove pontos e hífens do CPF"""
@@ -13,6 +13,14 @@ def clean_cpf(cpf):
         return None
     return cpf.replace('.', '').replace('-', '').replace('/', '')
 
+def busy_response(template, error):
+    """503 com Retry-After quando a fila de hash de senhas está cheia"""
+    flash('Muitos acessos no momento. Tente novamente em alguns segundos.')
+    logger.warning("Fila de hash de senhas cheia - pedindo nova tentativa em %ss", error.retry_after)
+    response = make_response(render_template(template), 503)
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Página de login"""
@@ -20,11 +28,12 @@ def login():
         email = request.form['email']
         password = request.form['password']
         
-        print(f"🔐 Tentativa de login: {email}")
-        
         if data_manager:
             # Usa autenticação por email com hash e salt
-            user = data_manager.authenticate_user_by_email(email, password)
+            try:
+                user = data_manager.authenticate_user_by_email(email, password)
+            except PasswordHasherBusy as e:
+                return busy_response('auth/login.html', e)
             
             if user:
                 # Torna a sessão permanente
@@ -34,17 +43,15 @@ def login():
                 session['email'] = user['Email']
                 session['user_type'] = user['UserType']
                 
-                print(f"✅ Sessão definida - user_id: {session['user_id']}")
-                print(f"✅ Tipo de usuário: {user['UserType']}")
                 flash('Login realizado com sucesso!')
-                print(f"✅ Login bem-sucedido para: {user['Username']}")
+                logger.info("Login do usuário %s (%s)", user['UserId'], user['UserType'])
                 return redirect(url_for('dashboard.index'))
             else:
                 flash('Email ou senha inválidos')
-                print("❌ Login falhou - credenciais inválidas")
+                logger.info("Login recusado - credenciais inválidas")
         else:
             flash('Sistema de dados não disponível')
-            print("❌ Sistema de dados não disponível")
+            logger.error("Sistema de dados não disponível")
     
     return render_template('auth/login.html')
 
@@ -62,8 +69,6 @@ def register():
         user_type = 'customer'  # Tipo padrão para novos usuários
         terms_accepted = request.form.get('terms_accepted') == 'on'
         
-        print(f"📝 Tentativa de cadastro: {email} ({user_type})")
-        
         # Validações
         if password != password_confirm:
             flash('As senhas não coincidem')
@@ -88,17 +93,19 @@ def register():
                 
                 if user_id:
                     flash('Conta criada com sucesso!')
-                    print(f"✅ Usuário criado com ID: {user_id}, Tipo: {user_type}")
+                    logger.info("Usuário %s criado (%s)", user_id, user_type)
                     return redirect(url_for('auth.login'))
                 else:
                     flash('Erro ao criar conta - usuário já existe')
-                    print(f"❌ Erro ao criar usuário - já existe")
+                    logger.info("Cadastro recusado - usuário já existe")
+            except PasswordHasherBusy as e:
+                return busy_response('auth/register.html', e)
             except Exception as e:
                 flash(f'Erro ao criar conta: {str(e)}')
-                print(f"❌ Erro ao criar usuário: {e}")
+                logger.exception("Erro ao criar usuário")
         else:
             flash('Sistema de dados não disponível')
-            print("❌ Sistema de dados não disponível")
+            logger.error("Sistema de dados não disponível")
     
     return render_template('auth/register.html')
 
@@ -117,8 +124,6 @@ def register_photographer():
         how_knew = request.form.get('how_knew', '')
         terms_accepted = request.form.get('terms_accepted') == 'on'
         
-        print(f"📸 Tentativa de cadastro de fotógrafo: {email}")
-        
         # Validações
         if password != password_confirm:
             flash('As senhas não coincidem')
@@ -143,17 +148,19 @@ def register_photographer():
                 
                 if user_id:
                     flash('Conta de fotógrafo criada com sucesso!')
-                    print(f"✅ Fotógrafo criado com ID: {user_id}")
+                    logger.info("Fotógrafo %s criado", user_id)
                     return redirect(url_for('auth.login'))
                 else:
                     flash('Erro ao criar conta - usuário já existe')
-                    print(f"❌ Erro ao criar fotógrafo - já existe")
+                    logger.info("Cadastro de fotógrafo recusado - usuário já existe")
+            except PasswordHasherBusy as e:
+                return busy_response('auth/register_photographer.html', e)
             except Exception as e:
                 flash(f'Erro ao criar conta: {str(e)}')
-                print(f"❌ Erro ao criar fotógrafo: {e}")
+                logger.exception("Erro ao criar fotógrafo")
         else:
             flash('Sistema de dados não disponível')
-            print("❌ Sistema de dados não disponível")
+            logger.error("Sistema de dados não disponível")
     
     return render_template('auth/register_photographer.html')
 
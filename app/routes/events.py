@@ -1,12 +1,11 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
-from db_manager import DatabaseManager
-import os
-from werkzeug.utils import secure_filename
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, jsonify
+from app.extensions import data_manager, ingestion, photo_store
+from werkzeug.wsgi import get_input_stream
+from upload_stream import UploadRejected, receive_multipart
+import logging
 
 bp = Blueprint('events', __name__, url_prefix='/events')
-
-# Inicializar o gerenciador de dados
-data_manager = DatabaseManager()
+logger = logging.getLogger(__name__)
 
 def allowed_file(filename):
     """Verifica se o arquivo é permitido"""
@@ -14,6 +13,24 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def upload_events():
+    """Eventos do fotógrafo logado oferecidos no formulário de upload (os mais recentes)"""
+    if not data_manager:
+        return []
+    return data_manager.get_events_page(current_app.config['UPLOAD_EVENTS'], owner_id=session['user_id'])
+
+def uploadable_event(event_id):
+    """Evento em que o fotógrafo logado pode enviar fotos, ou None"""
+    event = data_manager.get_event_by_id(int(event_id)) if event_id and event_id.isdigit() else None
+    if not event or event['OwnerId'] is None or event['OwnerId'] != session['user_id']:
+        return None
+    return event
+
+def check_upload_fields(fields):
+    """Recusa o upload antes de gravar a primeira foto se o evento não é do fotógrafo"""
+    if uploadable_event(fields.get('event_id')) is None:
+        raise UploadRejected('Selecione um evento')
+
 @bp.route('/create_event', methods=['GET', 'POST'])
 def create_event():
     """Criar novo evento"""
@@ -31,25 +48,23 @@ def create_event():
         event_name = request.form['event_name']
         event_date = request.form['event_date']
         
-        print(f"📅 Tentativa de criar evento: {event_name} em {event_date}")
-        
         if data_manager:
             try:
-                event_id = data_manager.create_event(event_name, event_date)
+                event_id = data_manager.create_event(event_name, event_date, session['user_id'])
                 
                 if event_id:
                     flash('Evento criado com sucesso!')
-                    print(f"✅ Evento criado com ID: {event_id}")
+                    logger.info("Evento %s criado pelo fotógrafo %s", event_id, session['user_id'])
                     return redirect(url_for('dashboard.area_fotografo'))
                 else:
                     flash('Erro ao criar evento')
-                    print("❌ Erro ao criar evento")
+                    logger.error("Erro ao criar evento")
             except Exception as e:
                 flash(f'Erro ao criar evento: {str(e)}')
-                print(f"❌ Erro ao criar evento: {e}")
+                logger.exception("Erro ao criar evento")
         else:
             flash('Sistema de dados não disponível')
-            print("❌ Sistema de dados não disponível")
+            logger.error("Sistema de dados não disponível")
     
     return render_template('events/create_event.html')
 
@@ -67,48 +82,80 @@ def upload_photos():
         return redirect(url_for('dashboard.area_fotografo'))
     
     if request.method == 'POST':
-        event_id = request.form.get('event_id')
-        files = request.files.getlist('photos')
+        if request.mimetype != 'multipart/form-data' or 'boundary' not in request.mimetype_params:
+            flash('Selecione pelo menos uma foto')
+            return redirect(url_for('events.upload_photos'))
         
-        print(f"📸 Tentativa de upload para evento ID: {event_id}")
-        print(f"📸 Número de arquivos: {len(files)}")
+        # O corpo é lido direto do stream WSGI (sem o buffer do Werkzeug e sem o
+        # MAX_CONTENT_LENGTH da requisição inteira): cada foto é gravada no
+        # PhotoStore enquanto o hash é calculado, com limite por arquivo.
+        # Objetos de uploads que não chegam a virar fotos são removidos por PhotoStore.sweep
+        try:
+            upload = receive_multipart(
+                get_input_stream(request.environ, max_content_length=None),
+                request.mimetype_params['boundary'].encode('latin-1'),
+                photo_store.tmp_dir,
+                photo_store.put,
+                max_file_size=current_app.config['MAX_FILE_SIZE'],
+                accept=allowed_file,
+                check_fields=check_upload_fields
+            )
+        except UploadRejected as e:
+            flash(str(e))
+            logger.info("Upload recusado antes dos arquivos: %s", e)
+            return render_template('events/upload_photos.html', events=upload_events())
+        except Exception:
+            flash('Erro ao receber as fotos. Tente novamente.')
+            logger.exception("Erro no upload")
+            return redirect(url_for('events.upload_photos'))
         
-        if not event_id:
-            flash('Selecione um evento')
-            return render_template('events/upload_photos.html', events=data_manager.get_events() if data_manager else [])
+        event_id = upload.fields.get('event_id')
+        files = upload.saved
+        rejected = [f'{file.filename}: {file.error}' for file in upload.rejected]
         
-        if not files or all(f.filename == '' for f in files):
-            flash('Selecione pelo menos uma foto')
-            return render_template('events/upload_photos.html', events=data_manager.get_events() if data_manager else [])
+        logger.info("Upload para o evento %s: %d arquivo(s), %d recusado(s)", event_id, len(upload.files), len(rejected))
+        
+        if uploadable_event(event_id) is None:
+            flash('Selecione um evento')
+            return render_template('events/upload_photos.html', events=upload_events())
         
-        uploaded_count = 0
+        if not files:
+            flash('Nenhuma foto foi processada' if rejected else 'Selecione pelo menos uma foto')
+            for message in rejected[:10]:
+                flash(message)
+            logger.info("Upload sem nenhum arquivo válido")
+            return redirect(url_for('events.upload_photos'))
         
         try:
-            for file in files:
-                if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    
-                    # Salvar no banco de dados
-                    photo_id = data_manager.save_photo(int(event_id), filename)
-                    
-                    if photo_id:
-                        uploaded_count += 1
-                        print(f"✅ Foto salva: {filename} (ID: {photo_id})")
-                    else:
-                        print(f"❌ Erro ao salvar foto: {filename}")
-            
-            if uploaded_count > 0:
-                flash(f'{uploaded_count} foto(s) enviada(s) com sucesso!')
-                print(f"✅ Upload concluído: {uploaded_count} fotos")
-            else:
-                flash('Nenhuma foto foi processada')
-                print("❌ Upload falhou: nenhuma foto processada")
-            
-            return redirect(url_for('dashboard.area_fotografo'))
+            # O processamento (miniatura, metadados, faces, banco) roda em segundo plano
+            job_id = ingestion.new_job_id()
+            ingestion.submit(
+                job_id,
+                int(event_id),
+                [(file.path, file.filename, file.content_hash) for file in files],
+                rejected
+            )
+            flash(f'{len(files)} foto(s) recebida(s); o processamento continua em segundo plano.')
+            if rejected:
+                flash(f'{len(rejected)} arquivo(s) recusado(s)')
+            return redirect(url_for('events.upload_photos', job=job_id))
             
         except Exception as e:
             flash(f'Erro ao enviar fotos: {str(e)}')
-            print(f"❌ Erro no upload: {e}")
+            logger.exception("Erro no upload")
+    
+    return render_template('events/upload_photos.html', events=upload_events(), job_id=request.args.get('job'))
+
+@bp.route('/upload_status/<job_id>')
+def upload_status(job_id):
+    """Progresso de um lote de upload (consultado pela página de upload)"""
+    if not session.get('user_id'):
+        return jsonify({'error': 'não autenticado'}), 401
     
-    events = data_manager.get_events() if data_manager else []
-    return render_template('events/upload_photos.html', events=events) 
\ No newline at end of file
+    try:
+        job = ingestion.status(job_id)
+    except ValueError:
+        job = None
+    if job is None:
+        return jsonify({'error': 'job não encontrado'}), 404
+    return jsonify(job) 
\ No newline at end of file
@@ -0,0 +1,35 @@
+from flask import Blueprint, abort, current_app, jsonify
+from app.extensions import data_manager
+from logging_setup import dropped_records
+
+bp = Blueprint('health', __name__)
+
+@bp.route('/healthz')
+def healthz():
+    """Liveness: o processo está de pé e respondendo"""
+    return jsonify({'status': 'ok'})
+
+@bp.route('/readyz')
+def readyz():
+    """Readiness: o banco de dados está acessível"""
+    if not data_manager.ready:
+        # Ainda não testado ou falhou antes: testa novamente agora
+        data_manager.test_connection()
+
+    state = data_manager.readiness()
+    state['backend'] = data_manager.backend.describe()
+    state['pool'] = data_manager.pool_stats()
+    state['cache'] = data_manager.cache.stats() if data_manager.cache is not None else None
+    state['log_dropped'] = dropped_records()
+    # Resumo da preparação feita antes de atender (wsgi.py), None no servidor de desenvolvimento
+    state['warmup'] = current_app.extensions.get('warmup')
+    return jsonify(state), 200 if state['ready'] else 503
+
+
+@bp.route('/metrics')
+def metrics():
+    """Métricas no formato texto do Prometheus (todos os workers do nó)"""
+    registry = current_app.extensions.get('metrics')
+    if registry is None:
+        abort(404)
+    return registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
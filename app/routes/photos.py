@@ -0,0 +1,143 @@
+import hashlib
+import io
+import mimetypes
+import os
+
+from flask import Blueprint, abort, current_app, redirect, request, send_file, session, url_for
+from app.extensions import data_manager, photo_store, renditions
+
+bp = Blueprint('photos', __name__, url_prefix='/photos')
+
+# Versões que podem ser vistas sem login; a prévia sem marca d'água é do dono do evento
+PUBLIC_RENDITIONS = {'grid', 'watermarked'}
+
+# URLs com o hash do conteúdo nunca mudam de conteúdo: o navegador e a CDN
+# podem guardá-las por um ano sem revalidar
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# O original é acessado pelo PhotoId e só pelo dono do evento: cache só no navegador
+ORIGINAL_MAX_AGE = 24 * 3600
+
+
+@bp.app_template_global()
+def can_download_original(event):
+    """Se o usuário logado pode baixar os originais do evento
+
+    Mesma regra do upload: só o fotógrafo dono do evento. Evento sem dono
+    (criado antes da coluna OwnerId e ainda não atribuído) não é de ninguém.
+    Os demais veem só as versões com marca d'água.
+    """
+    if event is None or session.get('user_type') != 'photographer':
+        return False
+    return event.OwnerId is not None and event.OwnerId == session.get('user_id')
+
+
+def _accel_location(path):
+    """Caminho interno do nginx para o arquivo, ou None se X-Accel-Redirect
+    não estiver configurado ou o arquivo estiver fora da pasta mapeada"""
+    prefix = current_app.config.get('X_ACCEL_PREFIX')
+    if not prefix:
+        return None
+    relative = os.path.relpath(path, current_app.config['X_ACCEL_ROOT'])
+    if relative.startswith('..'):
+        return None
+    return prefix.rstrip('/') + '/' + relative.replace(os.sep, '/')
+
+
+def _send_path(path, etag, mimetype, max_age, immutable=False, private=False, download_name=None):
+    """Entrega um arquivo do disco sem passar os bytes pelo Python
+
+    Com ``X_ACCEL_PREFIX`` a resposta só tem cabeçalhos e o nginx envia o
+    arquivo (incluindo Range); com ``USE_X_SENDFILE`` o mesmo vale para
+    Apache/lighttpd; sem nenhum dos dois, ``send_file`` usa o
+    ``wsgi.file_wrapper`` do servidor (sendfile no gunicorn). Em todos os
+    casos o ETag forte e o Last-Modified permitem responder 304 sem abrir
+    o arquivo.
+    """
+    location = _accel_location(path)
+    if location is None:
+        response = send_file(path, mimetype=mimetype, etag=etag, conditional=True, max_age=max_age,
+                             download_name=download_name)
+    else:
+        response = current_app.response_class(mimetype=mimetype)
+        response.set_etag(etag)
+        response.last_modified = int(os.path.getmtime(path))
+        if download_name:
+            response.headers.set('Content-Disposition', 'inline', filename=download_name)
+        response.headers['X-Accel-Redirect'] = location
+        response.make_conditional(request)
+        if response.status_code == 304:
+            # Sem o cabeçalho o nginx repassa o 304 em vez de enviar o arquivo
+            del response.headers['X-Accel-Redirect']
+        response.cache_control.max_age = max_age
+
+    if private:
+        response.cache_control.public = False
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+
+def can_download_rendition(content_hash):
+    """Versões sem marca d'água seguem a regra do original, em algum evento que tenha a foto"""
+    if session.get('user_type') != 'photographer':
+        return False
+    return any(can_download_original(event) for event in data_manager.get_events_by_content_hash(content_hash))
+
+
+@bp.route('/<kind>/<content_hash>.jpg')
+def rendition(kind, content_hash):
+    """Serve uma versão redimensionada, gerando-a se não estiver no cache"""
+    if kind not in renditions.KINDS:
+        abort(404)
+    public = kind in PUBLIC_RENDITIONS
+    if not public and not can_download_rendition(content_hash):
+        abort(403)
+
+    try:
+        path = renditions.get(content_hash, kind)
+    except ValueError:
+        abort(404)
+    if path is None:
+        abort(404)
+
+    return _send_path(path, f'{content_hash}-{kind}', 'image/jpeg', IMMUTABLE_MAX_AGE,
+                      immutable=True, private=not public)
+
+
+@bp.route('/<int:photo_id>/original')
+def original(photo_id):
+    """Arquivo original da foto, como foi enviado pelo fotógrafo"""
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    photo = data_manager.get_photo_by_id(photo_id)
+    if not photo:
+        abort(404)
+    if not can_download_original(data_manager.get_event_by_id(photo['EventId'])):
+        abort(403)
+    mimetype = mimetypes.guess_type(photo['Filename'])[0] or 'application/octet-stream'
+
+    if photo['ContentHash']:
+        path = photo_store.path_for(photo['ContentHash'])
+        if not os.path.exists(path):
+            abort(404)
+        return _send_path(path, photo['ContentHash'], mimetype, ORIGINAL_MAX_AGE,
+                          private=True, download_name=photo['Filename'])
+
+    # Fotos anteriores ao PhotoStore: bytes na coluna Image
+    image = data_manager.get_photo_image(photo_id)
+    if image is None:
+        abort(404)
+    return _send_image_bytes(image, mimetype, photo['Filename'])
+
+
+def _send_image_bytes(image, mimetype, filename):
+    """Entrega os bytes de uma foto gravada no banco (só o dono: cache privado)"""
+    response = send_file(io.BytesIO(image), mimetype=mimetype, download_name=filename,
+                         etag=hashlib.sha256(image).hexdigest(), conditional=True, max_age=ORIGINAL_MAX_AGE)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
@@ -1,24 +1,11 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
-from db_manager import DatabaseManager
-from datetime import datetime
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, jsonify, abort
+from app.extensions import data_manager, face_engine, face_index, face_ann
+from app.routes.photos import can_download_original
 import os
+import logging
 
 bp = Blueprint('search', __name__, url_prefix='/search')
-
-# Inicializar o gerenciador de dados
-data_manager = DatabaseManager()
-
-def format_date(date_value):
-    """Formata uma data para exibição"""
-    if isinstance(date_value, str):
-        try:
-            date_obj = datetime.strptime(date_value, '%Y-%m-%d')
-            return date_obj.strftime('%d/%m/%Y')
-        except:
-            return date_value
-    elif hasattr(date_value, 'strftime'):
-        return date_value.strftime('%d/%m/%Y')
-    return str(date_value)
+logger = logging.getLogger(__name__)
 
 @bp.route('/')
 def index():
@@ -29,11 +16,19 @@ def index():
     if event_name and data_manager:
         events = data_manager.search_events(event_name)
     
-    return render_template('search/search.html', events=events, event_name=event_name, format_date=format_date)
+    return render_template('search/search.html', events=events, event_name=event_name)
+
+@bp.route('/autocomplete')
+def autocomplete():
+    """Sugestões de eventos enquanto o nome é digitado"""
+    query = request.args.get('q', '')
+    events = data_manager.search_events(query, limit=8) if query else []
+    return jsonify([{'EventId': event.EventId, 'Name': event.Name, 'Date': event.Date.isoformat() if event.Date else None}
+                    for event in events])
 
 @bp.route('/event/<int:event_id>')
 def event_details(event_id):
-    """Detalhes do evento com fotos"""
+    """Detalhes do evento com a primeira página de fotos (as demais via event_photos)"""
     if not data_manager:
         flash('Sistema de dados não disponível')
         return redirect(url_for('search.index'))
@@ -44,21 +39,128 @@ def event_details(event_id):
         flash('Evento não encontrado')
         return redirect(url_for('search.index'))
     
-    # Buscar fotos do evento
-    photos = data_manager.get_photos_by_event(event_id)
+    # Uma página de fotos; sem JavaScript, "Carregar mais" abre a próxima página aqui
+    try:
+        photos, next_cursor = data_manager.get_photos_page(
+            event_id, current_app.config['PHOTOS_PER_PAGE'], request.args.get('cursor'))
+    except ValueError:
+        return redirect(url_for('search.event_details', event_id=event_id))
     
     return render_template('search/event_details.html', 
                          event=event, 
                          photos=photos, 
-                         format_date=format_date)
+                         photo_count=data_manager.count_photos(event_id),
+                         next_cursor=next_cursor)
+
+@bp.route('/event/<int:event_id>/photos')
+def event_photos(event_id):
+    """Próxima página de fotos do evento em JSON (rolagem infinita)"""
+    try:
+        photos, next_cursor = data_manager.get_photos_page(
+            event_id, current_app.config['PHOTOS_PER_PAGE'], request.args.get('cursor'))
+    except ValueError:
+        abort(400)
+    
+    return photos_page_json(event_id, photos, next_cursor)
+
+def photos_page_json(event_id, photos, next_cursor):
+    """Resposta JSON de uma página da galeria (também usada pelo modo ASGI)"""
+    return jsonify({
+        'photos': [{
+            'PhotoId': photo['PhotoId'],
+            'Filename': photo['Filename'],
+            'grid_url': url_for('photos.rendition', kind='grid', content_hash=photo['ContentHash'])
+                        if photo['ContentHash'] else None,
+            'view_url': url_for('photos.rendition', kind='watermarked', content_hash=photo['ContentHash'])
+                        if photo['ContentHash'] else None
+        } for photo in photos],
+        'next_cursor': next_cursor,
+        'next_url': url_for('search.event_photos', event_id=event_id, cursor=next_cursor) if next_cursor else None
+    })
+
+def face_search_events(event_id=None):
+    """Eventos do formulário da busca facial: os mais recentes e o escolhido"""
+    events = data_manager.get_events_page(current_app.config['FACE_SEARCH_EVENTS'])
+    if event_id and all(ev.EventId != event_id for ev in events):
+        event = data_manager.get_event_by_id(event_id)
+        if event:
+            events = [event] + events
+    return events
 
 @bp.route('/face_search', methods=['GET', 'POST'])
 def face_search():
-    """Busca por reconhecimento facial"""
+    """Busca por reconhecimento facial (em um evento ou em todos)"""
+    # Anos por SELECT DISTINCT; o formulário lista só os eventos recentes
+    years = [str(year) for year in data_manager.get_event_years()]
+    
     if request.method == 'POST':
-        # Aqui você implementaria a lógica de reconhecimento facial
-        # Por enquanto, vamos apenas simular
-        flash('Funcionalidade de busca por face em desenvolvimento')
-        return redirect(url_for('search.index'))
+        scope = request.form.get('scope', 'event')
+        event_id = request.form.get('event_id', type=int)
+        year = request.form.get('year', '')
+        face_photo = request.files.get('face_photo')
+        form_state = dict(events=face_search_events(event_id), years=years, scope=scope,
+                          event_id=event_id, year=year)
+        
+        if not face_engine.available:
+            flash('Busca por face indisponível no momento')
+            return redirect(url_for('search.face_search'))
+        
+        if scope == 'event' and not event_id:
+            flash('Selecione um evento')
+            return render_template('search/face_search.html', **form_state)
+        
+        if not face_photo or face_photo.filename == '':
+            flash('Selecione uma foto do rosto')
+            return render_template('search/face_search.html', **form_state)
+        
+        event = None
+        if scope == 'event':
+            event = data_manager.get_event_by_id(event_id)
+            if not event:
+                flash('Evento não encontrado')
+                return render_template('search/face_search.html', **form_state)
+        
+        try:
+            query = face_engine.extract_query(face_photo.read())
+        except ValueError:
+            query = None
+        
+        if query is None:
+            flash('Nenhum rosto encontrado na foto enviada')
+            return render_template('search/face_search.html', **form_state)
+        
+        threshold = face_engine.similarity_threshold
+        limit = face_engine.config['max_results']
+        if scope == 'event':
+            # Índice mapeado em memória com todas as faces do evento; a busca é
+            # um único produto de matrizes
+            matches = face_index.search(event_id, query, threshold, limit=limit)
+        else:
+            # Índice aproximado (IVF) sobre todos os eventos, opcionalmente do ano
+            allowed = None
+            if year.isdigit():
+                allowed = data_manager.get_event_ids_by_year(int(year))
+            matches = [(photo_id, score) for photo_id, _, score in
+                       face_ann.search(query, threshold, limit=limit, event_ids=allowed)]
+        
+        scores = dict(matches)
+        photos = data_manager.get_photos_by_ids([photo_id for photo_id, _ in matches])
+        events_by_id = {ev.EventId: ev for ev in
+                        data_manager.get_events_by_ids({photo.EventId for photo in photos})}
+        # As linhas do banco são imutáveis: os resultados ganham a similaridade, o nome
+        # do evento e se o usuário pode baixar o original
+        photos = [dict(photo._asdict(), Similarity=scores[photo.PhotoId],
+                       EventName=getattr(events_by_id.get(photo.EventId), 'Name', None),
+                       CanDownload=can_download_original(events_by_id.get(photo.EventId)))
+                  for photo in photos]
+        
+        logger.info("Busca facial (%s): %d foto(s) encontrada(s)", scope, len(photos))
+        return render_template('search/face_search.html',
+                             event=event,
+                             photos=photos,
+                             searched=True,
+                             **form_state)
     
-    return render_template('search/face_search.html') 
\ No newline at end of file
+    event_id = request.args.get('event_id', type=int)
+    return render_template('search/face_search.html', events=face_search_events(event_id), years=years,
+                           scope='event', event_id=event_id)
@@ -235,6 +235,127 @@ function initPopovers() {
     });
 }
 
+// Função para acompanhar o processamento de um lote de upload
+function pollUploadJob(container, interval = 2000) {
+    if (!container) return;
+    
+    const text = document.getElementById('upload-job-text');
+    const bar = document.getElementById('upload-job-bar');
+    
+    fetch(container.dataset.statusUrl)
+        .then(response => response.ok ? response.json() : Promise.reject(response.status))
+        .then(job => {
+            const percent = job.total ? Math.round(100 * job.processed / job.total) : 100;
+            bar.style.width = `${percent}%`;
+            text.textContent = `${job.processed} de ${job.total} foto(s) processada(s)`;
+            
+            if (job.status === 'done') {
+                container.querySelector('i').className = 'fas fa-check text-success';
+                text.textContent = `${job.saved} foto(s) salva(s)` +
+                    (job.duplicates ? `, ${job.duplicates} já enviada(s) antes` : '') +
+                    (job.near_duplicates ? `, ${job.near_duplicates} parecida(s) com outra` : '') +
+                    (job.failed ? `, ${job.failed} com erro` : '');
+                bar.classList.add(job.failed ? 'bg-warning' : 'bg-success');
+            } else {
+                setTimeout(() => pollUploadJob(container, interval), interval);
+            }
+        })
+        .catch(() => {
+            text.textContent = 'Não foi possível consultar o andamento do envio.';
+        });
+}
+
+// Função para carregar as próximas páginas da galeria ao rolar até o fim
+function initPhotoScroll(button) {
+    if (!button) return;
+    
+    const grid = document.getElementById('photo-grid');
+    const template = document.getElementById('photo-card-template');
+    let loading = false;
+    
+    function addPhoto(photo) {
+        const card = template.content.firstElementChild.cloneNode(true);
+        const img = card.querySelector('img');
+        img.src = photo.grid_url || `https://via.placeholder.com/300x200/ff6b35/ffffff?text=Foto+${photo.PhotoId}`;
+        img.alt = `Foto ${photo.PhotoId}`;
+        const view = card.querySelector('.photo-view');
+        if (photo.view_url) {
+            view.href = photo.view_url;
+        } else {
+            view.removeAttribute('target');
+        }
+        card.querySelector('.photo-filename').textContent = photo.Filename;
+        // Só o dono do evento recebe o link do original (a URL vem com o PhotoId 0)
+        const original = card.querySelector('.photo-original');
+        if (original) {
+            original.href = grid.dataset.originalUrl.replace('/0/', `/${photo.PhotoId}/`);
+        }
+        grid.appendChild(card);
+    }
+    
+    function loadMore() {
+        if (loading || !button.dataset.url) return;
+        loading = true;
+        fetch(button.dataset.url)
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(page => {
+                page.photos.forEach(addPhoto);
+                if (page.next_url) {
+                    button.dataset.url = page.next_url;
+                    const href = new URL(button.href);
+                    href.searchParams.set('cursor', page.next_cursor);
+                    button.href = href;
+                    loading = false;
+                } else {
+                    observer.disconnect();
+                    button.parentNode.remove();
+                }
+            })
+            .catch(() => {
+                // Volta ao link comum para a próxima página
+                delete button.dataset.url;
+                observer.disconnect();
+            });
+    }
+    
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) loadMore();
+    }, { rootMargin: '600px' });
+    observer.observe(button);
+    
+    button.addEventListener('click', function(e) {
+        if (!button.dataset.url) return;
+        e.preventDefault();
+        loadMore();
+    });
+}
+
+// Função para sugerir eventos enquanto o nome é digitado
+function initEventAutocomplete(input) {
+    if (!input) return;
+    
+    const list = document.getElementById(input.getAttribute('list'));
+    let lastQuery = '';
+    
+    input.addEventListener('input', debounce(function() {
+        const query = input.value.trim();
+        if (query.length < 2 || query === lastQuery) return;
+        lastQuery = query;
+        
+        fetch(`${input.dataset.url}?q=${encodeURIComponent(query)}`)
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(events => {
+                list.innerHTML = '';
+                events.forEach(event => {
+                    const option = document.createElement('option');
+                    option.value = event.Name;
+                    list.appendChild(option);
+                });
+            })
+            .catch(() => {});
+    }, 200));
+}
+
 // Exportar funções para uso global
 window.PhotoCap = {
     togglePassword,
@@ -251,5 +372,8 @@ window.PhotoCap = {
     validateEmail,
     validateCPF,
     initTooltips,
-    initPopovers
+    initPopovers,
+    pollUploadJob,
+    initPhotoScroll,
+    initEventAutocomplete
 }; 
\ No newline at end of file
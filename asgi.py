@@ -0,0 +1,270 @@
+"""Modo assíncrono (ASGI) do PhotoCap
+
+    uvicorn --factory asgi:create_asgi_app --host 0.0.0.0 --port 8000
+
+As rotas de leitura mais acessadas (página inicial, busca, galeria e fotos,
+ver app/async_views.py) rodam no loop de eventos: um único processo mantém
+milhares de visitantes simultâneos, com o banco limitado ao tamanho do pool
+de conexões e os arquivos lidos em um pool de E/S. As demais rotas (login,
+upload, busca facial...) são repassadas ao Flask em um pool de threads,
+como em um servidor WSGI comum, com o corpo da requisição lido em streaming.
+Sessões, ID da requisição, métricas e Server-Timing valem para as duas.
+"""
+import asyncio
+import contextvars
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import FileWrapper
+
+from config import ASYNC_CONFIG
+
+# Marca no environ das requisições atendidas pelas corrotinas
+ASYNC_ENVIRON_KEY = 'photocap.async'
+
+
+def build_environ(scope: Dict[str, Any], body) -> Dict[str, Any]:
+    """Environ WSGI equivalente ao escopo HTTP do ASGI"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]) if server[1] is not None else '80',
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+            key = name
+        else:
+            key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    if 'CONTENT_LENGTH' not in environ:
+        # Corpo em chunked (ou vazio): o Werkzeug lê até o fim do stream
+        environ['wsgi.input_terminated'] = True
+    return environ
+
+
+class _ReceiveStream:
+    """``wsgi.input`` que lê o corpo das mensagens do ASGI, a partir de uma thread"""
+
+    def __init__(self, receive, loop: asyncio.AbstractEventLoop):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = bytearray()
+        self._done = False
+
+    def _fill(self) -> bool:
+        if self._done:
+            return False
+        message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+        if message['type'] == 'http.disconnect':
+            self._done = True
+            raise OSError('Cliente desconectou durante o envio')
+        self._buffer += message.get('body', b'')
+        self._done = not message.get('more_body', False)
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while (size < 0 or len(self._buffer) < size) and self._fill():
+            pass
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        while b'\n' not in self._buffer and (size < 0 or len(self._buffer) < size) and self._fill():
+            pass
+        end = self._buffer.find(b'\n') + 1 or len(self._buffer)
+        if size >= 0:
+            end = min(end, size)
+        data = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return data
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+
+async def _drain(receive):
+    """Consome o corpo de uma requisição atendida por corrotina (GET/HEAD)"""
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request' or not message.get('more_body', False):
+            return
+
+
+class PhotoCapASGI:
+    """Aplicação ASGI: corrotinas para as rotas de ASYNC_VIEWS, Flask para o resto"""
+
+    def __init__(self, flask_app, async_views: Dict[str, Any], io, wsgi_threads: int, chunk_size: int):
+        self.flask_app = flask_app
+        self.async_views = async_views
+        self.io = io
+        self.chunk_size = chunk_size
+        self.wsgi_executor = ThreadPoolExecutor(wsgi_threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            view, args = self._match(scope)
+            if view is None:
+                await self._call_wsgi(scope, receive, send)
+            else:
+                await _drain(receive)
+                await self._call_async(view, args, scope, send)
+        # WebSocket não é usado pela aplicação: a conexão é recusada
+
+    def _match(self, scope) -> Tuple[Optional[Any], Dict[str, Any]]:
+        if scope['method'] not in ('GET', 'HEAD'):
+            return None, {}
+        adapter = self.flask_app.url_map.bind('localhost', script_name=scope.get('root_path') or None)
+        try:
+            endpoint, args = adapter.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            # 404, 405 e redirecionamentos de barra final ficam com o Flask
+            return None, {}
+        return self.async_views.get(endpoint), args
+
+    async def _call_async(self, view, args, scope, send):
+        """Mesma sequência do Flask (full_dispatch_request), com a view aguardada no loop"""
+        app = self.flask_app
+        environ = build_environ(scope, BytesIO())
+        environ[ASYNC_ENVIRON_KEY] = True
+        # send_file lê o arquivo em blocos de chunk_size (um por mensagem)
+        environ['wsgi.file_wrapper'] = lambda file, buffer_size=0: FileWrapper(file, self.chunk_size)
+        context = app.request_context(environ)
+        error = None
+        context.push()
+        try:
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(**args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                error = e
+                response = app.handle_exception(e)
+            await self._send_response(response, environ, send)
+        finally:
+            context.pop(error)
+
+    async def _send_response(self, response, environ, send):
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                   for name, value in response.get_wsgi_headers(environ).items()]
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        body = response.get_app_iter(environ)
+        try:
+            if isinstance(body, (list, tuple)):
+                await send({'type': 'http.response.body', 'body': b''.join(body)})
+                return
+            # Arquivos: cada bloco é lido no pool de E/S e enviado pelo loop
+            iterator = iter(body)
+            while True:
+                chunk = await self.io.run(_next_chunk, iterator)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(body, 'close', None)
+            if close is not None:
+                close()
+
+    async def _call_wsgi(self, scope, receive, send):
+        """Repassa a requisição ao Flask (WSGI) em uma thread do pool"""
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, _ReceiveStream(receive, loop))
+        context = contextvars.copy_context()
+        await loop.run_in_executor(self.wsgi_executor, context.run, self._run_wsgi, environ, send, loop)
+
+    def _run_wsgi(self, environ, send, loop):
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started: List[Any] = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started and started[0] is True:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started[:] = [(int(status.split(' ', 1)[0]),
+                           [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers])]
+
+        def send_start():
+            if started and started[0] is not True:
+                status, headers = started[0]
+                send_sync({'type': 'http.response.start', 'status': status, 'headers': headers})
+                started[0] = True
+
+        iterable = self.flask_app(environ, start_response)
+        try:
+            for chunk in iterable:
+                send_start()
+                if chunk:
+                    send_sync({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            send_start()
+            send_sync({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self):
+        extensions = self.flask_app.extensions
+        self.wsgi_executor.shutdown(wait=False)
+        extensions['async_data_manager'].shutdown()
+        extensions['async_io'].shutdown()
+        extensions['password_hasher'].shutdown()
+
+
+def _next_chunk(iterator) -> Optional[bytes]:
+    return next(iterator, None)
+
+
+def create_asgi_app(flask_app=None) -> PhotoCapASGI:
+    """Cria a aplicação ASGI sobre a aplicação Flask (a de create_app(), por padrão)"""
+    if flask_app is None:
+        from app import create_app
+        flask_app = create_app()
+    from app.async_views import ASYNC_VIEWS
+    from app.extensions import init_async
+    _, io = init_async(flask_app, flask_app.extensions['data_manager'])
+    return PhotoCapASGI(flask_app, ASYNC_VIEWS, io, ASYNC_CONFIG['wsgi_threads'], ASYNC_CONFIG['chunk_size'])
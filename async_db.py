@@ -0,0 +1,64 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from db_manager import DatabaseManager
+
+
+class ThreadRunner:
+    """Pool de threads para chamadas bloqueantes feitas a partir do loop de eventos"""
+
+    def __init__(self, max_workers: int, name: str):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix=name)
+
+    async def run(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa ``function`` em uma thread do pool, no contexto da tarefa atual
+
+        O contexto copiado leva para a thread o request_id dos registros, o
+        medidor da requisição (Server-Timing) e o contexto do Flask.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, functools.partial(context.run, function, *args, **kwargs))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+class AsyncDatabaseManager:
+    """Versão assíncrona do DatabaseManager, usada pelas rotas do modo ASGI
+
+    Cada método público do DatabaseManager existe aqui como corrotina
+    (``await adb.search_events('rio')``), com o mesmo SQL, cache e métricas.
+    As chamadas rodam em um pool de threads do tamanho do pool de conexões:
+    o loop de eventos mantém milhares de requisições abertas, no máximo
+    ``max_workers`` consultas usam o banco ao mesmo tempo e as demais
+    esperam na fila sem ocupar thread nem conexão. É o que aioodbc e
+    aiosqlite fazem por baixo (os drivers ODBC e SQLite são bloqueantes),
+    sem duplicar o SQL em uma segunda implementação.
+    """
+
+    def __init__(self, manager: DatabaseManager, max_workers: Optional[int] = None):
+        self.manager = manager
+        self.runner = ThreadRunner(max_workers or manager.pool.max_size, 'db-async')
+        self.run = self.runner.run
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.manager, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        async def method(*args, **kwargs):
+            return await self.run(attribute, *args, **kwargs)
+
+        method.__name__ = name
+        method.__doc__ = attribute.__doc__
+        # Próximos acessos não passam por __getattr__
+        self.__dict__[name] = method
+        return method
+
+    def shutdown(self):
+        self.runner.shutdown()
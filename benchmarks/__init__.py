@@ -0,0 +1,5 @@
+"""Benchmarks dos caminhos críticos do PhotoCap
+
+Executados com ``python -m benchmarks`` a partir da raiz do projeto, sem
+SQL Server: o DatabaseManager usa o backend SQLite em uma pasta temporária.
+"""
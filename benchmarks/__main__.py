@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+
+from benchmarks import bench_db, bench_faces, bench_password
+from benchmarks.harness import Suite, append_history, compare, load_history, load_thresholds, new_run
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODULES = {'db': bench_db, 'password': bench_password, 'faces': bench_faces}
+
+
+def _format_seconds(seconds):
+    if seconds >= 1:
+        return f'{seconds:.2f}s'
+    return f'{seconds * 1000:.2f}ms'
+
+
+def _report(name, result):
+    rate = f"  {result['items_per_sec']:,.0f} itens/s" if result.get('items_per_sec') else ''
+    print(f"{name:<45} {_format_seconds(result['median']):>10}{rate}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmarks do PhotoCap')
+    parser.add_argument('--quick', action='store_true', help='tamanhos menores (CI, verificação rápida)')
+    parser.add_argument('--only', choices=sorted(MODULES), action='append', help='grupos a executar')
+    parser.add_argument('--filter', help='executa só os casos cujo nome contém este texto')
+    parser.add_argument('--history', default=os.path.join(HERE, 'history.jsonl'), help='histórico (JSON Lines)')
+    parser.add_argument('--thresholds', default=os.path.join(HERE, 'thresholds.json'))
+    parser.add_argument('--no-save', action='store_true', help='não grava esta execução no histórico')
+    args = parser.parse_args(argv)
+
+    suite = Suite(quick=args.quick)
+    for name in args.only or MODULES:
+        MODULES[name].register(suite)
+    results = suite.run(args.filter, report=_report)
+
+    run = new_run(results, args.quick)
+    rows = compare(run, load_history(args.history), load_thresholds(args.thresholds))
+    regressions = [row for row in rows if row['regression']]
+    compared = [row for row in rows if row['baseline'] is not None]
+    if compared:
+        print(f"\nComparação com as últimas execuções em {run['machine']}:")
+        for row in compared:
+            flag = '  REGRESSÃO' if row['regression'] else ''
+            print(f"{row['name']:<45} {_format_seconds(row['baseline']):>10} -> "
+                  f"{_format_seconds(row['median']):>10} ({row['change']:+.1%}, limite +{row['threshold']:.0%}){flag}")
+    else:
+        print('\nSem execuções anteriores nesta máquina para comparar.')
+
+    if not args.no_save:
+        append_history(args.history, run)
+        print(f'Resultados gravados em {args.history}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Materialização de linhas e gravação de fotos no DatabaseManager (SQLite local)"""
+import itertools
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from db_backends import SQLiteBackend
+from db_manager import DatabaseManager
+
+# Lote usado na ingestão (INGEST_CONFIG['batch_size'])
+BATCH_SIZE = 50
+
+_hashes = itertools.count()
+
+
+def _content_hash() -> str:
+    # Hash fictício, único no processo (64 caracteres hexadecimais, como o SHA-256)
+    return f'{next(_hashes):064x}'
+
+
+def _photo_items(count: int):
+    taken_at = datetime(2024, 1, 1)
+    return [{
+        'filename': f'foto_{i}.jpg',
+        'content_hash': _content_hash(),
+        'size': 2_500_000,
+        'width': 4000,
+        'height': 3000,
+        'taken_at': taken_at + timedelta(seconds=i)
+    } for i in range(count)]
+
+
+def _seed_events(manager: DatabaseManager, count: int):
+    start = datetime(2020, 1, 1)
+    rows = [(f'Evento {i}', (start + timedelta(days=i % 2000)).strftime('%Y-%m-%d')) for i in range(count)]
+    with manager.get_connection() as conn:
+        manager.backend.executemany(conn.cursor(), "INSERT INTO Events (Name, Date) VALUES (?, ?)", rows)
+
+
+def _seed_photos(manager: DatabaseManager, event_id: int, count: int):
+    for start in range(0, count, 5000):
+        manager.save_photos_bulk(event_id, _photo_items(min(5000, count - start)))
+
+
+def _new_manager(folder: str, name: str) -> DatabaseManager:
+    manager = DatabaseManager(backend=SQLiteBackend(sqlite_path=os.path.join(folder, f'{name}.db')))
+    if not manager.test_connection():
+        raise RuntimeError(f'Não foi possível criar o banco {name}')
+    return manager
+
+
+def register(suite):
+    folder = tempfile.mkdtemp(prefix='photocap-bench-')
+    suite.on_cleanup(lambda: shutil.rmtree(folder, ignore_errors=True))
+    sizes = [1_000, 10_000] if suite.quick else [1_000, 100_000]
+
+    # Leituras: um banco por tamanho, com N eventos e um evento com N fotos
+    for size in sizes:
+        manager = _new_manager(folder, f'read_{size}')
+        _seed_events(manager, size)
+        event_id = manager.create_event('Evento com fotos', '2024-01-01')
+        _seed_photos(manager, event_id, size)
+        suite.on_cleanup(manager.close)
+
+        suite.add(f'db.get_all_events[{size}]',
+                  lambda _, m=manager: m.get_all_events(), items=size + 1)
+        suite.add(f'db.get_photos_by_event[{size}]',
+                  lambda _, m=manager, e=event_id: m.get_photos_by_event(e), items=size)
+        suite.add(f'db.get_photos_page[{size}]',
+                  lambda _, m=manager, e=event_id: m.get_photos_page(e, 60), items=60)
+
+    # Gravação: a mesma quantidade de fotos, uma a uma e em lotes
+    count = 100 if suite.quick else 500
+    manager = _new_manager(folder, 'write')
+    suite.on_cleanup(manager.close)
+
+    def new_event():
+        return manager.create_event('Upload', '2024-01-01'), _photo_items(count)
+
+    def one_by_one(state):
+        event_id, items = state
+        for item in items:
+            manager.save_photo(event_id, item['filename'], content_hash=item['content_hash'],
+                               width=item['width'], height=item['height'], taken_at=item['taken_at'])
+
+    def bulk(state):
+        event_id, items = state
+        for start in range(0, len(items), BATCH_SIZE):
+            manager.save_photos_bulk(event_id, items[start:start + BATCH_SIZE])
+
+    suite.add(f'db.save_photo[{count}]', one_by_one, setup=new_event, items=count)
+    suite.add(f'db.save_photos_bulk[{count}]', bulk, setup=new_event, items=count)
@@ -0,0 +1,28 @@
+"""Comparação de uma selfie com os embeddings de faces (busca exata vetorizada)"""
+import numpy as np
+
+from face_engine import FaceEngine, match_embeddings, normalize_rows
+
+THRESHOLD = 0.7
+
+
+def register(suite):
+    # Dimensão e descritor configurados (LBP uniforme por padrão, SFace com
+    # PHOTOCAP_FACE_MODEL); o descritor entra no nome para o histórico não
+    # comparar medições de dimensões diferentes
+    engine = FaceEngine()
+    dimension = engine.dimension
+    rng = np.random.default_rng(42)
+    sizes = [10_000, 100_000] if suite.quick else [10_000, 1_000_000]
+    query = normalize_rows(rng.standard_normal((1, dimension), dtype=np.float32))
+
+    for size in sizes:
+        embeddings = normalize_rows(rng.standard_normal((size, dimension), dtype=np.float32))
+        # Algumas faces da mesma pessoa, para o corte e a ordenação terem trabalho
+        matches = rng.choice(size, 50, replace=False)
+        embeddings[matches] = normalize_rows(query + 0.3 * rng.standard_normal((50, dimension), dtype=np.float32))
+        photo_ids = np.arange(size, dtype=np.int64) // 3
+
+        suite.add(f'faces.match_embeddings[{engine.descriptor}/{size}]',
+                  lambda _, e=embeddings, p=photo_ids: match_embeddings(query, e, p, THRESHOLD, limit=200),
+                  items=size)
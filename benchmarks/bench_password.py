@@ -0,0 +1,32 @@
+"""Vazão de verify_password: na própria thread e no pool de processos"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from config import PASSWORD_CONFIG
+from password_hasher import PasswordHasher
+
+PASSWORD = 'senha-de-teste-123'
+
+
+def register(suite):
+    iterations = PASSWORD_CONFIG['iterations']
+    count = 8 if suite.quick else 32
+    # Logins simultâneos, como as threads de um worker do gunicorn
+    clients = 8
+
+    inline = PasswordHasher(iterations, workers=0)
+    stored_hash, salt, _ = inline.hash(PASSWORD)
+    suite.add(f'password.verify_inline[{iterations}]',
+              lambda _: [inline.verify(PASSWORD, stored_hash, salt, iterations) for _ in range(count)],
+              items=count)
+
+    workers = max(1, min(PASSWORD_CONFIG['workers'] or 2, os.cpu_count() or 1))
+    pool = PasswordHasher(iterations, workers=workers, max_pending=count)
+    pool.verify(PASSWORD, stored_hash, salt, iterations)  # Sobe os processos fora da medição
+    suite.on_cleanup(pool.shutdown)
+
+    def concurrent(_):
+        with ThreadPoolExecutor(clients) as threads:
+            list(threads.map(lambda _: pool.verify(PASSWORD, stored_hash, salt, iterations), range(count)))
+
+    suite.add(f'password.verify_pool[{iterations}x{workers}]', concurrent, items=count)
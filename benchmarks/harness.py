@@ -0,0 +1,150 @@
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Execuções anteriores comparáveis usadas como referência (mesma máquina e modo)
+BASELINE_RUNS = 5
+
+
+class Case:
+    """Um benchmark: ``run`` é medido ``repeat`` vezes, após ``setup`` (não medido)"""
+
+    def __init__(self, name: str, run: Callable[[Any], Any], setup: Optional[Callable[[], Any]] = None,
+                 repeat: int = 5, items: Optional[int] = None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.repeat = repeat
+        self.items = items
+
+    def measure(self) -> Dict[str, Any]:
+        timings = []
+        for _ in range(self.repeat):
+            state = self.setup() if self.setup else None
+            gc.collect()
+            started = time.perf_counter()
+            self.run(state)
+            timings.append(time.perf_counter() - started)
+        median = statistics.median(timings)
+        result = {'median': median, 'min': min(timings), 'max': max(timings), 'repeat': self.repeat}
+        if self.items:
+            result['items'] = self.items
+            result['items_per_sec'] = self.items / median if median else None
+        return result
+
+
+class Suite:
+    """Casos registrados pelos módulos bench_*, executados em ordem"""
+
+    def __init__(self, quick: bool = False):
+        self.quick = quick
+        self.cases: List[Case] = []
+        self._cleanups: List[Callable[[], None]] = []
+
+    def add(self, name: str, run: Callable[[Any], Any], setup: Optional[Callable[[], Any]] = None,
+            repeat: int = 5, items: Optional[int] = None):
+        self.cases.append(Case(name, run, setup, repeat, items))
+
+    def on_cleanup(self, callback: Callable[[], None]):
+        self._cleanups.append(callback)
+
+    def run(self, name_filter: Optional[str] = None, report: Callable[[str, Dict[str, Any]], None] = None
+            ) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        try:
+            for case in self.cases:
+                if name_filter and name_filter not in case.name:
+                    continue
+                results[case.name] = case.measure()
+                if report:
+                    report(case.name, results[case.name])
+        finally:
+            for callback in reversed(self._cleanups):
+                callback()
+        return results
+
+
+def machine_id() -> str:
+    """Identifica a máquina: só execuções na mesma máquina são comparadas"""
+    return f'{platform.system()}-{platform.machine()}-{os.cpu_count()}cpu-py{platform.python_version()}'
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit, 'dirty': dirty}
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    """Execuções gravadas, uma por linha (JSON Lines)"""
+    if not os.path.exists(path):
+        return []
+    runs = []
+    with open(path) as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                runs.append(json.loads(line))
+    return runs
+
+
+def append_history(path: str, run: Dict[str, Any]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as handle:
+        handle.write(json.dumps(run, sort_keys=True) + '\n')
+
+
+def new_run(results: Dict[str, Dict[str, Any]], quick: bool) -> Dict[str, Any]:
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machine': machine_id(),
+        'quick': quick,
+        **git_revision(),
+        'results': results
+    }
+
+
+def load_thresholds(path: str) -> Dict[str, float]:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def threshold_for(name: str, thresholds: Dict[str, float]) -> float:
+    """Maior aumento aceito da mediana; o prefixo mais longo de ``name`` vence"""
+    matches = [prefix for prefix in thresholds if prefix != 'default' and name.startswith(prefix)]
+    if matches:
+        return thresholds[max(matches, key=len)]
+    return thresholds.get('default', 0.2)
+
+
+def compare(run: Dict[str, Any], history: List[Dict[str, Any]], thresholds: Dict[str, float]
+            ) -> List[Dict[str, Any]]:
+    """Compara cada caso com a mediana das últimas execuções comparáveis
+
+    Retorna uma linha por caso com a referência, a variação e se passou do limite.
+    """
+    previous = [past for past in history
+                if past['machine'] == run['machine'] and past['quick'] == run['quick']][-BASELINE_RUNS:]
+    rows = []
+    for name, result in run['results'].items():
+        values = [past['results'][name]['median'] for past in previous if name in past['results']]
+        row = {'name': name, 'median': result['median'], 'baseline': None, 'change': None,
+               'threshold': threshold_for(name, thresholds), 'regression': False}
+        if values:
+            baseline = statistics.median(values)
+            row['baseline'] = baseline
+            row['change'] = result['median'] / baseline - 1 if baseline else None
+            row['regression'] = row['change'] is not None and row['change'] > row['threshold']
+        rows.append(row)
+    return rows
@@ -0,0 +1,523 @@
+"""Teste de carga de um dia de evento contra a aplicação real
+
+Simula a manhã seguinte a uma corrida: clientes chegam em rajada
+(``--ramp``), fazem login, buscam o evento pelo nome, percorrem a galeria e
+parte deles faz a busca facial, enquanto fotógrafos continuam enviando lotes
+de fotos. Também reproduz logs de acesso gravados (``--replay``) no ritmo
+original ou acelerado. Relata p50/p95/p99 por rota e vazão por worker.
+
+Sem ``--url``, cada worker cria a aplicação com ``create_app()`` em processo,
+sobre um banco SQLite local em uma pasta temporária (ou ``--db``); com
+``--url``, as requisições vão para um servidor em execução.
+
+    python -m benchmarks.loadtest --users 200 --ramp 10 --duration 60 --workers 4
+    python -m benchmarks.loadtest --replay access.log --speed 10 --db copia.db --no-seed
+"""
+import argparse
+import html
+import http.cookiejar
+import io
+import json
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PASSWORD = 'carga-123'
+CITIES = ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Curitiba', 'Porto Alegre', 'Florianópolis',
+          'Brasília', 'Recife']
+
+# Linha de log no formato "combined" (nginx, Apache, gunicorn --access-logformat padrão)
+LOG_LINE = re.compile(r'\[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+) [^"]*" (?P<status>\d{3})')
+LOG_TIME_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+
+_NUMBER = re.compile(r'/\d+(?=/|$)')
+_HASH = re.compile(r'/[0-9a-f]{32,64}(?=[./]|$)')
+
+
+def label_for(method: str, path: str) -> str:
+    """Rota agrupada: sem query string, com IDs e hashes trocados por marcadores"""
+    path = urllib.parse.urlsplit(path).path
+    path = _HASH.sub('/<hash>', _NUMBER.sub('/<id>', path))
+    return f'{method} {path}'
+
+
+# Clientes
+
+class AppClient:
+    """Cliente WSGI em processo (cookies por usuário virtual)"""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, data: Optional[Dict[str, Any]] = None,
+                files: Optional[Dict[str, List[Tuple[str, bytes]]]] = None) -> Tuple[int, str, str]:
+        if files:
+            data = dict(data or {})
+            for field, items in files.items():
+                data[field] = [(io.BytesIO(content), filename) for filename, content in items]
+            response = self._client.open(path, method=method, data=data, content_type='multipart/form-data')
+        else:
+            response = self._client.open(path, method=method, data=data)
+        return response.status_code, response.get_data(as_text=True), response.headers.get('Location', '')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPClient:
+    """Cliente HTTP para um servidor em execução (``--url``)"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method: str, path: str, data: Optional[Dict[str, Any]] = None,
+                files: Optional[Dict[str, List[Tuple[str, bytes]]]] = None) -> Tuple[int, str, str]:
+        """(status, corpo, Location); redirecionamentos não são seguidos"""
+        headers = {}
+        body = None
+        if files:
+            boundary = uuid.uuid4().hex
+            body = _multipart(boundary, data or {}, files)
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        request = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        try:
+            with self._opener.open(request, timeout=60) as response:
+                return response.status, response.read().decode('utf-8', 'replace'), ''
+        except urllib.error.HTTPError as e:
+            # Com _NoRedirect, os 3xx também chegam aqui
+            return e.code, e.read().decode('utf-8', 'replace'), e.headers.get('Location', '')
+
+
+def _multipart(boundary: str, fields: Dict[str, Any], files: Dict[str, List[Tuple[str, bytes]]]) -> bytes:
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, items in files.items():
+        for filename, content in items:
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                         f'Content-Type: image/jpeg\r\n\r\n'.encode() + content + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts)
+
+
+# Medição
+
+class Recorder:
+    """Latências das requisições de um worker
+
+    Cada registro é (rota, segundos, status, ok). Falha de rede ou 5xx é
+    erro; com ``expect``, qualquer status fora da lista também (ex.: um login
+    recusado volta com 200 e o formulário, não com o 302 do sucesso).
+    """
+
+    def __init__(self):
+        self.records: List[Tuple[str, float, int, bool]] = []
+        self._lock = threading.Lock()
+
+    def call(self, client, method: str, path: str, label: Optional[str] = None,
+             expect: Optional[Iterable[int]] = None, **kwargs) -> Tuple[int, str, str]:
+        started = time.perf_counter()
+        try:
+            response = client.request(method, path, **kwargs)
+        except Exception:
+            response = (0, '', '')
+        elapsed = time.perf_counter() - started
+        status = response[0]
+        ok = 0 < status < 500 and (expect is None or status in expect)
+        with self._lock:
+            self.records.append((label or label_for(method, path), elapsed, status, ok))
+        return response
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil pelo posto mais próximo"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(worker_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    by_label = defaultdict(list)
+    errors = defaultdict(int)
+    for result in worker_results:
+        for label, seconds, status, ok in result['records']:
+            by_label[label].append(seconds)
+            if not ok:
+                errors[label] += 1
+    wall = max((result['wall'] for result in worker_results), default=0) or 1e-9
+
+    endpoints = {}
+    for label, values in sorted(by_label.items()):
+        values.sort()
+        endpoints[label] = {
+            'count': len(values),
+            'errors': errors[label],
+            'rps': len(values) / wall,
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': values[-1] * 1000
+        }
+    total = sum(len(result['records']) for result in worker_results)
+    return {
+        'wall_seconds': wall,
+        'requests': total,
+        'rps': total / wall,
+        'workers': [{'worker': result['worker'], 'requests': len(result['records']),
+                     'rps': len(result['records']) / (result['wall'] or 1e-9)} for result in worker_results],
+        'endpoints': endpoints
+    }
+
+
+def print_report(summary: Dict[str, Any]):
+    print(f"\n{'rota':<48} {'n':>7} {'erros':>6} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, row in summary['endpoints'].items():
+        print(f"{label[:48]:<48} {row['count']:>7} {row['errors']:>6} {row['rps']:>8.1f} "
+              f"{row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms")
+    print(f"\n{summary['requests']} requisições em {summary['wall_seconds']:.1f}s: {summary['rps']:.1f} req/s")
+    for worker in summary['workers']:
+        print(f"  worker {worker['worker']}: {worker['requests']} requisições, {worker['rps']:.1f} req/s")
+
+
+# Dados de carga
+
+def jpeg_bytes(seed: int, size: Tuple[int, int] = (800, 600)) -> bytes:
+    """Foto sintética única (o PhotoStore descarta conteúdo repetido)"""
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (size[1] // 8, size[0] // 8, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels).resize(size)
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=85)
+    return output.getvalue()
+
+
+def customer_email(index: int) -> str:
+    return f'cliente{index}@carga.local'
+
+
+def photographer_email(index: int) -> str:
+    return f'fotografo{index}@carga.local'
+
+
+def login(recorder: Recorder, client, email: str) -> bool:
+    """Faz login; True se a aplicação redirecionou (sucesso), False se recusou"""
+    recorder.call(client, 'GET', '/auth/login')
+    status, _, _ = recorder.call(client, 'POST', '/auth/login', expect=(302,),
+                                 data={'email': email, 'password': PASSWORD})
+    return status == 302
+
+
+def login_or_exit(client, email: str):
+    """Login da preparação: sem ele a carga mediria páginas de visitante"""
+    if not login(Recorder(), client, email):
+        raise SystemExit(f'Login de {email} recusado: a carga foi interrompida')
+
+
+def event_ids(client) -> List[int]:
+    """EventIds do fotógrafo logado (lista do formulário de upload)"""
+    _, body, _ = client.request('GET', '/events/upload_photos')
+    return sorted({int(value) for value in re.findall(r'<option value="(\d+)"', body)})
+
+
+def upload_batch(recorder: Recorder, client, event_id: int, count: int, seed: int) -> Optional[str]:
+    """Envia ``count`` fotos novas; devolve o job de processamento, se aceito"""
+    files = {'photos': [(f'IMG_{seed}_{i}.jpg', jpeg_bytes(seed * 1000 + i)) for i in range(count)]}
+    _, _, location = recorder.call(client, 'POST', '/events/upload_photos', data={'event_id': event_id},
+                                   files=files)
+    job = urllib.parse.parse_qs(urllib.parse.urlsplit(location).query).get('job')
+    return job[0] if job else None
+
+
+def wait_for_jobs(client, jobs: List[str], timeout: float = 600):
+    """Aguarda o processamento em segundo plano dos uploads da preparação"""
+    deadline = time.monotonic() + timeout
+    pending = list(jobs)
+    while pending and time.monotonic() < deadline:
+        status, body, _ = client.request('GET', f'/events/upload_status/{pending[0]}')
+        try:
+            done = status != 200 or json.loads(body).get('status') == 'done'
+        except ValueError:
+            done = True
+        if done:
+            pending.pop(0)
+        else:
+            time.sleep(0.2)
+
+
+def prepare(client_factory, args) -> List[int]:
+    """Cria fotógrafos, clientes, eventos e fotos pela própria aplicação"""
+    recorder = Recorder()
+    print(f'Criando {args.events} eventos com {args.photos} fotos e {args.users} clientes...', flush=True)
+    for index in range(args.photographers):
+        client = client_factory()
+        client.request('POST', '/auth/register/photographer', data={
+            'full_name': f'Fotógrafo {index}', 'email': photographer_email(index), 'phone': '11999999999',
+            'password': PASSWORD, 'password_confirm': PASSWORD, 'terms_accepted': 'on'})
+    for index in range(args.users):
+        client_factory().request('POST', '/auth/register', data={
+            'full_name': f'Cliente {index}', 'email': customer_email(index), 'phone': '11999999999',
+            'password': PASSWORD, 'password_confirm': PASSWORD, 'terms_accepted': 'on'})
+
+    client = client_factory()
+    login_or_exit(client, photographer_email(0))
+    for index in range(args.events):
+        client.request('POST', '/events/create_event', data={
+            'event_name': f'Corrida {CITIES[index % len(CITIES)]} {2024 + index // len(CITIES)}',
+            'event_date': f'{2024 + index // len(CITIES)}-0{1 + index % 9}-15'})
+    ids = event_ids(client)
+    jobs = []
+    for event_id in ids:
+        for start in range(0, args.photos, 20):
+            job = upload_batch(recorder, client, event_id, min(20, args.photos - start), event_id * 100 + start)
+            if job:
+                jobs.append(job)
+    wait_for_jobs(client, jobs)
+    return ids
+
+
+# Cenários
+
+def customer_session(recorder: Recorder, client, index: int, ids: List[int], args, stop_at: float,
+                     selfie: bytes, rng: random.Random):
+    """Um cliente: login, busca pelo nome, galeria e, às vezes, busca facial"""
+    if not login(recorder, client, customer_email(index % max(1, args.users))):
+        # Contado como erro do POST /auth/login; não navega como visitante
+        return
+    while time.monotonic() < stop_at:
+        city = rng.choice(CITIES)
+        recorder.call(client, 'GET', '/search/?' + urllib.parse.urlencode({'event_name': city.lower()}))
+        think(args, rng)
+        event_id = rng.choice(ids)
+        _, body, _ = recorder.call(client, 'GET', f'/search/event/{event_id}')
+        # As páginas seguintes vêm da rolagem infinita (data-url do "Carregar mais")
+        next_url = re.search(r'data-url="([^"]+)"', body)
+        next_url = html.unescape(next_url.group(1)) if next_url else None
+        for _ in range(args.pages - 1):
+            if not next_url:
+                break
+            think(args, rng)
+            _, body, _ = recorder.call(client, 'GET', next_url)
+            try:
+                next_url = json.loads(body).get('next_url')
+            except ValueError:
+                next_url = None
+        if rng.random() < args.face_rate:
+            think(args, rng)
+            recorder.call(client, 'POST', '/search/face_search', data={'scope': 'event', 'event_id': event_id},
+                          files={'face_photo': [('selfie.jpg', selfie)]})
+        think(args, rng)
+
+
+def photographer_session(recorder: Recorder, client, index: int, ids: List[int], args, stop_at: float,
+                         rng: random.Random):
+    """Um fotógrafo enviando lotes durante o evento"""
+    if not login(recorder, client, photographer_email(index % max(1, args.photographers))):
+        return
+    batch = 0
+    while time.monotonic() < stop_at:
+        upload_batch(recorder, client, rng.choice(ids), args.batch, 10_000_000 + index * 10_000 + batch)
+        batch += 1
+        time.sleep(args.upload_interval)
+
+
+def think(args, rng: random.Random):
+    if args.think > 0:
+        time.sleep(rng.uniform(0, 2 * args.think / 1000))
+
+
+def read_access_log(path: str, methods: Iterable[str] = ('GET', 'HEAD')) -> List[Tuple[float, str, str]]:
+    """(segundos desde a primeira linha, método, caminho) das linhas reproduzíveis
+
+    Só GET/HEAD são reproduzidos: os logs não guardam o corpo dos POSTs.
+    """
+    entries = []
+    with open(path, errors='replace') as handle:
+        for line in handle:
+            match = LOG_LINE.search(line)
+            if not match or match.group('method') not in methods:
+                continue
+            stamp = datetime.strptime(match.group('time'), LOG_TIME_FORMAT).timestamp()
+            entries.append((stamp, match.group('method'), match.group('path')))
+    entries.sort()
+    if not entries:
+        return []
+    first = entries[0][0]
+    return [(stamp - first, method, path) for stamp, method, path in entries]
+
+
+def replay(recorder: Recorder, client_factory, entries: List[Tuple[float, str, str]], args):
+    """Envia cada linha no instante original dividido por ``--speed``"""
+    local = threading.local()
+    started = time.monotonic()
+    lock = threading.Lock()
+    position = [0]
+
+    def sender(index):
+        local.client = client_factory()
+        if args.replay_login and not login(recorder, local.client, customer_email(index % max(1, args.users))):
+            return
+        while True:
+            with lock:
+                if position[0] >= len(entries):
+                    return
+                offset, method, path = entries[position[0]]
+                position[0] += 1
+            delay = started + offset / args.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            recorder.call(local.client, method, path)
+
+    threads = [threading.Thread(target=sender, args=(i,)) for i in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+# Workers
+
+def _open_app(args):
+    """(fábrica de clientes, aplicação em processo ou None com ``--url``)"""
+    if args.url:
+        return (lambda: HTTPClient(args.url)), None
+    from app import create_app
+    app = create_app()
+    return (lambda: AppClient(app)), app
+
+
+def _close_app(app):
+    # Os processos do pool de senhas são filhos não-daemon: sem isso o worker não termina
+    if app is not None:
+        app.extensions['password_hasher'].shutdown()
+
+
+def run_worker(worker: int, args, ids: List[int], entries, results):
+    factory, app = _open_app(args)
+    recorder = Recorder()
+    rng = random.Random(worker)
+    started = time.monotonic()
+
+    if entries is not None:
+        # Cada worker reproduz as linhas que lhe cabem (intercaladas)
+        replay(recorder, factory, entries[worker::args.workers], args)
+    else:
+        selfie = open(args.selfie, 'rb').read() if args.selfie else jpeg_bytes(424242, (480, 640))
+        stop_at = started + args.ramp + args.duration
+        threads = []
+        users = range(worker, args.users, args.workers)
+        for index in users:
+            # Chegada em rajada: todos os clientes começam dentro de --ramp segundos
+            delay = rng.uniform(0, args.ramp)
+            threads.append(threading.Timer(delay, customer_session, (
+                recorder, factory(), index, ids, args, stop_at, selfie, random.Random(index))))
+        for index in range(worker, args.photographers, args.workers):
+            threads.append(threading.Thread(target=photographer_session, args=(
+                recorder, factory(), index, ids, args, stop_at, random.Random(-index - 1))))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    wall = time.monotonic() - started
+    _close_app(app)
+    results.put({'worker': worker, 'records': recorder.records, 'wall': wall})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest', description=__doc__.split('\n')[0])
+    parser.add_argument('--url', help='servidor em execução (padrão: aplicação em processo)')
+    parser.add_argument('--db', help='arquivo SQLite a usar em vez de um banco temporário novo')
+    parser.add_argument('--no-seed', action='store_true', help='não cria usuários, eventos e fotos')
+    parser.add_argument('--workers', type=int, default=1, help='processos, como os workers do gunicorn')
+    parser.add_argument('--users', type=int, default=50, help='clientes simultâneos (ou threads do replay)')
+    parser.add_argument('--photographers', type=int, default=2)
+    parser.add_argument('--events', type=int, default=8)
+    parser.add_argument('--photos', type=int, default=120, help='fotos por evento na preparação')
+    parser.add_argument('--ramp', type=float, default=5, help='segundos em que todos os clientes chegam')
+    parser.add_argument('--duration', type=float, default=30, help='segundos de carga após a chegada')
+    parser.add_argument('--think', type=float, default=500, help='pausa média entre cliques (ms)')
+    parser.add_argument('--pages', type=int, default=3, help='páginas da galeria vistas por evento')
+    parser.add_argument('--face-rate', type=float, default=0.2, help='fração das visitas com busca facial')
+    parser.add_argument('--selfie', help='foto com um rosto para a busca facial (padrão: imagem sintética)')
+    parser.add_argument('--batch', type=int, default=10, help='fotos por lote de upload dos fotógrafos')
+    parser.add_argument('--upload-interval', type=float, default=5, help='segundos entre lotes de upload')
+    parser.add_argument('--replay', help='log de acesso (formato combined) a reproduzir')
+    parser.add_argument('--speed', type=float, default=1, help='aceleração do replay (10 = 10x mais rápido)')
+    parser.add_argument('--replay-login', action='store_true', help='reproduz logado como cliente')
+    parser.add_argument('--json', help='grava o resumo neste arquivo')
+    args = parser.parse_args(argv)
+
+    for name in ('db', 'selfie', 'replay', 'json'):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    folder = None
+    if not args.url:
+        folder = tempfile.mkdtemp(prefix='photocap-load-')
+        os.environ['PHOTOCAP_DB_BACKEND'] = 'sqlite'
+        os.environ['PHOTOCAP_SQLITE_PATH'] = args.db or os.path.join(folder, 'load.db')
+        os.environ.setdefault('PHOTOCAP_LOG_LEVEL', 'WARNING')
+        # uploads/, face_index/ e caches relativos ficam na pasta temporária
+        os.chdir(folder)
+
+    try:
+        entries = read_access_log(args.replay) if args.replay else None
+        ids = []
+        if not args.no_seed or entries is None:
+            factory, app = _open_app(args)
+            if not args.no_seed:
+                ids = prepare(factory, args)
+            else:
+                client = factory()
+                login_or_exit(client, photographer_email(0))
+                ids = event_ids(client)
+            _close_app(app)
+        if entries is None and not ids:
+            parser.error('nenhum evento para a carga')
+
+        # Processos novos, não cópias deste: a preparação já criou threads e o pool de hash de senhas
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        processes = [context.Process(target=run_worker, args=(worker, args, ids, entries, results))
+                     for worker in range(args.workers)]
+        print(f'Carga com {args.workers} worker(s)...', flush=True)
+        for process in processes:
+            process.start()
+        worker_results = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        summary = summarize(sorted(worker_results, key=lambda result: result['worker']))
+        print_report(summary)
+        if args.json:
+            with open(args.json, 'w') as handle:
+                json.dump(summary, handle, indent=2)
+    finally:
+        if folder:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
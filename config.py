@@ -3,8 +3,10 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-# Configurações do Banco de Dados SQL Server
+# Configurações do Banco de Dados
 DB_CONFIG = {
+    'backend': os.getenv('PHOTOCAP_DB_BACKEND', 'sqlserver'),  # 'sqlserver' ou 'sqlite' (local/CI/benchmarks)
+    'sqlite_path': os.getenv('PHOTOCAP_SQLITE_PATH', 'photocap.db'),  # Arquivo usado pelo backend SQLite
     'server': 'DESKTOP-R2179A0\\SQLEXPRESS',  # Endereço do servidor SQL Server Express
     'database': 'PhotoCap',       # Nome do banco de dados
     'username': '',              # Vazio para autenticação Windows
@@ -13,20 +15,161 @@ DB_CONFIG = {
     'trusted_connection': 'yes'  # Usar autenticação Windows
 }
 
+# Configurações do pool de conexões (por processo/worker do gunicorn)
+DB_POOL_CONFIG = {
+    'max_size': int(os.getenv('PHOTOCAP_DB_POOL_SIZE', 10)),  # Máximo de conexões abertas
+    'idle_timeout': 300,           # Segundos até fechar uma conexão ociosa
+    'health_check_interval': 30,   # Testa conexões paradas há mais que isso antes de usar
+    'acquire_timeout': 30          # Segundos de espera por uma conexão livre
+}
+
 # Configurações da Aplicação Flask
 APP_CONFIG = {
-    'SECRET_KEY': 'sua_chave_secreta_aqui',  # Chave secreta para sessões
+    'SECRET_KEY': os.getenv('PHOTOCAP_SECRET_KEY'),  # Chave das sessões. Padrão: gerada em instance/secret_key
     'UPLOAD_FOLDER': 'uploads',              # Pasta para uploads
-    'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # Tamanho máximo de upload (16MB)
+    'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # Tamanho máximo de requisição (16MB), exceto upload de fotos
+    'MAX_FILE_SIZE': int(os.getenv('PHOTOCAP_MAX_FILE_SIZE', 64 * 1024 * 1024)),  # Por foto, no upload em streaming
+    # Entrega de arquivos pelo servidor web na frente do Flask (nenhum por padrão)
+    'USE_X_SENDFILE': os.getenv('PHOTOCAP_X_SENDFILE', '').lower() in ('1', 'true', 'yes'),  # Apache/lighttpd
+    'X_ACCEL_PREFIX': os.getenv('PHOTOCAP_X_ACCEL_PREFIX', ''),  # nginx: location internal, ex.: /_files/
+    'X_ACCEL_ROOT': os.getenv('PHOTOCAP_X_ACCEL_ROOT'),  # Pasta mapeada pelo prefixo. Padrão: UPLOAD_FOLDER
+    'PHOTOS_PER_PAGE': 60,                   # Fotos por página na galeria do evento
+    'EVENTS_PER_PAGE': 12,                   # Eventos por página na área do fotógrafo
+    'RECENT_EVENTS': 6,                      # Eventos recentes na página inicial
+    'UPLOAD_EVENTS': 100,                    # Eventos mais recentes listados no formulário de upload
+    'FACE_SEARCH_EVENTS': 100,               # Eventos mais recentes listados na busca facial
     'ALLOWED_EXTENSIONS': {'png', 'jpg', 'jpeg', 'gif', 'bmp'}  # Extensões permitidas
 }
 
+# Registros (logging)
+LOGGING_CONFIG = {
+    'level': os.getenv('PHOTOCAP_LOG_LEVEL', 'INFO'),  # DEBUG, INFO, WARNING (alto volume), ERROR
+    'format': os.getenv('PHOTOCAP_LOG_FORMAT', 'text'),  # 'text' ou 'json' (uma linha por registro)
+    'queue_size': 10000          # Registros aguardando escrita; acima disso são descartados
+}
+
+# Métricas (/metrics no formato do Prometheus) e cabeçalho Server-Timing
+METRICS_CONFIG = {
+    'enabled': os.getenv('PHOTOCAP_METRICS', '1').lower() in ('1', 'true', 'yes'),
+    'server_timing': True,       # Tempos de banco, templates e total em cada resposta
+    'shared_dir': os.getenv('PHOTOCAP_METRICS_DIR'),  # Resumos dos workers. Padrão: <UPLOAD_FOLDER>/metrics
+    'export_interval': 5         # Segundos entre gravações do resumo de cada worker
+}
+
+# Perfil das requisições lentas por amostragem das pilhas (desligado com 0)
+PROFILER_CONFIG = {
+    'threshold_ms': int(os.getenv('PHOTOCAP_PROFILE_SLOW_MS', 0)),  # Grava o perfil a partir desta duração
+    'sample_rate': float(os.getenv('PHOTOCAP_PROFILE_SAMPLE_RATE', 0.1)),  # Fração das requisições amostradas
+    'interval_ms': 5,            # Intervalo entre amostras da pilha
+    'folder': os.getenv('PHOTOCAP_PROFILE_DIR'),  # Padrão: <UPLOAD_FOLDER>/profiles
+    'keep': 50                   # Perfis mantidos (os mais antigos são apagados)
+}
+
+# Sessões de login
+SESSION_CONFIG = {
+    # 'cookie': cookie assinado com os dados da sessão, sem E/S no servidor (padrão)
+    # 'sqlite': dados no servidor, em um arquivo SQLite local comum aos workers
+    # 'filesystem': Flask-Session em arquivos (comportamento antigo)
+    'backend': os.getenv('PHOTOCAP_SESSION', 'cookie'),
+    'path': os.getenv('PHOTOCAP_SESSION_PATH', 'flask_session/sessions.db'),  # Backend 'sqlite'
+    'lifetime': 1800,            # Segundos sem uso até a sessão expirar
+    'sweep_interval': 300        # Segundos entre limpezas das sessões vencidas ('sqlite')
+}
+
+# Hash das senhas (PBKDF2-SHA256) fora das threads de requisição
+PASSWORD_CONFIG = {
+    # Ao mudar, cada senha é regravada com o novo valor no próximo login
+    'iterations': int(os.getenv('PHOTOCAP_PASSWORD_ITERATIONS', 100000)),
+    'workers': int(os.getenv('PHOTOCAP_HASH_WORKERS', 2)),  # Processos por worker da aplicação (0: na própria thread)
+    'max_pending': 32,           # Hashes na fila; acima disso o login responde 503
+    'timeout': 10,               # Segundos de espera por um hash antes de desistir
+    'retry_after': 2             # Segundos sugeridos no Retry-After do 503
+}
+
+# Cache das consultas de catálogo (eventos e listas de fotos)
+CACHE_CONFIG = {
+    # 'shared': arquivo SQLite local, comum a todos os workers (invalidação imediata em todos)
+    # 'memory': por processo (com vários workers, outro worker pode servir dados de até 'ttl' segundos)
+    # 'none': desativado
+    'backend': os.getenv('PHOTOCAP_CACHE', 'shared'),
+    'path': os.getenv('PHOTOCAP_CACHE_PATH'),  # Padrão: <UPLOAD_FOLDER>/cache.db
+    'ttl': int(os.getenv('PHOTOCAP_CACHE_TTL', 60)),  # Segundos
+    'max_entries': 2048,         # Acima disso, as consultas usadas há mais tempo saem
+    'touch_interval': 10         # 'shared': segundos entre renovações do último uso de uma consulta lida
+}
+
+# Processamento de uploads em segundo plano
+INGEST_CONFIG = {
+    'workers': int(os.getenv('PHOTOCAP_INGEST_WORKERS', 4)),  # Threads por processo
+    'batch_size': 50             # Fotos gravadas por transação (save_photos_bulk)
+}
+
+# Armazenamento das fotos por hash de conteúdo
+PHOTO_STORE_CONFIG = {
+    'folder': os.getenv('PHOTOCAP_PHOTO_STORE'),  # Padrão: <UPLOAD_FOLDER>/store
+    'perceptual_hash': True,     # Calcula o dHash para marcar fotos quase iguais
+    'near_duplicate_distance': 6  # Bits diferentes (de 64) para considerar quase igual
+}
+
+# Versões redimensionadas das fotos (galeria, prévia e prévia com marca d'água)
+RENDITION_CONFIG = {
+    'folder': os.getenv('PHOTOCAP_RENDITIONS'),  # Padrão: <UPLOAD_FOLDER>/renditions
+    'grid_size': 300,            # Miniatura da galeria (px no maior lado)
+    'preview_size': 1200,        # Prévia ampliada (px no maior lado)
+    'quality': 85,               # Qualidade JPEG
+    'max_mb': int(os.getenv('PHOTOCAP_RENDITIONS_MAX_MB', 2048)),  # Limite do cache em disco
+    'watermark_text': 'PhotoCap'
+}
+
 # Configurações de Reconhecimento Facial
 FACE_RECOGNITION_CONFIG = {
-    'similarity_threshold': 0.7,  # Limiar de similaridade (0.0 a 1.0)
+    # Limiar de similaridade (cosseno) por descritor de embeddings
+    'similarity_threshold': {
+        'sface': 0.363,          # Limiar de correspondência do SFace (OpenCV)
+        'lbp': 0.85              # LBP uniforme: ~p99 dos pares de faces de pessoas diferentes
+    },
     'min_face_size': 20,         # Tamanho mínimo da face para detecção
     'scale_factor': 1.1,         # Fator de escala para detecção
-    'min_neighbors': 5           # Número mínimo de vizinhos para detecção
+    'min_neighbors': 5,          # Número mínimo de vizinhos para detecção
+    'embedding_model': os.getenv('PHOTOCAP_FACE_MODEL', ''),  # Modelo SFace (.onnx); vazio usa descritor LBP
+    'max_image_side': 1600,      # Fotos maiores são reduzidas antes da detecção
+    'max_results': 200,          # Máximo de fotos retornadas por busca
+    'index_folder': os.getenv('PHOTOCAP_FACE_INDEX', 'face_index')  # Índice de embeddings (mmap) por evento
+}
+
+# Busca facial aproximada (IVF) em todos os eventos
+FACE_ANN_CONFIG = {
+    'nlist': 0,                  # Número de listas (0 = automático, 4 * raiz do nº de faces)
+    'nprobe': 16,                # Listas varridas por busca (maior = mais recall, mais latência)
+    'rerank': 2000,              # Candidatos re-ranqueados com o cálculo exato em float32
+    'min_vectors': 50000,        # Abaixo disso a busca é exata (força bruta)
+    'kmeans_iterations': 10,     # Iterações do k-means na construção
+    'kmeans_sample': 200000,     # Amostra usada para treinar os centróides
+    'max_staleness': 0.1,        # Reconstrói em segundo plano com 10% de faces novas
+    'max_age': 24 * 3600,        # ... ou quando o índice tiver mais de 24h
+    'stale_check_interval': 60   # Segundos entre verificações de desatualização (não a cada busca)
+}
+
+# Modo assíncrono (asgi.py): galeria, busca e fotos atendidas no loop de eventos
+ASYNC_CONFIG = {
+    'db_threads': int(os.getenv('PHOTOCAP_ASYNC_DB_THREADS', 0)),  # Consultas simultâneas (0: DB_POOL_CONFIG['max_size'])
+    'io_threads': int(os.getenv('PHOTOCAP_ASYNC_IO_THREADS', 8)),  # Leitura de arquivos e geração de miniaturas
+    'wsgi_threads': int(os.getenv('PHOTOCAP_ASYNC_WSGI_THREADS', 16)),  # Demais rotas, atendidas pelo Flask
+    'chunk_size': 256 * 1024     # Bytes por mensagem ao enviar arquivos
+}
+
+# Produção: gunicorn (gunicorn.conf.py) com a aplicação de wsgi.py
+SERVER_CONFIG = {
+    'bind': os.getenv('PHOTOCAP_BIND', '0.0.0.0:8000'),
+    'workers': int(os.getenv('PHOTOCAP_WORKERS', 0)),  # Processos (0: 2 * CPUs + 1)
+    'threads': int(os.getenv('PHOTOCAP_THREADS', 4)),  # Threads por worker
+    'timeout': 60,               # Segundos sem resposta até o worker ser reiniciado
+    'graceful_timeout': 30,      # Segundos para terminar as requisições em andamento ao parar/recarregar
+    'keepalive': 5,              # Segundos de keep-alive (atrás do proxy reverso)
+    'max_requests': int(os.getenv('PHOTOCAP_MAX_REQUESTS', 0)),  # Reinicia o worker após N requisições (0: nunca)
+    'access_log': os.getenv('PHOTOCAP_ACCESS_LOG', '-'),  # Log de acesso "combined" ('-': stdout, vazio: desligado)
+    'warmup': os.getenv('PHOTOCAP_WARMUP', '1').lower() in ('1', 'true', 'yes'),  # Preparação antes de atender
+    'warmup_events': int(os.getenv('PHOTOCAP_WARMUP_EVENTS', 20))  # Eventos recentes preparados (galeria e faces)
 }
 
 # Configurações de Debug
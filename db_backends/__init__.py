@@ -0,0 +1,18 @@
+from db_backends.base import DatabaseBackend
+from db_backends.sqlserver import SQLServerBackend
+from db_backends.sqlite import SQLiteBackend
+
+BACKENDS = {
+    'sqlserver': SQLServerBackend,
+    'sqlite': SQLiteBackend,
+}
+
+def create_backend(name: str, **options) -> DatabaseBackend:
+    """Cria o backend de armazenamento pelo nome ('sqlserver' ou 'sqlite')"""
+    try:
+        backend_class = BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Backend de banco desconhecido: '{name}' (opções: {', '.join(BACKENDS)})")
+    return backend_class(**options)
+
+__all__ = ['DatabaseBackend', 'SQLServerBackend', 'SQLiteBackend', 'create_backend']
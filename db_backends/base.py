@@ -0,0 +1,98 @@
+from typing import Any, List, Sequence, Tuple
+
+
+class DatabaseBackend:
+    """Interface entre o DatabaseManager e um motor SQL específico
+
+    O DatabaseManager escreve o SQL comum (parâmetros ``?``, tabelas Users,
+    Events e Photos) e delega ao backend apenas o que muda de um motor para
+    outro: como conectar, como obter o ID gerado e o DDL do schema.
+    """
+
+    name = 'base'
+    display_name = 'Banco de dados'
+    # Motores embutidos (arquivo local) são rápidos de abrir e podem ser
+    # inicializados de forma síncrona na subida da aplicação
+    embedded = False
+
+    def connect(self) -> Any:
+        """Abre uma nova conexão DB-API"""
+        raise NotImplementedError
+
+    def ping(self, conn: Any):
+        """Verifica se a conexão ainda responde (levanta exceção se não)"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def last_insert_id(self, cursor: Any) -> int:
+        """Retorna o ID gerado pelo último INSERT do cursor"""
+        raise NotImplementedError
+
+    def limit_clause(self) -> str:
+        """Cláusula que pula e limita as linhas de um SELECT com ORDER BY;
+        recebe os parâmetros (linhas a pular, máximo de linhas)"""
+        return 'LIMIT ?, ?'
+
+    def year_expression(self, column: str) -> str:
+        """Expressão SQL com o ano (inteiro) de uma coluna de data"""
+        return f"CAST(strftime('%Y', {column}) AS INTEGER)"
+
+    def executemany(self, cursor: Any, sql: str, rows: Sequence[Sequence[Any]]):
+        """Executa o mesmo comando para várias linhas"""
+        cursor.executemany(sql, rows)
+
+    def insert_many(self, cursor: Any, table: str, id_column: str, columns: Sequence[str],
+                    rows: Sequence[Sequence[Any]]) -> List[int]:
+        """Insere várias linhas na transação do cursor e retorna os IDs gerados,
+        na mesma ordem de ``rows``"""
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        ids = []
+        for row in rows:
+            cursor.execute(sql, row)
+            ids.append(self.last_insert_id(cursor))
+        return ids
+
+    def add_object_references(self, cursor: Any, references: Sequence[Tuple[str, int, int]]):
+        """Soma referências em PhotoObjects, criando as linhas que faltam
+
+        ``references`` é uma lista de (ContentHash, tamanho, incremento).
+        """
+        self.executemany(cursor, """
+            INSERT INTO PhotoObjects (ContentHash, Size, RefCount) VALUES (?, ?, ?)
+            ON CONFLICT (ContentHash) DO UPDATE SET RefCount = RefCount + excluded.RefCount
+        """, references)
+
+    def schema_statements(self) -> List[str]:
+        """Comandos DDL idempotentes que criam as tabelas e índices"""
+        raise NotImplementedError
+
+    def added_columns(self) -> List[Tuple[str, str, str]]:
+        """Colunas (tabela, coluna, definição) acrescentadas depois da criação
+        das tabelas, aplicadas em bancos já existentes"""
+        return []
+
+    def column_exists(self, cursor: Any, table: str, column: str) -> bool:
+        raise NotImplementedError
+
+    def create_schema(self, conn: Any):
+        """Cria as tabelas, colunas novas e índices que ainda não existem"""
+        cursor = conn.cursor()
+        statements = self.schema_statements()
+        tables = [statement for statement in statements if 'CREATE TABLE' in statement]
+        for statement in tables:
+            cursor.execute(statement)
+        for table, column, definition in self.added_columns():
+            if not self.column_exists(cursor, table, column):
+                cursor.execute(f'ALTER TABLE {table} ADD {column} {definition}')
+        for statement in statements:
+            if statement not in tables:
+                cursor.execute(statement)
+        conn.commit()
+
+    def describe(self) -> str:
+        """Descrição curta do destino, para logs e diagnóstico"""
+        return self.display_name
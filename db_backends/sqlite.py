@@ -0,0 +1,154 @@
+import sqlite3
+from datetime import date, datetime
+from typing import Any, List, Tuple
+from db_backends.base import DatabaseBackend
+
+
+# Datas são gravadas em ISO 8601 e convertidas de volta pelos tipos declarados
+# (DATE / TIMESTAMP), para que o DatabaseManager receba objetos date/datetime
+# como recebe do pyodbc
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+
+class SQLiteBackend(DatabaseBackend):
+    """Backend SQLite embutido, para execução local, CI e benchmarks
+
+    Usa WAL (leitores não bloqueiam o escritor) e mantém um cache de
+    comandos preparados por conexão: como o SQL do DatabaseManager é
+    constante e parametrizado, cada consulta é compilada uma única vez
+    por conexão do pool.
+    """
+
+    name = 'sqlite'
+    display_name = 'SQLite'
+    embedded = True
+
+    def __init__(self, sqlite_path: str = 'photocap.db', busy_timeout: float = 5.0,
+                 cached_statements: int = 256, synchronous: str = 'NORMAL', **_):
+        if sqlite_path == ':memory:':
+            # Cada conexão do pool teria um banco próprio e vazio
+            raise ValueError('SQLiteBackend precisa de um arquivo; use um caminho temporário para testes')
+        self.path = sqlite_path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.synchronous = synchronous
+
+    def connect(self) -> Any:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=self.cached_statements,
+            # O pool garante que cada conexão é usada por uma thread por vez
+            check_same_thread=False,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    def last_insert_id(self, cursor: Any) -> int:
+        return cursor.lastrowid
+
+    def column_exists(self, cursor: Any, table: str, column: str) -> bool:
+        cursor.execute(f'PRAGMA table_info({table})')
+        return any(row[1] == column for row in cursor.fetchall())
+
+    def added_columns(self) -> List[Tuple[str, str, str]]:
+        return [
+            ('Users', 'PasswordIterations', 'INTEGER NULL'),
+            ('Events', 'OwnerId', 'INTEGER NULL'),
+            ('Photos', 'ContentHash', 'TEXT NULL'),
+            ('Photos', 'Width', 'INTEGER NULL'),
+            ('Photos', 'Height', 'INTEGER NULL'),
+            ('Photos', 'TakenAt', 'TIMESTAMP NULL'),
+            ('Photos', 'PerceptualHash', 'INTEGER NULL'),
+            ('Photos', 'NearDuplicateOf', 'INTEGER NULL'),
+        ]
+
+    def schema_statements(self) -> List[str]:
+        return [
+            """
+            CREATE TABLE IF NOT EXISTS Users (
+                UserId INTEGER PRIMARY KEY AUTOINCREMENT,
+                Username TEXT NOT NULL UNIQUE,
+                PasswordHash BLOB NOT NULL,
+                PasswordSalt BLOB NOT NULL,
+                PasswordIterations INTEGER NULL,
+                Email TEXT NOT NULL,
+                UserType TEXT NOT NULL DEFAULT 'customer',
+                FullName TEXT NULL,
+                CPF TEXT NULL,
+                Phone TEXT NULL,
+                CreatedDate TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS Events (
+                EventId INTEGER PRIMARY KEY AUTOINCREMENT,
+                Name TEXT NOT NULL,
+                Date DATE NULL,
+                OwnerId INTEGER NULL
+            )
+            """,
+            # Termos de busca dos eventos (normalizados, sem acento: text_search.py)
+            """
+            CREATE TABLE IF NOT EXISTS EventTokens (
+                Token TEXT NOT NULL COLLATE NOCASE,
+                EventId INTEGER NOT NULL REFERENCES Events(EventId),
+                PRIMARY KEY (Token, EventId)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS Photos (
+                PhotoId INTEGER PRIMARY KEY AUTOINCREMENT,
+                EventId INTEGER NOT NULL REFERENCES Events(EventId),
+                Filename TEXT NOT NULL,
+                UploadDate TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                Image BLOB NULL,
+                ContentHash TEXT NULL,
+                Width INTEGER NULL,
+                Height INTEGER NULL,
+                TakenAt TIMESTAMP NULL,
+                PerceptualHash INTEGER NULL,
+                NearDuplicateOf INTEGER NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS PhotoObjects (
+                ContentHash TEXT NOT NULL PRIMARY KEY,
+                Size INTEGER NULL,
+                RefCount INTEGER NOT NULL,
+                CreatedDate TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS PhotoFaces (
+                FaceId INTEGER PRIMARY KEY AUTOINCREMENT,
+                PhotoId INTEGER NOT NULL REFERENCES Photos(PhotoId),
+                EventId INTEGER NOT NULL,
+                BoxX INTEGER NOT NULL,
+                BoxY INTEGER NOT NULL,
+                BoxWidth INTEGER NOT NULL,
+                BoxHeight INTEGER NOT NULL,
+                Embedding BLOB NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS IX_Users_Email ON Users (Email)",
+            "CREATE INDEX IF NOT EXISTS IX_Events_Date ON Events (Date DESC)",
+            "CREATE INDEX IF NOT EXISTS IX_Events_OwnerId ON Events (OwnerId, Date DESC)",
+            "CREATE INDEX IF NOT EXISTS IX_EventTokens_EventId ON EventTokens (EventId)",
+            # Galeria paginada por (UploadDate, PhotoId)
+            "CREATE INDEX IF NOT EXISTS IX_Photos_EventPage ON Photos (EventId, UploadDate DESC, PhotoId DESC)",
+            "DROP INDEX IF EXISTS IX_Photos_EventId",
+            "CREATE INDEX IF NOT EXISTS IX_Photos_ContentHash ON Photos (EventId, ContentHash)",
+            # Dono de uma versão pelo hash (prévia sem marca d'água)
+            "CREATE INDEX IF NOT EXISTS IX_Photos_Hash ON Photos (ContentHash, EventId)",
+            "CREATE INDEX IF NOT EXISTS IX_PhotoFaces_EventId ON PhotoFaces (EventId, PhotoId)",
+        ]
+
+    def describe(self) -> str:
+        return f'{self.display_name} ({self.path})'
@@ -0,0 +1,239 @@
+from typing import Any, List, Sequence, Tuple
+from db_backends.base import DatabaseBackend
+
+
+class SQLServerBackend(DatabaseBackend):
+    """Backend SQL Server via pyodbc"""
+
+    name = 'sqlserver'
+    display_name = 'SQL Server'
+
+    def __init__(self, server: str, database: str, username: str = '', password: str = '',
+                 driver: str = 'ODBC Driver 17 for SQL Server', **_):
+        self.server = server
+        self.database = database
+        self.username = username
+        self.password = password
+        self.driver = driver
+
+        # Configura string de conexão baseada no tipo de autenticação
+        if self.username and self.password:
+            # Autenticação SQL Server
+            self.connection_string = (
+                f'DRIVER={{{self.driver}}};'
+                f'SERVER={self.server};'
+                f'DATABASE={self.database};'
+                f'UID={self.username};'
+                f'PWD={self.password}'
+            )
+        else:
+            # Autenticação Windows
+            self.connection_string = (
+                f'DRIVER={{{self.driver}}};'
+                f'SERVER={self.server};'
+                f'DATABASE={self.database};'
+                f'Trusted_Connection=yes;'
+            )
+
+    def connect(self) -> Any:
+        # Importado aqui para que o backend SQLite funcione sem o driver ODBC
+        import pyodbc
+        return pyodbc.connect(self.connection_string)
+
+    def last_insert_id(self, cursor: Any) -> int:
+        return cursor.execute("SELECT @@IDENTITY").fetchone()[0]
+
+    def limit_clause(self) -> str:
+        return 'OFFSET ? ROWS FETCH NEXT ? ROWS ONLY'
+
+    def year_expression(self, column: str) -> str:
+        return f'YEAR({column})'
+
+    def executemany(self, cursor: Any, sql: str, rows: Sequence[Sequence[Any]]):
+        # Envia todos os parâmetros em um único pacote em vez de uma ida ao servidor por linha
+        cursor.fast_executemany = True
+        try:
+            cursor.executemany(sql, rows)
+        finally:
+            cursor.fast_executemany = False
+
+    def insert_many(self, cursor: Any, table: str, id_column: str, columns: Sequence[str],
+                    rows: Sequence[Sequence[Any]]) -> List[int]:
+        """Insere em lote com OUTPUT INSERTED, sem um SELECT @@IDENTITY por linha
+
+        Uma linha vai direto para a tabela. Várias linhas são enviadas de uma
+        vez (fast_executemany) para uma tabela temporária com a mesma estrutura
+        e copiadas com um único INSERT ... SELECT ORDER BY Seq: a IDENTITY é
+        atribuída na ordem do ORDER BY, então os IDs ordenados correspondem às
+        linhas na ordem original.
+        """
+        column_list = ', '.join(columns)
+        if len(rows) == 1:
+            cursor.execute(
+                f"INSERT INTO {table} ({column_list}) OUTPUT INSERTED.{id_column} "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                rows[0]
+            )
+            return [cursor.fetchone()[0]]
+
+        staging = f'#{table}Staging'
+        cursor.execute(f"IF OBJECT_ID('tempdb..{staging}') IS NOT NULL DROP TABLE {staging}")
+        cursor.execute(f"SELECT TOP 0 CAST(0 AS INT) AS Seq, {column_list} INTO {staging} FROM {table}")
+        try:
+            self.executemany(
+                cursor,
+                f"INSERT INTO {staging} (Seq, {column_list}) VALUES (?, {', '.join('?' * len(columns))})",
+                [(seq, *row) for seq, row in enumerate(rows)]
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({column_list}) OUTPUT INSERTED.{id_column} "
+                f"SELECT {column_list} FROM {staging} ORDER BY Seq"
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+        finally:
+            cursor.execute(f"DROP TABLE {staging}")
+
+    def add_object_references(self, cursor: Any, references: Sequence[Tuple[str, int, int]]):
+        # HOLDLOCK evita que dois uploads simultâneos tentem inserir o mesmo hash
+        self.executemany(cursor, """
+            MERGE PhotoObjects WITH (HOLDLOCK) AS target
+            USING (SELECT ? AS ContentHash, ? AS Size, ? AS Delta) AS source
+            ON target.ContentHash = source.ContentHash
+            WHEN MATCHED THEN UPDATE SET RefCount = target.RefCount + source.Delta
+            WHEN NOT MATCHED THEN INSERT (ContentHash, Size, RefCount)
+                VALUES (source.ContentHash, source.Size, source.Delta);
+        """, references)
+
+    def column_exists(self, cursor: Any, table: str, column: str) -> bool:
+        cursor.execute("SELECT COL_LENGTH(?, ?)", (table, column))
+        return cursor.fetchone()[0] is not None
+
+    def added_columns(self) -> List[Tuple[str, str, str]]:
+        return [
+            ('Users', 'PasswordIterations', 'INT NULL'),
+            ('Events', 'OwnerId', 'INT NULL'),
+            ('Photos', 'ContentHash', 'CHAR(64) NULL'),
+            ('Photos', 'Width', 'INT NULL'),
+            ('Photos', 'Height', 'INT NULL'),
+            ('Photos', 'TakenAt', 'DATETIME2 NULL'),
+            ('Photos', 'PerceptualHash', 'BIGINT NULL'),
+            ('Photos', 'NearDuplicateOf', 'INT NULL'),
+        ]
+
+    def schema_statements(self) -> List[str]:
+        return [
+            """
+            IF OBJECT_ID('dbo.Users', 'U') IS NULL
+            CREATE TABLE Users (
+                UserId INT IDENTITY(1,1) PRIMARY KEY,
+                Username NVARCHAR(255) NOT NULL UNIQUE,
+                PasswordHash VARBINARY(64) NOT NULL,
+                PasswordSalt VARBINARY(64) NOT NULL,
+                PasswordIterations INT NULL,
+                Email NVARCHAR(255) NOT NULL,
+                UserType NVARCHAR(20) NOT NULL DEFAULT 'customer',
+                FullName NVARCHAR(255) NULL,
+                CPF NVARCHAR(20) NULL,
+                Phone NVARCHAR(30) NULL,
+                CreatedDate DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+            )
+            """,
+            """
+            IF OBJECT_ID('dbo.Events', 'U') IS NULL
+            CREATE TABLE Events (
+                EventId INT IDENTITY(1,1) PRIMARY KEY,
+                Name NVARCHAR(255) NOT NULL,
+                Date DATE NULL,
+                OwnerId INT NULL
+            )
+            """,
+            # Termos de busca dos eventos (normalizados, sem acento: text_search.py)
+            """
+            IF OBJECT_ID('dbo.EventTokens', 'U') IS NULL
+            CREATE TABLE EventTokens (
+                Token VARCHAR(64) NOT NULL,
+                EventId INT NOT NULL REFERENCES Events(EventId),
+                PRIMARY KEY (Token, EventId)
+            )
+            """,
+            """
+            IF OBJECT_ID('dbo.Photos', 'U') IS NULL
+            CREATE TABLE Photos (
+                PhotoId INT IDENTITY(1,1) PRIMARY KEY,
+                EventId INT NOT NULL REFERENCES Events(EventId),
+                Filename NVARCHAR(260) NOT NULL,
+                UploadDate DATETIME2 NOT NULL DEFAULT SYSDATETIME(),
+                Image VARBINARY(MAX) NULL,
+                ContentHash CHAR(64) NULL,
+                Width INT NULL,
+                Height INT NULL,
+                TakenAt DATETIME2 NULL,
+                PerceptualHash BIGINT NULL,
+                NearDuplicateOf INT NULL
+            )
+            """,
+            """
+            IF OBJECT_ID('dbo.PhotoObjects', 'U') IS NULL
+            CREATE TABLE PhotoObjects (
+                ContentHash CHAR(64) NOT NULL PRIMARY KEY,
+                Size BIGINT NULL,
+                RefCount INT NOT NULL,
+                CreatedDate DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+            )
+            """,
+            """
+            IF OBJECT_ID('dbo.PhotoFaces', 'U') IS NULL
+            CREATE TABLE PhotoFaces (
+                FaceId INT IDENTITY(1,1) PRIMARY KEY,
+                PhotoId INT NOT NULL REFERENCES Photos(PhotoId),
+                EventId INT NOT NULL,
+                BoxX INT NOT NULL,
+                BoxY INT NOT NULL,
+                BoxWidth INT NOT NULL,
+                BoxHeight INT NOT NULL,
+                Embedding VARBINARY(MAX) NOT NULL
+            )
+            """,
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Users_Email')
+            CREATE INDEX IX_Users_Email ON Users (Email)
+            """,
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Events_Date')
+            CREATE INDEX IX_Events_Date ON Events (Date DESC)
+            """,
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Events_OwnerId')
+            CREATE INDEX IX_Events_OwnerId ON Events (OwnerId, Date DESC) INCLUDE (Name)
+            """,
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_EventTokens_EventId')
+            CREATE INDEX IX_EventTokens_EventId ON EventTokens (EventId)
+            """,
+            # Galeria paginada por (UploadDate, PhotoId): o índice cobre a consulta
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Photos_EventPage')
+            CREATE INDEX IX_Photos_EventPage ON Photos (EventId, UploadDate DESC, PhotoId DESC)
+                INCLUDE (Filename, ContentHash)
+            """,
+            """
+            IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Photos_EventId')
+            DROP INDEX IX_Photos_EventId ON Photos
+            """,
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Photos_ContentHash')
+            CREATE INDEX IX_Photos_ContentHash ON Photos (EventId, ContentHash)
+            """,
+            # Dono de uma versão pelo hash (prévia sem marca d'água)
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Photos_Hash')
+            CREATE INDEX IX_Photos_Hash ON Photos (ContentHash, EventId)
+            """,
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PhotoFaces_EventId')
+            CREATE INDEX IX_PhotoFaces_EventId ON PhotoFaces (EventId, PhotoId)
+            """,
+        ]
+
+    def describe(self) -> str:
+        return f'{self.display_name} ({self.server}/{self.database})'
@@ -0,0 +1,264 @@
+import functools
+import inspect
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Valor ausente (None é um resultado válido de consulta)
+MISS = object()
+
+
+class MemoryCache:
+    """Cache LRU com validade (TTL) na memória do processo
+
+    Os valores são guardados serializados: cada leitura devolve uma cópia
+    nova, então quem altera o resultado de uma consulta não altera o cache.
+    Cada entrada tem uma etiqueta (ex.: ``events``, ``photos:42``) usada para
+    invalidar de uma vez as consultas afetadas por uma gravação.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, Tuple[str, bytes, float]]' = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            data = entry[1]
+        return pickle.loads(data)
+
+    def set(self, key: str, tag: str, value: Any):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (tag, data, time.monotonic() + self.ttl)
+            self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tag: str):
+        with self._lock:
+            for key in self._tags.pop(tag, ()):
+                self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key: str):
+        tag = self._entries.pop(key)[0]
+        keys = self._tags.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            'backend': self.name,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else None,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+
+class SharedCache(MemoryCache):
+    """Cache compartilhado pelos workers do gunicorn em um arquivo SQLite local
+
+    Uma gravação em um worker invalida as consultas em todos, sem esperar o
+    TTL. As leituras custam um SELECT por chave primária no arquivo local
+    (em WAL, sem bloquear os demais leitores), bem menos que a consulta ao
+    banco principal. O LastUsed de uma entrada lida é renovado no máximo a
+    cada ``touch_interval`` segundos: um acerto comum não pega a trava de
+    escrita do arquivo. Os contadores de acertos/erros são do processo atual.
+    """
+
+    name = 'shared'
+
+    def __init__(self, path: str, max_entries: int = 2048, ttl: float = 60, touch_interval: float = 10):
+        super().__init__(max_entries, ttl)
+        self.path = path
+        self.touch_interval = touch_interval
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS CacheEntries (
+                Key TEXT NOT NULL PRIMARY KEY,
+                Tag TEXT NOT NULL,
+                Value BLOB NOT NULL,
+                Expires REAL NOT NULL,
+                LastUsed REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS IX_CacheEntries_Tag ON CacheEntries (Tag)")
+        conn.execute("CREATE INDEX IF NOT EXISTS IX_CacheEntries_LastUsed ON CacheEntries (LastUsed)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Uma conexão por thread e por processo (as do processo pai não valem após o fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Any:
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute("SELECT Value, LastUsed FROM CacheEntries WHERE Key = ? AND Expires > ?",
+                               (key, now)).fetchone()
+            if row is not None and now - row[1] >= self.touch_interval:
+                conn.execute("UPDATE CacheEntries SET LastUsed = ? WHERE Key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning("Cache compartilhado indisponível: %s", e)
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return MISS
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: str, tag: str, value: Any):
+        now = time.time()
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        try:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO CacheEntries (Key, Tag, Value, Expires, LastUsed) VALUES (?, ?, ?, ?, ?)",
+                         (key, tag, sqlite3.Binary(data), now + self.ttl, now))
+        except sqlite3.Error as e:
+            logger.warning("Cache compartilhado indisponível: %s", e)
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        if prune:
+            self._prune(now)
+
+    def _prune(self, now: float):
+        """Apaga as entradas vencidas e, acima do limite, as usadas há mais tempo"""
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM CacheEntries WHERE Expires <= ?", (now,))
+            excess = conn.execute("SELECT COUNT(*) FROM CacheEntries").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute("""
+                    DELETE FROM CacheEntries WHERE Key IN (
+                        SELECT Key FROM CacheEntries ORDER BY LastUsed LIMIT ?
+                    )
+                """, (excess,))
+                with self._lock:
+                    self.evictions += excess
+        except sqlite3.Error as e:
+            logger.warning("Erro ao limpar o cache compartilhado: %s", e)
+
+    def invalidate(self, tag: str):
+        try:
+            self._connection().execute("DELETE FROM CacheEntries WHERE Tag = ?", (tag,))
+        except sqlite3.Error as e:
+            logger.error("Erro ao invalidar o cache compartilhado: %s", e)
+        with self._lock:
+            self.invalidations += 1
+
+    def clear(self):
+        self._connection().execute("DELETE FROM CacheEntries")
+
+    def stats(self) -> Dict[str, Any]:
+        state = super().stats()
+        try:
+            state['entries'] = self._connection().execute("SELECT COUNT(*) FROM CacheEntries").fetchone()[0]
+        except sqlite3.Error:
+            state['entries'] = None
+        return state
+
+
+def create_cache(backend: str, path: Optional[str] = None, max_entries: int = 2048, ttl: float = 60,
+                 touch_interval: float = 10):
+    """Cria o cache configurado (``memory``, ``shared`` ou ``none``)"""
+    if backend == 'none':
+        return None
+    if backend == 'memory':
+        return MemoryCache(max_entries, ttl)
+    if backend == 'shared':
+        return SharedCache(path, max_entries, ttl, touch_interval)
+    raise ValueError(f'Cache desconhecido: {backend}')
+
+
+def cached(tag: str) -> Callable:
+    """Guarda o resultado de um método de leitura do DatabaseManager em ``self.cache``
+
+    ``tag`` é formatada com os argumentos da chamada (ex.: ``'photos:{event_id}'``)
+    e é o que as gravações invalidam. Resultados vazios (lista vazia, None)
+    não são guardados: os métodos também os devolvem em caso de erro. Uma
+    leitura que termina logo depois de uma invalidação pode guardar o valor
+    antigo; o TTL limita quanto tempo ele fica no cache.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+        prefix = method.__qualname__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.cache
+            if cache is None:
+                return method(self, *args, **kwargs)
+
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            del arguments['self']
+            key = f'{prefix}{sorted(arguments.items())!r}'
+
+            value = cache.get(key)
+            if value is MISS:
+                value = method(self, *args, **kwargs)
+                # Páginas são (itens, cursor): vale o que diz a lista de itens
+                if (value[0] if isinstance(value, tuple) else value):
+                    cache.set(key, tag.format(**arguments), value)
+            return value
+
+        return wrapper
+    return decorator
@@ -1,69 +1,146 @@
-import pyodbc
-import hashlib
-import os
+import base64
+import logging
+import threading
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from config import DB_CONFIG
+from typing import Optional, List, Dict, Any, Tuple
+from config import DB_CONFIG, DB_POOL_CONFIG
+from db_backends import DatabaseBackend, create_backend
+from db_cache import cached
+from text_search import event_tokens, tokenize
+from db_pool import ConnectionPool
+from password_hasher import PasswordHasher, PasswordHasherBusy
+from rows import Event, Photo, PhotoHash, User, fetch_rows
+
+logger = logging.getLogger(__name__)
 
 class DatabaseManager:
-    def __init__(self, server=None, database=None, username=None, password=None):
+    def __init__(self, server=None, database=None, username=None, password=None, pool_config=None,
+                 backend: Optional[DatabaseBackend] = None):
         """Inicializa o gerenciador de banco de dados"""
-        # Usa configurações do config.py se não fornecidas
-        self.server = server or DB_CONFIG['server']
-        self.database = database or DB_CONFIG['database']
-        self.username = username or DB_CONFIG['username']
-        self.password = password or DB_CONFIG['password']
-        self.driver = DB_CONFIG['driver']
+        if backend is None:
+            # Usa configurações do config.py se não fornecidas
+            options = dict(DB_CONFIG)
+            options.update({key: value for key, value in {
+                'server': server,
+                'database': database,
+                'username': username,
+                'password': password
+            }.items() if value})
+            backend = create_backend(options.pop('backend', 'sqlserver'), **options)
+        self.backend = backend
+        
+        # Pool de conexões compartilhado por todos os métodos
+        self.pool = ConnectionPool(self.backend.connect, ping=self.backend.ping,
+                                   **{**DB_POOL_CONFIG, **(pool_config or {})})
+        
+        # A conexão não é testada aqui: o teste é feito sob demanda ou em
+        # segundo plano (check_connection_async), para não travar a importação
+        self.ready = None
+        self.last_check = None
+        self.last_error = None
+        self._schema_ready = False
         
-        # Configura string de conexão baseada no tipo de autenticação
-        if self.username and self.password:
-            # Autenticação SQL Server
-            self.connection_string = (
-                f'DRIVER={{{self.driver}}};'
-                f'SERVER={self.server};'
-                f'DATABASE={self.database};'
-                f'UID={self.username};'
-                f'PWD={self.password}'
-            )
-        else:
-            # Autenticação Windows
-            self.connection_string = (
-                f'DRIVER={{{self.driver}}};'
-                f'SERVER={self.server};'
-                f'DATABASE={self.database};'
-                f'Trusted_Connection=yes;'
-            )
-        self.test_connection()
+        # Índice facial em disco (FaceIndexStore), atualizado a cada foto salva
+        self.face_index = None
+        # Armazenamento das fotos por hash (PhotoStore); objetos sem referência são apagados
+        self.photo_store = None
+        # Cache das consultas de catálogo (db_cache), invalidado pelas gravações
+        self.cache = None
+        # Hash das senhas; a aplicação troca por um com pool de processos (init_password_hasher)
+        self.password_hasher = PasswordHasher(workers=0)
+        # Métricas por método (metrics.Metrics); None desliga a medição dos cursores
+        self.metrics = None
     
     def test_connection(self):
-        """Testa a conexão com o banco de dados"""
+        """Testa a conexão com o banco de dados (e cria o schema na primeira vez)"""
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                print("✅ Conexão com SQL Server estabelecida com sucesso!")
-                return True
+            with self.get_connection() as conn:
+                first_check = not self._schema_ready
+                if first_check:
+                    self.backend.create_schema(conn)
+                    self._schema_ready = True
+                logger.log(logging.INFO if first_check else logging.DEBUG, "Conexão com %s estabelecida", self.backend.describe())
+            if first_check:
+                self.index_missing_events()
+                self.claim_orphan_events()
+            self._set_ready(True)
+            return True
         except Exception as e:
-            print(f"❌ Erro ao conectar com SQL Server: {e}")
+            logger.error("Erro ao conectar com %s: %s", self.backend.describe(), e)
+            self._set_ready(False, e)
             return False
     
+    def _set_ready(self, ready: bool, error: Exception = None):
+        self.ready = ready
+        self.last_check = datetime.now()
+        self.last_error = str(error) if error else None
+    
+    def check_connection_async(self) -> threading.Thread:
+        """Testa a conexão em uma thread separada, sem bloquear o chamador"""
+        thread = threading.Thread(target=self.test_connection, name='db-readiness-check', daemon=True)
+        thread.start()
+        return thread
+    
+    def readiness(self) -> Dict[str, Any]:
+        """Retorna o estado de prontidão do banco de dados"""
+        return {
+            'ready': bool(self.ready),
+            'last_check': self.last_check.isoformat() if self.last_check else None,
+            'error': self.last_error
+        }
+    
     def get_connection(self):
-        """Retorna uma conexão com o banco de dados"""
-        return pyodbc.connect(self.connection_string)
+        """Empresta uma conexão do pool (use com ``with``)"""
+        if self.metrics is not None:
+            # Cursores medidos: consultas, tempo no driver e linhas lidas
+            return self.metrics.connection(self.pool.connection())
+        return self.pool.connection()
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Retorna as estatísticas do pool (em uso, ociosas, tempo de espera)"""
+        return self.pool.stats()
+    
+    def close(self):
+        """Fecha as conexões ociosas do pool"""
+        self.pool.close()
     
     # Métodos para hash e salt de senhas
     def hash_password(self, password: str) -> tuple:
         """Gera hash e salt para uma senha"""
-        salt = os.urandom(32)
-        pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
+        pwd_hash, salt, _ = self.password_hasher.hash(password)
         return pwd_hash, salt
     
-    def verify_password(self, stored_hash: bytes, stored_salt: bytes, provided_password: str) -> bool:
-        """Verifica se uma senha fornecida corresponde ao hash armazenado"""
-        pwd_hash = hashlib.pbkdf2_hmac('sha256', provided_password.encode('utf-8'), stored_salt, 100000)
-        return pwd_hash == stored_hash
+    def verify_password(self, stored_hash: bytes, stored_salt: bytes, provided_password: str,
+                        iterations: Optional[int] = None) -> bool:
+        """Verifica se uma senha fornecida corresponde ao hash armazenado (tempo constante)"""
+        return self.password_hasher.verify(provided_password, stored_hash, stored_salt, iterations)
+    
+    def _rehash_password(self, user_id: int, password: str, iterations: Optional[int]):
+        """Regrava o hash de uma senha correta se os parâmetros mudaram desde o cadastro"""
+        if not self.password_hasher.needs_rehash(iterations):
+            return
+        try:
+            password_hash, password_salt, new_iterations = self.password_hasher.hash(password)
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE Users SET PasswordHash = ?, PasswordSalt = ?, PasswordIterations = ?
+                    WHERE UserId = ?
+                """, (password_hash, password_salt, new_iterations, user_id))
+                conn.commit()
+            logger.info("Senha do usuário %s atualizada para %d iterações", user_id, new_iterations)
+        except Exception as e:
+            # O login já foi aceito; tenta de novo no próximo
+            logger.warning("Erro ao atualizar o hash da senha: %s", e)
     
     # Métodos para usuários
     def create_user(self, username: str, password: str, email: str, user_type: str = 'customer', full_name: str = None, cpf: str = None, phone: str = None) -> Optional[int]:
-        """Cria um novo usuário no banco de dados"""
+        """Cria um novo usuário no banco de dados
+        
+        Levanta PasswordHasherBusy se a fila de hashing estiver cheia.
+        """
+        # Gera hash e salt da senha antes de ocupar uma conexão do pool
+        password_hash, password_salt, iterations = self.password_hasher.hash(password)
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
@@ -71,97 +148,106 @@ class DatabaseManager:
                 # Verifica se o usuário já existe
                 cursor.execute("SELECT UserId FROM Users WHERE Username = ?", (username,))
                 if cursor.fetchone():
-                    print(f"❌ Usuário '{username}' já existe")
+                    logger.debug("Usuário já existe")
                     return None
                 
-                # Gera hash e salt da senha
-                password_hash, password_salt = self.hash_password(password)
-                
                 # Insere o usuário
                 cursor.execute("""
-                    INSERT INTO Users (Username, PasswordHash, PasswordSalt, Email, UserType, FullName, CPF, Phone)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (username, password_hash, password_salt, email, user_type, full_name, cpf, phone))
+                    INSERT INTO Users (Username, PasswordHash, PasswordSalt, PasswordIterations, Email, UserType, FullName, CPF, Phone)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (username, password_hash, password_salt, iterations, email, user_type, full_name, cpf, phone))
                 
                 conn.commit()
-                user_id = cursor.execute("SELECT @@IDENTITY").fetchone()[0]
-                print(f"✅ Usuário '{username}' criado com sucesso (ID: {user_id}, Tipo: {user_type})")
+                user_id = self.backend.last_insert_id(cursor)
+                logger.debug("Usuário %s criado (%s)", user_id, user_type)
                 return user_id
                 
         except Exception as e:
-            print(f"❌ Erro ao criar usuário: {e}")
+            logger.error("Erro ao criar usuário: %s", e)
             return None
     
     def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
-        """Autentica um usuário por username"""
+        """Autentica um usuário por username
+        
+        Levanta PasswordHasherBusy se a fila de hashing estiver cheia.
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT UserId, Username, PasswordHash, PasswordSalt, Email
+                    SELECT UserId, Username, PasswordHash, PasswordSalt, PasswordIterations, Email
                     FROM Users WHERE Username = ?
                 """, (username,))
                 
                 user_data = cursor.fetchone()
-                if not user_data:
-                    print(f"❌ Usuário '{username}' não encontrado")
-                    return None
-                
-                user_id, username, password_hash, password_salt, email = user_data
-                
-                # Verifica a senha
-                if self.verify_password(password_hash, password_salt, password):
-                    print(f"✅ Usuário '{username}' autenticado com sucesso")
-                    return {
-                        'UserId': user_id,
-                        'Username': username,
-                        'Email': email
-                    }
-                else:
-                    print(f"❌ Senha incorreta para usuário '{username}'")
-                    return None
+            if not user_data:
+                logger.debug("Usuário não encontrado")
+                return None
+            
+            user_id, username, password_hash, password_salt, iterations, email = user_data
+            
+            # Verifica a senha (fora da conexão: o hash leva dezenas de ms)
+            if self.verify_password(password_hash, password_salt, password, iterations):
+                logger.debug("Usuário %s autenticado", user_id)
+                self._rehash_password(user_id, password, iterations)
+                return {
+                    'UserId': user_id,
+                    'Username': username,
+                    'Email': email
+                }
+            else:
+                logger.debug("Senha incorreta para o usuário %s", user_id)
+                return None
                     
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
-            print(f"❌ Erro na autenticação: {e}")
+            logger.error("Erro na autenticação: %s", e)
             return None
 
     def authenticate_user_by_email(self, email: str, password: str) -> Optional[Dict[str, Any]]:
-        """Autentica um usuário por e-mail"""
+        """Autentica um usuário por e-mail
+        
+        Levanta PasswordHasherBusy se a fila de hashing estiver cheia.
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT UserId, Username, PasswordHash, PasswordSalt, Email, UserType, FullName, CPF, Phone
+                    SELECT UserId, Username, PasswordHash, PasswordSalt, PasswordIterations, Email, UserType, FullName, CPF, Phone
                     FROM Users WHERE Email = ?
                 """, (email,))
                 
                 user_data = cursor.fetchone()
-                if not user_data:
-                    print(f"❌ E-mail '{email}' não encontrado")
-                    return None
-                
-                user_id, username, password_hash, password_salt, email, user_type, full_name, cpf, phone = user_data
-                
-                # Verifica a senha
-                if self.verify_password(password_hash, password_salt, password):
-                    print(f"✅ Usuário '{username}' autenticado com sucesso (Tipo: {user_type})")
-                    return {
-                        'UserId': user_id,
-                        'Username': username,
-                        'Email': email,
-                        'UserType': user_type,
-                        'FullName': full_name,
-                        'CPF': cpf,
-                        'Phone': phone
-                    }
-                else:
-                    print(f"❌ Senha incorreta para e-mail '{email}'")
-                    return None
+            if not user_data:
+                logger.debug("E-mail não encontrado")
+                return None
+            
+            user_id, username, password_hash, password_salt, iterations, email, user_type, full_name, cpf, phone = user_data
+            
+            # Verifica a senha (fora da conexão: o hash leva dezenas de ms)
+            if self.verify_password(password_hash, password_salt, password, iterations):
+                logger.debug("Usuário %s autenticado (%s)", user_id, user_type)
+                self._rehash_password(user_id, password, iterations)
+                return {
+                    'UserId': user_id,
+                    'Username': username,
+                    'Email': email,
+                    'UserType': user_type,
+                    'FullName': full_name,
+                    'CPF': cpf,
+                    'Phone': phone
+                }
+            else:
+                logger.debug("Senha incorreta para o usuário %s", user_id)
+                return None
                     
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
-            print(f"❌ Erro na autenticação: {e}")
+            logger.error("Erro na autenticação: %s", e)
             return None
     
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
@@ -185,191 +271,619 @@ class DatabaseManager:
                 return None
                 
         except Exception as e:
-            print(f"❌ Erro ao buscar usuário: {e}")
+            logger.error("Erro ao buscar usuário: %s", e)
             return None
     
     # Métodos para eventos
-    def create_event(self, name: str, date: str) -> Optional[int]:
-        """Cria um novo evento"""
+    def create_event(self, name: str, date: str, owner_id: Optional[int] = None) -> Optional[int]:
+        """Cria um novo evento (``owner_id``: fotógrafo dono do evento)"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    INSERT INTO Events (Name, Date)
-                    VALUES (?, ?)
-                """, (name, date))
+                    INSERT INTO Events (Name, Date, OwnerId)
+                    VALUES (?, ?, ?)
+                """, (name, date, owner_id))
+                event_id = self.backend.last_insert_id(cursor)
+                self._index_event(cursor, event_id, name, date)
                 
                 conn.commit()
-                event_id = cursor.execute("SELECT @@IDENTITY").fetchone()[0]
-                print(f"✅ Evento '{name}' criado com sucesso (ID: {event_id})")
+                logger.debug("Evento %s criado", event_id)
+                self._invalidate('events')
                 return event_id
                 
         except Exception as e:
-            print(f"❌ Erro ao criar evento: {e}")
+            logger.error("Erro ao criar evento: %s", e)
             return None
     
-    def get_all_events(self) -> List[Dict[str, Any]]:
+    @cached('events')
+    def get_all_events(self) -> List[Event]:
         """Retorna todos os eventos"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT EventId, Name, Date
+                    SELECT EventId, Name, Date, OwnerId
                     FROM Events
                     ORDER BY Date DESC
                 """)
                 
-                events = []
-                for row in cursor.fetchall():
-                    events.append({
-                        'EventId': row[0],
-                        'Name': row[1],
-                        'Date': row[2].strftime('%Y-%m-%d') if row[2] else None
-                    })
+                return fetch_rows(cursor, Event)
                 
-                return events
+        except Exception as e:
+            logger.error("Erro ao buscar eventos: %s", e)
+            return []
+    
+    @cached('events')
+    def get_events_page(self, limit: int, offset: int = 0,
+                        owner_id: Optional[int] = None) -> List[Event]:
+        """Eventos do mais recente para o mais antigo, ``limit`` por vez
+        
+        Com ``owner_id``, apenas os eventos do fotógrafo, pelo índice
+        IX_Events_OwnerId.
+        """
+        params: List[Any] = []
+        where = ''
+        if owner_id is not None:
+            where = 'WHERE OwnerId = ?'
+            params.append(owner_id)
+        params += [offset, limit]
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f"""
+                    SELECT EventId, Name, Date, OwnerId
+                    FROM Events
+                    {where}
+                    ORDER BY Date DESC, EventId DESC
+                    {self.backend.limit_clause()}
+                """, params)
+                
+                return fetch_rows(cursor, Event)
                 
         except Exception as e:
-            print(f"❌ Erro ao buscar eventos: {e}")
+            logger.error("Erro ao buscar eventos: %s", e)
+            return []
+    
+    def get_recent_events(self, limit: int = 6) -> List[Event]:
+        """Os ``limit`` eventos mais recentes"""
+        return self.get_events_page(limit)
+    
+    @cached('events')
+    def count_events(self, owner_id: Optional[int] = None) -> int:
+        """Total de eventos (só os do fotógrafo, com ``owner_id``)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if owner_id is None:
+                    cursor.execute("SELECT COUNT(*) FROM Events")
+                else:
+                    cursor.execute("SELECT COUNT(*) FROM Events WHERE OwnerId = ?", (owner_id,))
+                return cursor.fetchone()[0]
+        except Exception as e:
+            logger.error("Erro ao contar eventos: %s", e)
+            return 0
+    
+    @cached('events')
+    def get_event_years(self) -> List[int]:
+        """Anos com eventos, do mais recente para o mais antigo"""
+        year = self.backend.year_expression('Date')
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT DISTINCT {year} FROM Events
+                    WHERE Date IS NOT NULL
+                    ORDER BY 1 DESC
+                """)
+                return [int(row[0]) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Erro ao buscar anos dos eventos: %s", e)
+            return []
+    
+    @cached('events')
+    def get_event_ids_by_year(self, year: int) -> List[int]:
+        """IDs dos eventos de um ano, por faixa de datas no índice IX_Events_Date"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT EventId FROM Events
+                    WHERE Date >= ? AND Date < ?
+                """, (f'{year:04d}-01-01', f'{year + 1:04d}-01-01'))
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Erro ao buscar eventos do ano: %s", e)
             return []
     
-    def get_event_by_id(self, event_id: int) -> Optional[Dict[str, Any]]:
+    @cached('events')
+    def get_event_by_id(self, event_id: int) -> Optional[Event]:
         """Busca um evento pelo ID"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT EventId, Name, Date
+                    SELECT EventId, Name, Date, OwnerId
                     FROM Events WHERE EventId = ?
                 """, (event_id,))
                 
                 event_data = cursor.fetchone()
-                if event_data:
-                    return {
-                        'EventId': event_data[0],
-                        'Name': event_data[1],
-                        'Date': event_data[2].strftime('%Y-%m-%d') if event_data[2] else None
-                    }
-                return None
+                return Event._make(event_data) if event_data else None
                 
         except Exception as e:
-            print(f"❌ Erro ao buscar evento: {e}")
+            logger.error("Erro ao buscar evento: %s", e)
             return None
     
-    def search_events(self, event_name: str) -> List[Dict[str, Any]]:
-        """Busca eventos por nome"""
+    @cached('events')
+    def search_events(self, event_name: str, limit: int = 50) -> List[Event]:
+        """Busca eventos por nome, sem diferenciar acentos e maiúsculas
+        
+        Cada termo da busca é procurado como prefixo no índice EventTokens
+        ("sao pau" encontra "São Paulo"), então a busca serve ao autocompletar.
+        Os eventos que casam com mais termos vêm primeiro; depois os em que os
+        termos são palavras inteiras, e então os mais recentes.
+        """
+        terms = tokenize(event_name, min_length=2)
+        if not terms:
+            return []
+        
+        matches = ' UNION ALL '.join(
+            f"SELECT EventId, {position} AS Term, CASE WHEN Token = ? THEN 1 ELSE 0 END AS Exact "
+            f"FROM EventTokens WHERE Token LIKE ?"
+            for position in range(len(terms))
+        )
+        params: List[Any] = []
+        for term in terms:
+            params += [term, f'{term}%']
+        params += [0, limit]
+        
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
+                cursor.execute(f"""
+                    SELECT e.EventId, e.Name, e.Date, e.OwnerId
+                    FROM (
+                        SELECT EventId, COUNT(*) AS Matched, SUM(Exact) AS Exact
+                        FROM (
+                            SELECT EventId, Term, MAX(Exact) AS Exact
+                            FROM ({matches}) m
+                            GROUP BY EventId, Term
+                        ) t
+                        GROUP BY EventId
+                    ) r
+                    JOIN Events e ON e.EventId = r.EventId
+                    ORDER BY r.Matched DESC, r.Exact DESC, e.Date DESC, e.EventId DESC
+                    {self.backend.limit_clause()}
+                """, params)
+                
+                return fetch_rows(cursor, Event)
+                
+        except Exception as e:
+            logger.error("Erro ao buscar eventos: %s", e)
+            return []
+    
+    def _index_event(self, cursor, event_id: int, name: str, date: Any):
+        """Grava os termos de busca de um evento (na transação do cursor)"""
+        tokens = event_tokens(name, date)
+        if tokens:
+            self.backend.executemany(cursor, "INSERT INTO EventTokens (Token, EventId) VALUES (?, ?)",
+                                     [(token, event_id) for token in tokens])
+    
+    def index_missing_events(self) -> int:
+        """Indexa os eventos ainda sem termos de busca (criados antes do índice)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT EventId, Name, Date
-                    FROM Events 
-                    WHERE Name LIKE ?
-                    ORDER BY Date DESC
-                """, (f'%{event_name}%',))
+                    SELECT EventId, Name, Date FROM Events e
+                    WHERE NOT EXISTS (SELECT 1 FROM EventTokens t WHERE t.EventId = e.EventId)
+                """)
+                rows = cursor.fetchall()
+                for event_id, name, date in rows:
+                    self._index_event(cursor, event_id, name, date)
+                conn.commit()
+            if rows:
+                logger.info("%d evento(s) indexado(s) para a busca", len(rows))
+                self._invalidate('events')
+            return len(rows)
+        except Exception as e:
+            logger.error("Erro ao indexar eventos: %s", e)
+            return 0
+    
+    def claim_orphan_events(self) -> int:
+        """Atribui um dono aos eventos sem OwnerId (criados antes da coluna)
+        
+        Evento sem dono não é de nenhum fotógrafo: ninguém envia fotos nem
+        baixa originais nele. Com um único fotógrafo cadastrado, os eventos
+        antigos só podem ser dele e são atribuídos aqui; com vários, ficam
+        sem dono até ``flask claim-events``.
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM Events WHERE OwnerId IS NULL")
+                orphans = cursor.fetchone()[0]
+                if not orphans:
+                    return 0
+                cursor.execute("SELECT UserId FROM Users WHERE UserType = 'photographer'")
+                photographers = cursor.fetchall()
+                if len(photographers) != 1:
+                    logger.warning("%d evento(s) sem dono; atribua com 'flask claim-events'", orphans)
+                    return 0
+                cursor.execute("UPDATE Events SET OwnerId = ? WHERE OwnerId IS NULL", (photographers[0][0],))
+                conn.commit()
+            logger.info("%d evento(s) sem dono atribuído(s) ao fotógrafo %s", orphans, photographers[0][0])
+            self._invalidate('events')
+            return orphans
+        except Exception as e:
+            logger.error("Erro ao atribuir eventos sem dono: %s", e)
+            return 0
+    
+    def assign_event_owner(self, username: str, event_ids: Optional[List[int]] = None) -> Optional[int]:
+        """Atribui ao fotógrafo os eventos sem dono (todos ou só ``event_ids``)
+        
+        Retorna quantos eventos foram atribuídos, ou None se o usuário não
+        existe ou não é fotógrafo. Eventos que já têm dono não mudam.
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT UserId FROM Users WHERE Username = ? AND UserType = 'photographer'",
+                               (username,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                sql = "UPDATE Events SET OwnerId = ? WHERE OwnerId IS NULL"
+                params: List[Any] = [row[0]]
+                if event_ids:
+                    sql += f" AND EventId IN ({', '.join('?' * len(event_ids))})"
+                    params += list(event_ids)
+                cursor.execute(sql, params)
+                assigned = cursor.rowcount
+                conn.commit()
+            self._invalidate('events')
+            return assigned
+        except Exception as e:
+            logger.error("Erro ao atribuir eventos: %s", e)
+            return None
+    
+    # Métodos para fotos
+    PHOTO_COLUMNS = ('EventId', 'Filename', 'UploadDate', 'Image', 'ContentHash', 'Width', 'Height', 'TakenAt',
+                     'PerceptualHash', 'NearDuplicateOf')
+
+    def save_photo(self, event_id: int, filename: str, image_data: bytes = None,
+                   faces: Optional[List[Dict[str, Any]]] = None, content_hash: str = None,
+                   width: int = None, height: int = None, taken_at: datetime = None) -> Optional[int]:
+        """Salva uma foto no banco de dados (e as faces detectadas, se houver)"""
+        photo_ids = self.save_photos_bulk(event_id, [{
+            'filename': filename,
+            'image_data': image_data,
+            'faces': faces,
+            'content_hash': content_hash,
+            'width': width,
+            'height': height,
+            'taken_at': taken_at
+        }])
+        return photo_ids[0] if photo_ids else None
+    
+    def save_photos_bulk(self, event_id: int, items: List[Dict[str, Any]]) -> List[int]:
+        """Salva várias fotos (e suas faces) em uma única transação
+        
+        Cada item é um dict com ``filename`` e, opcionalmente, ``image_data``,
+        ``faces``, ``content_hash``, ``size``, ``width``, ``height``,
+        ``taken_at``, ``perceptual_hash`` e ``near_duplicate_of``. Fotos cujo
+        ``content_hash`` já existe no evento não são inseridas de novo: o item
+        recebe o PhotoId já existente. Retorna os PhotoIds na ordem dos itens
+        (lista vazia em caso de erro).
+        """
+        if not items:
+            return []
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
                 
-                events = []
-                for row in cursor.fetchall():
-                    events.append({
-                        'EventId': row[0],
-                        'Name': row[1],
-                        'Date': row[2].strftime('%Y-%m-%d') if row[2] else None
-                    })
+                known = self._find_photo_hashes(cursor, event_id, [
+                    item['content_hash'] for item in items if item.get('content_hash')
+                ])
+                new_items = []
+                for item in items:
+                    content_hash = item.get('content_hash')
+                    if content_hash and content_hash in known:
+                        continue
+                    if content_hash:
+                        # Repetida dentro do próprio lote: marca para receber o ID da primeira
+                        known[content_hash] = None
+                    new_items.append(item)
                 
-                return events
+                upload_date = datetime.now()
+                new_ids = self.backend.insert_many(cursor, 'Photos', 'PhotoId', self.PHOTO_COLUMNS, [
+                    (event_id, item['filename'], upload_date, item.get('image_data'), item.get('content_hash'),
+                     item.get('width'), item.get('height'), item.get('taken_at'),
+                     item.get('perceptual_hash'), item.get('near_duplicate_of'))
+                    for item in new_items
+                ]) if new_items else []
+                
+                references = {}
+                for photo_id, item in zip(new_ids, new_items):
+                    content_hash = item.get('content_hash')
+                    if content_hash:
+                        known[content_hash] = photo_id
+                        size, count = references.get(content_hash, (item.get('size'), 0))
+                        references[content_hash] = (size, count + 1)
+                if references:
+                    self.backend.add_object_references(cursor, [
+                        (content_hash, size, count) for content_hash, (size, count) in references.items()
+                    ])
+                
+                faces = [(photo_id, item['faces']) for photo_id, item in zip(new_ids, new_items) if item.get('faces')]
+                if faces:
+                    self._insert_faces(cursor, event_id, faces)
+                
+                conn.commit()
+                
+                inserted = {id(item): photo_id for photo_id, item in zip(new_ids, new_items)}
+                photo_ids = [inserted.get(id(item)) or known[item['content_hash']] for item in items]
+                duplicates = len(items) - len(new_ids)
+                if len(items) == 1 and not duplicates:
+                    logger.debug("Foto %s salva no evento %s (%d faces)", photo_ids[0], event_id, len(items[0].get('faces') or []))
+                elif new_ids:
+                    logger.debug("%d fotos salvas no evento %s (IDs: %s-%s)", len(new_ids), event_id, new_ids[0], new_ids[-1])
+                if duplicates:
+                    logger.debug("%d foto(s) duplicada(s) ignorada(s) no evento %s", duplicates, event_id)
+                
+                if new_ids:
+                    self._invalidate(f'photos:{event_id}')
+                for photo_id, photo_faces in faces:
+                    self._index_faces(event_id, photo_id, photo_faces)
+                return photo_ids
                 
         except Exception as e:
-            print(f"❌ Erro ao buscar eventos: {e}")
+            logger.error("Erro ao salvar fotos: %s", e)
             return []
     
-    # Métodos para fotos
-    def save_photo(self, event_id: int, filename: str, image_data: bytes = None) -> Optional[int]:
-        """Salva uma foto no banco de dados"""
+    def _invalidate(self, tag: str):
+        """Descarta as consultas em cache afetadas por uma gravação"""
+        if self.cache is not None:
+            self.cache.invalidate(tag)
+    
+    def _find_photo_hashes(self, cursor, event_id: int, content_hashes: List[str]) -> Dict[str, int]:
+        """PhotoId das fotos do evento que já têm um dos hashes informados"""
+        found = {}
+        unique = list(dict.fromkeys(content_hashes))
+        for start in range(0, len(unique), 1000):
+            chunk = unique[start:start + 1000]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(f"""
+                SELECT ContentHash, MIN(PhotoId) FROM Photos
+                WHERE EventId = ? AND ContentHash IN ({placeholders})
+                GROUP BY ContentHash
+            """, (event_id, *chunk))
+            found.update({row[0]: row[1] for row in cursor.fetchall()})
+        return found
+    
+    def get_photo_hashes(self, event_id: int) -> List[PhotoHash]:
+        """Hash de conteúdo e hash perceptual das fotos de um evento
+        
+        Usado para descartar reenvios antes do processamento e para marcar
+        fotos quase iguais.
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    INSERT INTO Photos (EventId, Filename, UploadDate, Image)
-                    VALUES (?, ?, ?, ?)
-                """, (event_id, filename, datetime.now(), image_data))
+                    SELECT PhotoId, ContentHash, PerceptualHash
+                    FROM Photos
+                    WHERE EventId = ? AND ContentHash IS NOT NULL
+                """, (event_id,))
                 
+                return fetch_rows(cursor, PhotoHash)
+                
+        except Exception as e:
+            logger.error("Erro ao buscar hashes das fotos: %s", e)
+            return []
+    
+    def get_referenced_hashes(self, content_hashes: List[str]) -> set:
+        """Hashes informados que ainda são usados por alguma foto"""
+        referenced = set()
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                for start in range(0, len(content_hashes), 1000):
+                    chunk = list(content_hashes[start:start + 1000])
+                    placeholders = ', '.join('?' * len(chunk))
+                    cursor.execute(f"""
+                        SELECT ContentHash FROM PhotoObjects
+                        WHERE RefCount > 0 AND ContentHash IN ({placeholders})
+                    """, chunk)
+                    referenced.update(row[0] for row in cursor.fetchall())
+                
+                return referenced
+                
+        except Exception as e:
+            logger.error("Erro ao buscar referências de fotos: %s", e)
+            # Na dúvida, considera tudo referenciado para não apagar nada
+            return set(content_hashes)
+    
+    def set_near_duplicates(self, pairs: List[Tuple[int, int]]) -> bool:
+        """Marca fotos quase iguais a outra do evento: [(PhotoId, PhotoId parecido)]"""
+        if not pairs:
+            return True
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                self.backend.executemany(cursor, "UPDATE Photos SET NearDuplicateOf = ? WHERE PhotoId = ?", [
+                    (similar, photo_id) for photo_id, similar in pairs
+                ])
                 conn.commit()
-                photo_id = cursor.execute("SELECT @@IDENTITY").fetchone()[0]
-                print(f"✅ Foto '{filename}' salva com sucesso (ID: {photo_id})")
-                return photo_id
+                return True
                 
         except Exception as e:
-            print(f"❌ Erro ao salvar foto: {e}")
-            return None
+            logger.error("Erro ao marcar fotos semelhantes: %s", e)
+            return False
+    
+    def delete_photo(self, photo_id: int) -> bool:
+        """Remove uma foto, suas faces e a referência ao arquivo armazenado"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("SELECT EventId, ContentHash FROM Photos WHERE PhotoId = ?", (photo_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return False
+                event_id, content_hash = row
+                
+                cursor.execute("DELETE FROM PhotoFaces WHERE PhotoId = ?", (photo_id,))
+                had_faces = cursor.rowcount > 0
+                cursor.execute("UPDATE Photos SET NearDuplicateOf = NULL WHERE NearDuplicateOf = ?", (photo_id,))
+                cursor.execute("DELETE FROM Photos WHERE PhotoId = ?", (photo_id,))
+                
+                orphan = False
+                if content_hash:
+                    cursor.execute("UPDATE PhotoObjects SET RefCount = RefCount - 1 WHERE ContentHash = ?", (content_hash,))
+                    cursor.execute("SELECT RefCount FROM PhotoObjects WHERE ContentHash = ?", (content_hash,))
+                    refs = cursor.fetchone()
+                    if refs is None or refs[0] <= 0:
+                        cursor.execute("DELETE FROM PhotoObjects WHERE ContentHash = ?", (content_hash,))
+                        orphan = True
+                
+                conn.commit()
+                logger.info("Foto %s removida do evento %s", photo_id, event_id)
+            
+            self._invalidate(f'photos:{event_id}')
+            if orphan and self.photo_store is not None:
+                self.photo_store.remove(content_hash)
+            if had_faces and self.face_index is not None:
+                # As faces removidas ainda estão no índice em disco
+                self.face_index.invalidate(event_id)
+            return True
+                
+        except Exception as e:
+            logger.error("Erro ao remover foto: %s", e)
+            return False
     
-    def get_photos_by_event(self, event_id: int) -> List[Dict[str, Any]]:
+    @cached('photos:{event_id}')
+    def get_photos_by_event(self, event_id: int) -> List[Photo]:
         """Retorna todas as fotos de um evento"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT PhotoId, EventId, Filename, UploadDate
+                    SELECT PhotoId, EventId, Filename, UploadDate, ContentHash
                     FROM Photos 
                     WHERE EventId = ?
                     ORDER BY UploadDate DESC
                 """, (event_id,))
                 
-                photos = []
-                for row in cursor.fetchall():
-                    photos.append({
-                        'PhotoId': row[0],
-                        'EventId': row[1],
-                        'Filename': row[2],
-                        'UploadDate': row[3].strftime('%Y-%m-%d %H:%M:%S') if row[3] else None
-                    })
-                
-                return photos
+                return fetch_rows(cursor, Photo)
                 
         except Exception as e:
-            print(f"❌ Erro ao buscar fotos: {e}")
+            logger.error("Erro ao buscar fotos: %s", e)
             return []
     
-    def get_all_photos(self) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _encode_photo_cursor(upload_date: datetime, photo_id: int) -> str:
+        raw = f'{upload_date.isoformat()}|{photo_id}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+    
+    @staticmethod
+    def _decode_photo_cursor(cursor_value: str) -> Tuple[datetime, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor_value + '=' * (-len(cursor_value) % 4)).decode()
+            upload_date, photo_id = raw.split('|')
+            return datetime.fromisoformat(upload_date), int(photo_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError('Cursor de paginação inválido') from e
+    
+    @cached('photos:{event_id}')
+    def get_photos_page(self, event_id: int, limit: int,
+                        cursor_value: Optional[str] = None) -> Tuple[List[Photo], Optional[str]]:
+        """Uma página das fotos do evento, das mais recentes para as mais antigas
+        
+        A paginação é por chave: ``cursor_value`` (devolvido pela página
+        anterior) guarda o (UploadDate, PhotoId) da última foto, e a consulta
+        começa logo depois dele no índice IX_Photos_EventPage. Qualquer página
+        custa o mesmo que a primeira, e fotos novas não deslocam as seguintes.
+        Retorna as fotos e o cursor da próxima página (None na última).
+        Levanta ValueError se o cursor for inválido.
+        """
+        params: List[Any] = [event_id]
+        after = ''
+        if cursor_value:
+            upload_date, photo_id = self._decode_photo_cursor(cursor_value)
+            after = 'AND (UploadDate < ? OR (UploadDate = ? AND PhotoId < ?))'
+            params += [upload_date, upload_date, photo_id]
+        # Uma linha a mais indica se existe próxima página
+        params += [0, limit + 1]
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT PhotoId, EventId, Filename, UploadDate, ContentHash
+                    FROM Photos
+                    WHERE EventId = ? {after}
+                    ORDER BY UploadDate DESC, PhotoId DESC
+                    {self.backend.limit_clause()}
+                """, params)
+                photos = fetch_rows(cursor, Photo)
+        except Exception as e:
+            logger.error("Erro ao buscar página de fotos: %s", e)
+            return [], None
+        
+        next_cursor = None
+        if len(photos) > limit:
+            del photos[limit:]
+            next_cursor = self._encode_photo_cursor(photos[-1].UploadDate, photos[-1].PhotoId)
+        return photos, next_cursor
+    
+    @cached('photos:{event_id}')
+    def count_photos(self, event_id: int) -> int:
+        """Total de fotos do evento (contagem no índice, sem ler as linhas)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM Photos WHERE EventId = ?", (event_id,))
+                return cursor.fetchone()[0]
+        except Exception as e:
+            logger.error("Erro ao contar fotos: %s", e)
+            return 0
+    
+    def get_all_photos(self) -> List[Photo]:
         """Retorna todas as fotos"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT PhotoId, EventId, Filename, UploadDate
+                    SELECT PhotoId, EventId, Filename, UploadDate, ContentHash
                     FROM Photos
                     ORDER BY UploadDate DESC
                 """)
                 
-                photos = []
-                for row in cursor.fetchall():
-                    photos.append({
-                        'PhotoId': row[0],
-                        'EventId': row[1],
-                        'Filename': row[2],
-                        'UploadDate': row[3].strftime('%Y-%m-%d %H:%M:%S') if row[3] else None
-                    })
-                
-                return photos
+                return fetch_rows(cursor, Photo)
                 
         except Exception as e:
-            print(f"❌ Erro ao buscar fotos: {e}")
+            logger.error("Erro ao buscar fotos: %s", e)
             return []
     
     def get_photo_by_id(self, photo_id: int) -> Optional[Dict[str, Any]]:
-        """Busca uma foto pelo ID"""
+        """Busca uma foto pelo ID (sem os bytes: o arquivo fica no PhotoStore)"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT PhotoId, EventId, Filename, UploadDate, Image
+                    SELECT PhotoId, EventId, Filename, UploadDate, ContentHash, Width, Height
                     FROM Photos WHERE PhotoId = ?
                 """, (photo_id,))
                 
@@ -379,59 +893,212 @@ class DatabaseManager:
                         'PhotoId': photo_data[0],
                         'EventId': photo_data[1],
                         'Filename': photo_data[2],
-                        'UploadDate': photo_data[3].strftime('%Y-%m-%d %H:%M:%S') if photo_data[3] else None,
-                        'Image': photo_data[4]
+                        'UploadDate': photo_data[3],
+                        'ContentHash': photo_data[4],
+                        'Width': photo_data[5],
+                        'Height': photo_data[6]
                     }
                 return None
                 
         except Exception as e:
-            print(f"❌ Erro ao buscar foto: {e}")
+            logger.error("Erro ao buscar foto: %s", e)
+            return None
+    
+    def get_events_by_content_hash(self, content_hash: str) -> List[Event]:
+        """Eventos que têm uma foto com este conteúdo (o mesmo arquivo pode estar em vários)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT DISTINCT e.EventId, e.Name, e.Date, e.OwnerId
+                    FROM Photos p JOIN Events e ON e.EventId = p.EventId
+                    WHERE p.ContentHash = ?
+                """, (content_hash,))
+                return fetch_rows(cursor, Event)
+        except Exception as e:
+            logger.error("Erro ao buscar eventos da foto: %s", e)
+            return []
+    
+    def get_photo_image(self, photo_id: int) -> Optional[bytes]:
+        """Bytes de uma foto antiga, gravada na coluna Image antes do PhotoStore"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT Image FROM Photos WHERE PhotoId = ?", (photo_id,))
+                row = cursor.fetchone()
+                return bytes(row[0]) if row and row[0] is not None else None
+        except Exception as e:
+            logger.error("Erro ao buscar imagem da foto: %s", e)
             return None
     
+    def get_photos_by_ids(self, photo_ids: List[int]) -> List[Photo]:
+        """Retorna as fotos dos IDs informados, na mesma ordem"""
+        if not photo_ids:
+            return []
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                found = {}
+                # Lotes de 1000 para ficar abaixo do limite de parâmetros do SQL Server
+                for start in range(0, len(photo_ids), 1000):
+                    chunk = list(photo_ids[start:start + 1000])
+                    placeholders = ', '.join('?' * len(chunk))
+                    cursor.execute(f"""
+                        SELECT PhotoId, EventId, Filename, UploadDate, ContentHash
+                        FROM Photos WHERE PhotoId IN ({placeholders})
+                    """, chunk)
+                    for photo in fetch_rows(cursor, Photo):
+                        found[photo.PhotoId] = photo
+                
+                return [found[photo_id] for photo_id in photo_ids if photo_id in found]
+                
+        except Exception as e:
+            logger.error("Erro ao buscar fotos: %s", e)
+            return []
+    
+    def get_events_by_ids(self, event_ids: List[int]) -> List[Event]:
+        """Retorna os eventos dos IDs informados (sem ordem definida)"""
+        if not event_ids:
+            return []
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                events = []
+                event_ids = list(event_ids)
+                # Lotes de 1000 para ficar abaixo do limite de parâmetros do SQL Server
+                for start in range(0, len(event_ids), 1000):
+                    chunk = event_ids[start:start + 1000]
+                    placeholders = ', '.join('?' * len(chunk))
+                    cursor.execute(f"""
+                        SELECT EventId, Name, Date, OwnerId
+                        FROM Events WHERE EventId IN ({placeholders})
+                    """, chunk)
+                    events += fetch_rows(cursor, Event)
+                
+                return events
+                
+        except Exception as e:
+            logger.error("Erro ao buscar eventos: %s", e)
+            return []
+    
+    # Métodos para reconhecimento facial
+    def _insert_faces(self, cursor, event_id: int, photos: List[Tuple[int, List[Dict[str, Any]]]]):
+        """Insere as faces de uma ou mais fotos [(PhotoId, faces)] usando o
+        cursor (e a transação) do chamador"""
+        self.backend.executemany(cursor, """
+            INSERT INTO PhotoFaces (PhotoId, EventId, BoxX, BoxY, BoxWidth, BoxHeight, Embedding)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (photo_id, event_id, *face['box'], face['embedding'].astype('float32').tobytes())
+            for photo_id, faces in photos
+            for face in faces
+        ])
+    
+    def _index_faces(self, event_id: int, photo_id: int, faces: List[Dict[str, Any]]):
+        """Acrescenta as faces recém-gravadas ao índice facial em disco"""
+        if self.face_index is not None:
+            self.face_index.append(event_id, photo_id, [face['embedding'] for face in faces])
+    
+    def save_photo_faces(self, photo_id: int, event_id: int, faces: List[Dict[str, Any]]) -> bool:
+        """Salva as faces detectadas em uma foto já existente"""
+        if not faces:
+            return True
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                self._insert_faces(cursor, event_id, [(photo_id, faces)])
+                conn.commit()
+            
+            self._index_faces(event_id, photo_id, faces)
+            return True
+                
+        except Exception as e:
+            logger.error("Erro ao salvar faces: %s", e)
+            return False
+    
+    def replace_photo_faces(self, photo_id: int, event_id: int, faces: List[Dict[str, Any]]) -> bool:
+        """Substitui as faces de uma foto (nova análise, ex.: com outro descritor)
+        
+        O índice facial do evento é descartado e reconstruído na próxima busca.
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM PhotoFaces WHERE PhotoId = ?", (photo_id,))
+                if faces:
+                    self._insert_faces(cursor, event_id, [(photo_id, faces)])
+                conn.commit()
+            
+            if self.face_index is not None:
+                self.face_index.invalidate(event_id)
+            return True
+                
+        except Exception as e:
+            logger.error("Erro ao substituir faces: %s", e)
+            return False
+    
     # Métodos de compatibilidade com o app_simple_fixed.py
-    def get_users(self) -> List[Dict[str, Any]]:
+    def get_users(self) -> List[User]:
         """Retorna todos os usuários (compatibilidade)"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT UserId, Username, Email, UserType, FullName, CPF, Phone, CreatedDate
+                    SELECT UserId, Username, Email, COALESCE(UserType, 'customer'), FullName, CPF, Phone, CreatedDate
                     FROM Users
                     ORDER BY CreatedDate DESC
                 """)
                 
-                users = []
-                for row in cursor.fetchall():
-                    users.append({
-                        'UserId': row[0],
-                        'Username': row[1],
-                        'Email': row[2],
-                        'UserType': row[3] if row[3] else 'customer',
-                        'FullName': row[4],
-                        'CPF': row[5],
-                        'Phone': row[6],
-                        'CreatedDate': row[7].strftime('%Y-%m-%d %H:%M:%S') if row[7] else None
-                    })
-                
-                return users
+                return fetch_rows(cursor, User)
                 
         except Exception as e:
-            print(f"❌ Erro ao buscar usuários: {e}")
+            logger.error("Erro ao buscar usuários: %s", e)
             return []
     
-    def get_events(self) -> List[Dict[str, Any]]:
+    def get_events(self) -> List[Event]:
         """Retorna todos os eventos (compatibilidade)"""
         return self.get_all_events()
     
-    def get_photos(self) -> List[Dict[str, Any]]:
+    def get_photos(self) -> List[Photo]:
         """Retorna todas as fotos (compatibilidade)"""
         return self.get_all_photos()
     
-    def get_photo_analyses(self) -> List[Dict[str, Any]]:
-        """Retorna análises de fotos (compatibilidade)"""
-        # Por enquanto retorna lista vazia, pode ser implementado depois
-        return []
+    def get_photo_analyses(self, event_id: int = None) -> List[Dict[str, Any]]:
+        """Retorna as análises faciais (uma por face), opcionalmente de um evento
+        
+        É a fonte usada para (re)construir o índice facial em disco.
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                query = """
+                    SELECT FaceId, PhotoId, EventId, BoxX, BoxY, BoxWidth, BoxHeight, Embedding
+                    FROM PhotoFaces
+                """
+                if event_id is not None:
+                    cursor.execute(query + " WHERE EventId = ? ORDER BY FaceId", (event_id,))
+                else:
+                    cursor.execute(query + " ORDER BY FaceId")
+                
+                analyses = []
+                for row in cursor.fetchall():
+                    analyses.append({
+                        'FaceId': row[0],
+                        'PhotoId': row[1],
+                        'EventId': row[2],
+                        'Box': (row[3], row[4], row[5], row[6]),
+                        'Embedding': bytes(row[7])
+                    })
+                
+                return analyses
+                
+        except Exception as e:
+            logger.error("Erro ao buscar análises de fotos: %s", e)
+            return []
     
     def add_user(self, user_data: Dict[str, Any]) -> Optional[int]:
         """Adiciona um usuário (compatibilidade)"""
@@ -449,16 +1116,43 @@ class DatabaseManager:
         """Adiciona um evento (compatibilidade)"""
         return self.create_event(
             event_data.get('name', ''),
-            event_data.get('date', '')
+            event_data.get('date', ''),
+            event_data.get('owner_id')
         )
     
     def add_photo(self, photo_data: Dict[str, Any]) -> Optional[int]:
         """Adiciona uma foto (compatibilidade)"""
-        return self.save_photo(
-            photo_data.get('event_id', 0),
-            photo_data.get('filename', ''),
-            photo_data.get('image_data')
-        )
+        photo_ids = self.add_photos([photo_data])
+        return photo_ids[0] if photo_ids else None
+    
+    def add_photos(self, photos_data: List[Dict[str, Any]]) -> List[int]:
+        """Adiciona várias fotos em lote (compatibilidade)
+        
+        Cada item traz o seu ``event_id``; os itens são agrupados por evento
+        e cada grupo é salvo em uma transação. Retorna os PhotoIds na ordem dos
+        itens (lista vazia se algum grupo falhar; os grupos anteriores ficam
+        salvos).
+        """
+        by_event: Dict[int, List[int]] = {}
+        for position, photo_data in enumerate(photos_data):
+            if photo_data.get('event_id') is None:
+                raise ValueError(f'Foto {position} sem event_id')
+            by_event.setdefault(photo_data['event_id'], []).append(position)
+        
+        photo_ids: List[Optional[int]] = [None] * len(photos_data)
+        for event_id, positions in by_event.items():
+            saved = self.save_photos_bulk(event_id, [
+                {
+                    'filename': photos_data[position].get('filename', ''),
+                    'image_data': photos_data[position].get('image_data')
+                }
+                for position in positions
+            ])
+            if not saved:
+                return []
+            for position, photo_id in zip(positions, saved):
+                photo_ids[position] = photo_id
+        return photo_ids
 
 # Exemplo de uso
 if __name__ == "__main__":
@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+class PoolTimeoutError(Exception):
+    """Nenhuma conexão ficou disponível dentro do tempo de espera"""
+
+
+class _PooledConnection:
+    """Conexão física mantida pelo pool, com os horários de uso"""
+
+    __slots__ = ('raw', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Pool de conexões thread-safe compartilhado pelo DatabaseManager
+
+    - ``max_size``: número máximo de conexões abertas (em uso + ociosas)
+    - ``idle_timeout``: conexões ociosas há mais tempo que isso são fechadas
+    - ``health_check_interval``: conexões paradas há mais tempo que isso são
+      testadas antes de serem entregues (0 testa em todo checkout)
+    - ``acquire_timeout``: tempo máximo de espera por uma conexão livre
+    """
+
+    def __init__(self, connect: Callable[[], Any], max_size: int = 10, idle_timeout: float = 300.0,
+                 health_check_interval: float = 30.0, acquire_timeout: float = 30.0,
+                 ping: Optional[Callable[[Any], None]] = None):
+        if max_size < 1:
+            raise ValueError('max_size deve ser pelo menos 1')
+        self._connect = connect
+        self._ping = ping or self._default_ping
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+
+        self._cond = threading.Condition(threading.Lock())
+        self._reset_state()
+
+    def _reset_state(self):
+        """(Re)inicializa o estado interno do pool"""
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._in_use = 0
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'closed': 0,
+            'reconnects': 0,
+            'failed_health_checks': 0,
+            'timeouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    @staticmethod
+    def _default_ping(raw):
+        """Verifica se a conexão ainda responde"""
+        cursor = raw.cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _check_fork(self):
+        """Descarta conexões herdadas do processo pai após um fork
+
+        Sockets ODBC não podem ser compartilhados entre processos, então
+        cada worker do gunicorn recomeça com um pool vazio.
+        """
+        if self._pid != os.getpid():
+            self._reset_state()
+
+    def _new_connection(self) -> _PooledConnection:
+        conn = _PooledConnection(self._connect())
+        with self._cond:
+            self._stats['created'] += 1
+        return conn
+
+    def _discard(self, conn: _PooledConnection):
+        self._close_quietly(conn.raw)
+        with self._cond:
+            self._stats['closed'] += 1
+
+    def _is_healthy(self, conn: _PooledConnection) -> bool:
+        if time.monotonic() - conn.last_used < self.health_check_interval:
+            return True
+        try:
+            self._ping(conn.raw)
+            return True
+        except Exception:
+            with self._cond:
+                self._stats['failed_health_checks'] += 1
+            return False
+
+    def acquire(self):
+        """Retira uma conexão do pool, aguardando se todas estiverem em uso"""
+        expired = []
+        started = time.monotonic()
+        waited = False
+        conn = None
+
+        with self._cond:
+            self._check_fork()
+            deadline = started + self.acquire_timeout
+            while True:
+                now = time.monotonic()
+                # Fecha conexões ociosas que passaram do idle_timeout
+                while self._idle and now - self._idle[0].last_used > self.idle_timeout:
+                    expired.append(self._idle.popleft())
+                if self._idle:
+                    # LIFO: reutiliza a conexão mais recente (mais provável de estar viva)
+                    conn = self._idle.pop()
+                    break
+                if self._in_use < self.max_size:
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f'Nenhuma conexão disponível após {self.acquire_timeout:.1f}s '
+                        f'(max_size={self.max_size})'
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            if waited:
+                wait_time = time.monotonic() - started
+                self._stats['waits'] += 1
+                self._stats['wait_time_total'] += wait_time
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+
+        for old in expired:
+            self._discard(old)
+
+        try:
+            if conn is not None and not self._is_healthy(conn):
+                # Reconecta de forma transparente quando a conexão caiu
+                self._discard(conn)
+                conn = None
+                with self._cond:
+                    self._stats['reconnects'] += 1
+            if conn is None:
+                conn = self._new_connection()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn: _PooledConnection, discard: bool = False):
+        """Devolve uma conexão ao pool (ou a descarta se estiver inválida)"""
+        if discard:
+            self._discard(conn)
+        with self._cond:
+            if self._pid != os.getpid():
+                # Conexão emprestada antes de um fork: não volta para o pool novo
+                return
+            self._in_use -= 1
+            if not discard:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão durante o bloco ``with``
+
+        Mantém a semântica do ``with pyodbc.connect()``: commit ao sair sem
+        erro, rollback em caso de exceção. Se o próprio commit/rollback falhar
+        a conexão é considerada quebrada e descartada.
+        """
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn.raw
+            try:
+                conn.raw.commit()
+            except Exception:
+                discard = True
+                raise
+        except Exception:
+            if not discard:
+                try:
+                    conn.raw.rollback()
+                except Exception:
+                    discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def close(self):
+        """Fecha todas as conexões ociosas"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do pool para dimensionamento por worker"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['in_use'] = self._in_use
+            stats['idle'] = len(self._idle)
+            stats['max_size'] = self.max_size
+        stats['wait_time_avg'] = stats['wait_time_total'] / stats['waits'] if stats['waits'] else 0.0
+        return stats
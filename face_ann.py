@@ -0,0 +1,376 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from face_engine import match_embeddings, normalize_rows
+from face_index import FaceIndexStore, file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class FaceANNIndex:
+    """Índice aproximado (IVF) sobre as faces de todos os eventos
+
+    Os vetores são agrupados por k-means esférico em ``nlist`` listas. Uma
+    busca compara a consulta com os centróides, varre apenas as ``nprobe``
+    listas mais próximas usando cópias float16 dos vetores e, por fim, refaz
+    o cálculo exato em float32 para os ``rerank`` melhores candidatos. Com
+    poucos vetores (abaixo de ``min_vectors``) a busca é exata.
+
+    Cada construção grava uma nova versão em ``<root>/_global/v<timestamp>/``
+    e troca o arquivo CURRENT de forma atômica; os arquivos são abertos com
+    mmap e compartilhados entre os workers.
+    """
+
+    def __init__(self, store: FaceIndexStore, config: Dict[str, Any],
+                 event_source: Optional[Callable[[], Iterable[int]]] = None):
+        self.store = store
+        self.dimension = store.dimension
+        self.config = config
+        # Fonte dos EventIds a indexar (por padrão, os que já têm índice por evento)
+        self.event_source = event_source or store.event_ids
+        self.root = os.path.join(store.root, '_global')
+        os.makedirs(self.root, exist_ok=True)
+        self._loaded = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        # Próxima verificação de desatualização (percorre a pasta de todos os eventos)
+        self._next_stale_check = 0.0
+
+    # Construção
+
+    def _kmeans(self, sample: np.ndarray, nlist: int, rng: np.random.Generator) -> np.ndarray:
+        """K-means esférico (similaridade de cosseno) sobre a amostra"""
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(int(self.config['kmeans_iterations'])):
+            assignment = self._assign(sample, centroids)
+            order = np.argsort(assignment, kind='stable')
+            sorted_assignment = assignment[order]
+            starts = np.searchsorted(sorted_assignment, np.arange(nlist))
+            counts = np.bincount(assignment, minlength=nlist)
+            non_empty = counts > 0
+            sums = np.add.reduceat(sample[order], starts[non_empty], axis=0)
+            # Listas vazias mantêm o centróide anterior
+            centroids[non_empty] = normalize_rows(sums)
+        return centroids
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        """Índice do centróide mais próximo de cada vetor (em blocos)"""
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            block = np.asarray(vectors[start:start + chunk])
+            assignment[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        return assignment
+
+    def _sources(self) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+        """(EventId, embeddings, photo_ids) de cada evento, mapeados em memória (nada é copiado)"""
+        sources = []
+        for event_id in self.event_source():
+            embeddings, photo_ids = self.store.load(event_id)
+            if len(photo_ids):
+                sources.append((event_id, embeddings, photo_ids))
+        return sources
+
+    @staticmethod
+    def _blocks(sources: List[Tuple[int, np.ndarray, np.ndarray]],
+                chunk: int = 16384) -> Iterator[Tuple[int, np.ndarray]]:
+        """(posição global, bloco de vetores) percorrendo os eventos em ordem"""
+        position = 0
+        for _, embeddings, _ in sources:
+            for start in range(0, len(embeddings), chunk):
+                yield position + start, np.asarray(embeddings[start:start + chunk])
+            position += len(embeddings)
+
+    @staticmethod
+    def _rows(sources: List[Tuple[int, np.ndarray, np.ndarray]], rows: np.ndarray) -> np.ndarray:
+        """Linhas (posições globais em ordem crescente) lidas dos índices por evento"""
+        parts = []
+        position = 0
+        for _, embeddings, _ in sources:
+            lo, hi = np.searchsorted(rows, [position, position + len(embeddings)])
+            if hi > lo:
+                parts.append(np.asarray(embeddings[rows[lo:hi] - position]))
+            position += len(embeddings)
+        return np.concatenate(parts)
+
+    def build(self) -> Dict[str, Any]:
+        """Constrói uma nova versão do índice com as faces de todos os eventos"""
+        with file_lock(os.path.join(self.root, '.lock')):
+            return self._build_locked()
+
+    def _rebuild(self, seen: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Substitui a versão ``seen`` (None: nenhuma), se ninguém o fez enquanto se esperava a trava
+
+        Vários workers podem achar o índice ausente ou desatualizado ao mesmo
+        tempo: só o primeiro constrói, os demais passam a usar a versão nova.
+        """
+        with file_lock(os.path.join(self.root, '.lock')):
+            if self._current_version() != seen:
+                return None
+            return self._build_locked()
+
+    def _build_locked(self) -> Dict[str, Any]:
+        """Construção em blocos: os vetores vão dos índices por evento direto
+        para os arquivos da nova versão, sem uma matriz com todas as faces na memória"""
+        started = time.monotonic()
+        sources = self._sources()
+        count = sum(len(photo_ids) for _, _, photo_ids in sources)
+
+        nlist = int(self.config.get('nlist') or 0) or int(4 * np.sqrt(max(count, 1)))
+        nlist = max(1, min(nlist, count or 1, int(self.config['kmeans_sample'])))
+        rng = np.random.default_rng(int(self.config.get('seed', 0)))
+
+        assignment = np.empty(count, dtype=np.int64)
+        if count:
+            sample_size = min(count, int(self.config['kmeans_sample']))
+            sample = self._rows(sources, np.sort(rng.choice(count, sample_size, replace=False)))
+            centroids = self._kmeans(sample, nlist, rng)
+            del sample
+            for start, block in self._blocks(sources):
+                assignment[start:start + len(block)] = self._assign(block, centroids)
+        else:
+            centroids = np.zeros((nlist, self.dimension), dtype=np.float32)
+
+        # Vetores de uma mesma lista ficam contíguos: cada lista é uma fatia.
+        # ``position`` é a linha de cada vetor (na ordem dos eventos) no arquivo final
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.searchsorted(assignment[order], np.arange(nlist + 1)).astype(np.int64)
+        position = np.empty(count, dtype=np.int64)
+        position[order] = np.arange(count)
+        del assignment
+
+        version = f'v{int(time.time() * 1000)}'
+        directory = os.path.join(self.root, version)
+        os.makedirs(directory)
+        np.ascontiguousarray(centroids, dtype=np.float32).tofile(os.path.join(directory, 'centroids.f32'))
+        if count:
+            vectors32 = np.memmap(os.path.join(directory, 'vectors.f32'), dtype=np.float32, mode='w+',
+                                  shape=(count, self.dimension))
+            vectors16 = np.memmap(os.path.join(directory, 'vectors.f16'), dtype=np.float16, mode='w+',
+                                  shape=(count, self.dimension))
+            for start, block in self._blocks(sources):
+                rows = position[start:start + len(block)]
+                vectors32[rows] = block
+                vectors16[rows] = block
+            vectors32.flush()
+            vectors16.flush()
+            del vectors32, vectors16
+        else:
+            for name in ('vectors.f32', 'vectors.f16'):
+                open(os.path.join(directory, name), 'wb').close()
+        photo_ids = np.concatenate([np.asarray(ids) for _, _, ids in sources]) if sources else np.empty(0, np.int64)
+        event_ids = (np.concatenate([np.full(len(ids), event_id, dtype=np.int64) for event_id, _, ids in sources])
+                     if sources else np.empty(0, np.int64))
+        photo_ids[order].tofile(os.path.join(directory, 'photo_ids.i64'))
+        event_ids[order].tofile(os.path.join(directory, 'event_ids.i64'))
+        offsets.tofile(os.path.join(directory, 'offsets.i64'))
+
+        meta = {
+            'version': version,
+            'dimension': self.dimension,
+            'count': count,
+            'nlist': nlist,
+            'events': len(sources),
+            'built_at': time.time(),
+            'build_seconds': round(time.monotonic() - started, 3)
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w') as handle:
+            json.dump(meta, handle)
+
+        current_path = os.path.join(self.root, 'CURRENT')
+        with open(current_path + '.tmp', 'w') as handle:
+            handle.write(version)
+        os.replace(current_path + '.tmp', current_path)
+        self._cleanup(keep=version)
+
+        logger.info("Índice facial global %s: %d faces de %d eventos, %d listas", version, count, len(sources), nlist)
+        return meta
+
+    def _cleanup(self, keep: str):
+        """Remove versões antigas (mantém a atual e a anterior, que pode estar mapeada)"""
+        versions = sorted(name for name in os.listdir(self.root) if name.startswith('v'))
+        for name in versions[:-2]:
+            if name != keep:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    # Leitura
+
+    def _current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, 'CURRENT')) as handle:
+                return handle.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _load(self, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        version = version or self._current_version()
+        if version is None:
+            return None
+        with self._lock:
+            if self._loaded and self._loaded['meta']['version'] == version:
+                return self._loaded
+
+        directory = os.path.join(self.root, version)
+        with open(os.path.join(directory, 'meta.json')) as handle:
+            meta = json.load(handle)
+        count, nlist, dimension = meta['count'], meta['nlist'], meta['dimension']
+        if dimension != self.dimension:
+            # Versão construída com outro descritor: tratada como ausente
+            return None
+
+        def open_map(name, dtype, shape):
+            if count == 0 and name != 'centroids.f32' and name != 'offsets.i64':
+                return np.empty(shape, dtype=dtype)
+            return np.memmap(os.path.join(directory, name), dtype=dtype, mode='r', shape=shape)
+
+        loaded = {
+            'meta': meta,
+            'centroids': np.fromfile(os.path.join(directory, 'centroids.f32'), dtype=np.float32).reshape(nlist, dimension),
+            'offsets': np.fromfile(os.path.join(directory, 'offsets.i64'), dtype=np.int64),
+            'vectors': open_map('vectors.f32', np.float32, (count, dimension)),
+            'vectors16': open_map('vectors.f16', np.float16, (count, dimension)),
+            'photo_ids': open_map('photo_ids.i64', np.int64, (count,)),
+            'event_ids': open_map('event_ids.i64', np.int64, (count,)),
+        }
+        with self._lock:
+            self._loaded = loaded
+        return loaded
+
+    def source_count(self) -> int:
+        """Total de faces nos índices por evento (só consulta o tamanho dos arquivos)"""
+        return sum(self.store.face_count(event_id) for event_id in self.store.event_ids())
+
+    def is_stale(self, index: Dict[str, Any]) -> bool:
+        """O índice está desatualizado além da tolerância configurada?"""
+        built = index['meta']['count']
+        age = time.time() - index['meta']['built_at']
+        if age > float(self.config['max_age']):
+            return True
+        return self.source_count() > built * (1 + float(self.config['max_staleness']))
+
+    def _rebuild_in_background(self, seen: str):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            try:
+                self._rebuild(seen)
+            except Exception as e:
+                logger.exception("Erro ao reconstruir índice facial global")
+            finally:
+                with self._lock:
+                    self._rebuilding = False
+
+        threading.Thread(target=run, name='face-ann-rebuild', daemon=True).start()
+
+    def ensure(self) -> Dict[str, Any]:
+        """Carrega o índice, construindo-o se ainda não existir
+
+        Um índice desatualizado continua servindo buscas enquanto uma nova
+        versão é construída em segundo plano. A desatualização é verificada
+        no máximo uma vez a cada ``stale_check_interval`` segundos: o custo
+        cresce com o número de eventos e não deve recair sobre cada busca.
+        """
+        seen = self._current_version()
+        index = self._load(seen)
+        if index is None:
+            self._rebuild(seen)
+            return self._load()
+        now = time.monotonic()
+        with self._lock:
+            check = now >= self._next_stale_check
+            if check:
+                self._next_stale_check = now + float(self.config['stale_check_interval'])
+        if check and self.is_stale(index):
+            self._rebuild_in_background(index['meta']['version'])
+        return index
+
+    def preload(self) -> Dict[str, Any]:
+        """Carrega o índice (construindo-o se não existir), sem reconstrução em segundo plano
+
+        Usado na preparação antes do fork dos workers (warmup.py): a thread
+        de reconstrução não passaria para eles. Um índice desatualizado é
+        reconstruído a partir da primeira busca de um worker, como em ``ensure``.
+        """
+        seen = self._current_version()
+        index = self._load(seen)
+        if index is None:
+            self._rebuild(seen)
+            index = self._load()
+        return index
+
+    def search(self, query: np.ndarray, threshold: float, limit: Optional[int] = None,
+               event_ids: Optional[Iterable[int]] = None, nprobe: Optional[int] = None,
+               rerank: Optional[int] = None) -> List[Tuple[int, int, float]]:
+        """Busca a consulta em todos os eventos
+
+        Retorna [(PhotoId, EventId, similaridade)]. ``event_ids`` restringe a
+        busca a um subconjunto de eventos (ex.: os do ano); ``nprobe`` e
+        ``rerank`` sobrescrevem os ajustes de recall/latência da configuração.
+        """
+        index = self.ensure()
+        count = index['meta']['count']
+        if count == 0:
+            return []
+
+        query = query.reshape(-1, self.dimension).astype(np.float32)
+        nprobe = int(nprobe or self.config['nprobe'])
+        rerank = int(rerank or self.config['rerank'])
+        nlist = index['meta']['nlist']
+
+        if count < int(self.config['min_vectors']) or nprobe >= nlist:
+            # Poucos vetores: a busca exata é mais barata que a aproximada. Sem
+            # filtro ela usa os arquivos mapeados direto, sem copiar a matriz
+            if event_ids is None:
+                vectors, photo_ids, row_events = index['vectors'], index['photo_ids'], index['event_ids']
+            else:
+                candidates = np.flatnonzero(np.isin(index['event_ids'], np.fromiter(event_ids, dtype=np.int64)))
+                vectors = index['vectors'][candidates]
+                photo_ids = index['photo_ids'][candidates]
+                row_events = index['event_ids'][candidates]
+        else:
+            # 1. Listas cujos centróides mais se parecem com a consulta
+            centroid_scores = (index['centroids'] @ query.T).max(axis=1)
+            lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            offsets = index['offsets']
+            candidates = np.concatenate([np.arange(offsets[l], offsets[l + 1]) for l in lists])
+            if candidates.size == 0:
+                return []
+
+            # 2. Varredura aproximada em float16 e corte nos melhores candidatos
+            approx = (np.asarray(index['vectors16'][candidates], dtype=np.float32) @ query.T).max(axis=1)
+            if event_ids is not None:
+                allowed = np.isin(np.asarray(index['event_ids'][candidates]), np.fromiter(event_ids, dtype=np.int64))
+                candidates, approx = candidates[allowed], approx[allowed]
+            if candidates.size > rerank:
+                top = np.argpartition(-approx, rerank - 1)[:rerank]
+                candidates = candidates[top]
+            candidates.sort()
+            vectors = index['vectors'][candidates]
+            photo_ids = index['photo_ids'][candidates]
+            row_events = index['event_ids'][candidates]
+
+        # 3. Re-ranqueamento exato em float32
+        matches = match_embeddings(query, vectors, photo_ids, threshold, limit)
+        if not matches:
+            return []
+
+        # Evento de cada foto encontrada (só das linhas delas)
+        rows = np.flatnonzero(np.isin(photo_ids, [photo_id for photo_id, _ in matches]))
+        photo_events = dict(zip(np.asarray(photo_ids[rows]).tolist(), np.asarray(row_events[rows]).tolist()))
+        return [(photo_id, photo_events[photo_id], score) for photo_id, score in matches]
+
+    def stats(self) -> Dict[str, Any]:
+        """Metadados da versão carregada"""
+        index = self._load()
+        return dict(index['meta']) if index else {'count': 0}
@@ -0,0 +1,242 @@
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import FACE_RECOGNITION_CONFIG
+
+try:
+    import cv2
+except ImportError:  # OpenCV é opcional: sem ele a busca facial fica indisponível
+    cv2 = None
+
+
+def _uniform_lbp_table() -> np.ndarray:
+    """Código LBP (0-255) -> bin do histograma uniforme
+
+    Os 58 padrões uniformes (no máximo duas transições 0/1 no círculo de
+    vizinhos) têm um bin cada; os demais dividem o último bin.
+    """
+    uniform = [code for code in range(256)
+               if sum(((code >> i) & 1) != ((code >> ((i + 1) % 8)) & 1) for i in range(8)) <= 2]
+    table = np.full(256, len(uniform), dtype=np.intp)
+    table[uniform] = np.arange(len(uniform))
+    return table
+
+
+UNIFORM_LBP = _uniform_lbp_table()
+
+
+class FaceEngineUnavailable(Exception):
+    """OpenCV não está instalado ou o modelo não pôde ser carregado"""
+
+
+class FaceEngine:
+    """Pipeline de reconhecimento facial em CPU: detecção, embedding e busca
+
+    A detecção usa o Haar cascade do OpenCV, parametrizado por
+    FACE_RECOGNITION_CONFIG (scale_factor, min_neighbors, min_face_size).
+    Os embeddings vêm do modelo SFace (``embedding_model``, ONNX) quando
+    configurado; sem ele é usado um histograma de LBP uniforme em grade, mais
+    fraco, mas determinístico e sem dependências extras. Os vetores são
+    float32 normalizados (norma L2 = 1), então similaridade = produto
+    escalar; o limiar depende do descritor (``similarity_threshold``).
+    """
+
+    LBP_GRID = 4
+    LBP_BINS = int(UNIFORM_LBP.max()) + 1  # 58 padrões uniformes + 1 para os demais
+    LBP_FACE_SIZE = 64
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**FACE_RECOGNITION_CONFIG, **(config or {})}
+        self._model = self.config.get('embedding_model') or None
+        # Detector e modelo por thread: as threads de upload e as requisições de
+        # busca usam o engine ao mesmo tempo, e as instâncias do OpenCV não
+        # podem ser chamadas em paralelo (o cascade falha em asserções internas)
+        self._local = threading.local()
+        self._available = False
+
+        if cv2 is not None:
+            self._cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+            # Carrega as instâncias desta thread e confirma que os arquivos abrem
+            self._available = not self._detector.empty() and (not self._model or self._recognizer is not None)
+
+        threshold = self.config['similarity_threshold']
+        if isinstance(threshold, dict):
+            threshold = threshold[self.descriptor]
+        self.similarity_threshold = float(threshold)
+
+    @property
+    def _detector(self):
+        """CascadeClassifier da thread atual (criado no primeiro uso)"""
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self._local.detector = cv2.CascadeClassifier(self._cascade_path)
+        return detector
+
+    @property
+    def _recognizer(self):
+        """FaceRecognizerSF da thread atual (criado no primeiro uso)"""
+        recognizer = getattr(self._local, 'recognizer', None)
+        if recognizer is None:
+            recognizer = self._local.recognizer = cv2.FaceRecognizerSF.create(self._model, '')
+        return recognizer
+
+    @property
+    def available(self) -> bool:
+        """Indica se o pipeline pode ser usado neste processo"""
+        return self._available
+
+    @property
+    def descriptor(self) -> str:
+        """Descritor dos embeddings: ``sface`` (modelo ONNX) ou ``lbp``"""
+        return 'sface' if self._model else 'lbp'
+
+    @property
+    def dimension(self) -> int:
+        """Dimensão dos embeddings gerados"""
+        if self._model:
+            return 128
+        return self.LBP_GRID * self.LBP_GRID * self.LBP_BINS
+
+    def _require(self):
+        if not self.available:
+            raise FaceEngineUnavailable('Reconhecimento facial requer opencv-python-headless')
+
+    def decode(self, image_data: bytes) -> Tuple[Any, float]:
+        """Decodifica a imagem e a reduz para detecção; retorna (imagem BGR, escala)"""
+        self._require()
+        image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError('Arquivo de imagem inválido')
+
+        scale = 1.0
+        max_side = int(self.config.get('max_image_side') or 0)
+        height, width = image.shape[:2]
+        if max_side and max(height, width) > max_side:
+            scale = max_side / float(max(height, width))
+            image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        return image, scale
+
+    def detect(self, image) -> List[Tuple[int, int, int, int]]:
+        """Detecta faces e retorna caixas (x, y, largura, altura)"""
+        self._require()
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = cv2.equalizeHist(gray)
+        min_size = int(self.config['min_face_size'])
+        boxes = self._detector.detectMultiScale(
+            gray,
+            scaleFactor=float(self.config['scale_factor']),
+            minNeighbors=int(self.config['min_neighbors']),
+            minSize=(min_size, min_size),
+        )
+        return [tuple(int(v) for v in box) for box in boxes]
+
+    def _lbp_embedding(self, face_gray) -> np.ndarray:
+        """Histograma de LBP uniforme por célula da grade, com normalização de Hellinger"""
+        size = self.LBP_FACE_SIZE
+        face = cv2.resize(face_gray, (size + 2, size + 2), interpolation=cv2.INTER_AREA).astype(np.int16)
+        center = face[1:-1, 1:-1]
+        codes = np.zeros(center.shape, dtype=np.uint8)
+        offsets = [(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)]
+        for bit, (dy, dx) in enumerate(offsets):
+            neighbour = face[1 + dy:size + 1 + dy, 1 + dx:size + 1 + dx]
+            codes |= (neighbour >= center).astype(np.uint8) << bit
+
+        cell = size // self.LBP_GRID
+        bins = UNIFORM_LBP[codes].reshape(self.LBP_GRID, cell, self.LBP_GRID, cell)
+        bins = bins.transpose(0, 2, 1, 3).reshape(self.LBP_GRID * self.LBP_GRID, -1)
+        # Histograma de todas as células de uma vez (offset por célula)
+        flat = bins + (np.arange(bins.shape[0])[:, None] * self.LBP_BINS)
+        histogram = np.bincount(flat.ravel(), minlength=self.dimension).astype(np.float32)
+        return np.sqrt(histogram)
+
+    def embed(self, image, boxes: Sequence[Tuple[int, int, int, int]]) -> np.ndarray:
+        """Calcula os embeddings (matriz n x dimensão, float32, norma 1)"""
+        self._require()
+        if not boxes:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        vectors = []
+        if self._model:
+            recognizer = self._recognizer
+            for x, y, w, h in boxes:
+                face = cv2.resize(image[y:y + h, x:x + w], (112, 112))
+                vectors.append(recognizer.feature(face).reshape(-1))
+        else:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            for x, y, w, h in boxes:
+                vectors.append(self._lbp_embedding(gray[y:y + h, x:x + w]))
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        return normalize_rows(matrix)
+
+    def extract(self, image_data: bytes) -> List[Dict[str, Any]]:
+        """Detecta e descreve todas as faces de uma imagem
+
+        Retorna uma lista de dicts com ``box`` (na escala original) e
+        ``embedding`` (vetor float32).
+        """
+        image, scale = self.decode(image_data)
+        boxes = self.detect(image)
+        embeddings = self.embed(image, boxes)
+        faces = []
+        for box, embedding in zip(boxes, embeddings):
+            faces.append({
+                'box': tuple(int(round(v / scale)) for v in box),
+                'embedding': embedding
+            })
+        return faces
+
+    def extract_query(self, image_data: bytes) -> Optional[np.ndarray]:
+        """Embedding da maior face de uma selfie (ou None se não houver face)"""
+        faces = self.extract(image_data)
+        if not faces:
+            return None
+        largest = max(faces, key=lambda face: face['box'][2] * face['box'][3])
+        return largest['embedding'].reshape(1, -1)
+
+    def match(self, query: np.ndarray, embeddings: np.ndarray, photo_ids: np.ndarray,
+              threshold: Optional[float] = None, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Compara a consulta com os embeddings de um evento"""
+        if threshold is None:
+            threshold = self.similarity_threshold
+        return match_embeddings(query, embeddings, photo_ids, threshold, limit)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza cada linha para norma L2 = 1 (linhas zeradas ficam zeradas)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+def match_embeddings(query: np.ndarray, embeddings: np.ndarray, photo_ids: np.ndarray,
+                     threshold: float, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Busca vetorizada: um único produto de matrizes para todas as faces
+
+    ``embeddings`` tem uma linha por face (N x D) e ``photo_ids`` o PhotoId de
+    cada linha. Retorna [(PhotoId, similaridade)] com a melhor face de cada
+    foto acima do limiar, da mais parecida para a menos parecida.
+    """
+    if embeddings.shape[0] == 0 or query.size == 0:
+        return []
+
+    # (N x D) @ (D x Q) -> melhor similaridade de cada face contra a consulta
+    scores = embeddings @ query.reshape(-1, embeddings.shape[1]).T
+    best = scores.max(axis=1)
+    keep = np.flatnonzero(best >= threshold)
+    if keep.size == 0:
+        return []
+
+    ids = np.asarray(photo_ids)[keep]
+    best = best[keep]
+
+    # Uma entrada por foto: ordena por score decrescente e fica com a 1ª ocorrência
+    order = np.argsort(-best, kind='stable')
+    ids, best = ids[order], best[order]
+    _, first = np.unique(ids, return_index=True)
+    first.sort()
+    if limit:
+        first = first[:limit]
+    return [(int(ids[i]), float(best[i])) for i in first]
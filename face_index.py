@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from face_engine import match_embeddings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: str):
+    """Lock exclusivo entre processos (flock no Linux, msvcrt no Windows)"""
+    with open(path, 'a+b') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FaceIndexStore:
+    """Índice de embeddings em disco, um por evento
+
+    Cada evento tem um diretório com:
+
+    - ``embeddings.f32``: matriz float32 contígua (uma linha por face)
+    - ``photo_ids.i64``: PhotoId de cada linha, em int64
+    - ``meta.json``: dimensão dos vetores
+
+    Os arquivos são abertos com mmap somente leitura, então todos os workers
+    compartilham as mesmas páginas do cache do sistema operacional. Novas
+    faces são acrescentadas ao final dos arquivos (append), sem reconstruir o
+    índice; um índice ausente é reconstruído a partir do banco.
+    """
+
+    EMBEDDINGS_FILE = 'embeddings.f32'
+    PHOTO_IDS_FILE = 'photo_ids.i64'
+    META_FILE = 'meta.json'
+    LOCK_FILE = '.lock'
+
+    def __init__(self, root: str, dimension: int,
+                 loader: Optional[Callable[[int], Iterable[Dict[str, Any]]]] = None):
+        self.root = root
+        self.dimension = dimension
+        # Fonte para reconstrução: recebe o EventId e devolve as análises de faces
+        self.loader = loader
+        self._maps = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _event_dir(self, event_id: int) -> str:
+        return os.path.join(self.root, f'event_{int(event_id)}')
+
+    def _paths(self, event_id: int) -> Tuple[str, str]:
+        directory = self._event_dir(event_id)
+        return (os.path.join(directory, self.EMBEDDINGS_FILE),
+                os.path.join(directory, self.PHOTO_IDS_FILE))
+
+    @contextmanager
+    def _locked(self, event_id: int):
+        directory = self._event_dir(event_id)
+        os.makedirs(directory, exist_ok=True)
+        with file_lock(os.path.join(directory, self.LOCK_FILE)):
+            yield
+
+    def event_ids(self) -> List[int]:
+        """EventIds que já têm índice em disco"""
+        event_ids = []
+        for name in os.listdir(self.root):
+            if name.startswith('event_') and name[6:].isdigit() and self.exists(int(name[6:])):
+                event_ids.append(int(name[6:]))
+        return sorted(event_ids)
+
+    def face_count(self, event_id: int) -> int:
+        """Número de faces no índice do evento, sem mapear os arquivos"""
+        embeddings_path, ids_path = self._paths(event_id)
+        try:
+            return min(os.path.getsize(embeddings_path) // (self.dimension * 4), os.path.getsize(ids_path) // 8)
+        except OSError:
+            return 0
+
+    def exists(self, event_id: int) -> bool:
+        """Indica se o índice do evento já foi construído (com a dimensão atual)
+
+        Um índice de outro descritor (outra dimensão) conta como ausente e é
+        reconstruído só com os embeddings do descritor atual.
+        """
+        try:
+            with open(os.path.join(self._event_dir(event_id), self.META_FILE)) as handle:
+                return json.load(handle).get('dimension') == self.dimension
+        except (OSError, ValueError):
+            return False
+
+    def _write_meta(self, event_id: int):
+        meta_path = os.path.join(self._event_dir(event_id), self.META_FILE)
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w') as handle:
+            json.dump({'dimension': self.dimension}, handle)
+        os.replace(tmp_path, meta_path)
+
+    def build(self, event_id: int, analyses: Iterable[Dict[str, Any]]) -> int:
+        """Reconstrói o índice do evento a partir das análises do banco"""
+        with self._locked(event_id):
+            return self._build_locked(event_id, analyses)
+
+    def _build_locked(self, event_id: int, analyses: Iterable[Dict[str, Any]]) -> int:
+        embeddings_path, ids_path = self._paths(event_id)
+        row_bytes = self.dimension * 4
+        count = 0
+        with open(embeddings_path + '.tmp', 'wb') as embeddings_file, \
+                open(ids_path + '.tmp', 'wb') as ids_file:
+            for analysis in analyses:
+                embedding = analysis['Embedding']
+                if len(embedding) != row_bytes:
+                    # Embedding de outro modelo/dimensão: não entra no índice
+                    continue
+                embeddings_file.write(embedding)
+                ids_file.write(np.int64(analysis['PhotoId']).tobytes())
+                count += 1
+        os.replace(embeddings_path + '.tmp', embeddings_path)
+        os.replace(ids_path + '.tmp', ids_path)
+        self._write_meta(event_id)
+        logger.info("Índice facial do evento %s reconstruído (%d faces)", event_id, count)
+        return count
+
+    def append(self, event_id: int, photo_id: int, embeddings: np.ndarray) -> bool:
+        """Acrescenta as faces de uma foto ao índice do evento
+
+        Se o índice ainda não existe nada é feito: ele será construído a
+        partir do banco (que já contém estas faces) na primeira busca.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        if embeddings.shape[0] == 0:
+            return True
+        embeddings_path, ids_path = self._paths(event_id)
+        try:
+            with self._locked(event_id):
+                if not self.exists(event_id):
+                    return False
+                ids = np.full(embeddings.shape[0], photo_id, dtype=np.int64)
+                with open(embeddings_path, 'ab') as handle:
+                    handle.write(embeddings.tobytes())
+                with open(ids_path, 'ab') as handle:
+                    handle.write(ids.tobytes())
+            return True
+        except OSError as e:
+            # Índice possivelmente incompleto: descarta para ser reconstruído
+            logger.error("Erro ao atualizar índice facial do evento %s: %s", event_id, e)
+            self.invalidate(event_id)
+            return False
+
+    def invalidate(self, event_id: int):
+        """Remove o índice do evento (será reconstruído na próxima busca)"""
+        with self._locked(event_id):
+            meta_path = os.path.join(self._event_dir(event_id), self.META_FILE)
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+        with self._lock:
+            self._maps.pop(event_id, None)
+
+    def _ensure(self, event_id: int):
+        if self.exists(event_id) or self.loader is None:
+            return
+        with self._locked(event_id):
+            # Outro processo pode ter construído enquanto esperávamos o lock
+            if not self.exists(event_id):
+                self._build_locked(event_id, self.loader(event_id))
+
+    def load(self, event_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorna (embeddings N x D, photo_ids N) mapeados em memória"""
+        self._ensure(event_id)
+        embeddings_path, ids_path = self._paths(event_id)
+        try:
+            emb_stat = os.stat(embeddings_path)
+            ids_stat = os.stat(ids_path)
+        except FileNotFoundError:
+            return np.empty((0, self.dimension), dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        signature = (emb_stat.st_ino, emb_stat.st_size, ids_stat.st_ino, ids_stat.st_size)
+        with self._lock:
+            cached = self._maps.get(event_id)
+            if cached and cached[0] == signature:
+                return cached[1], cached[2]
+
+        # Um append pode estar em andamento: usa só as linhas completas nos dois arquivos
+        rows = min(emb_stat.st_size // (self.dimension * 4), ids_stat.st_size // 8)
+        if rows == 0:
+            embeddings = np.empty((0, self.dimension), dtype=np.float32)
+            photo_ids = np.empty(0, dtype=np.int64)
+        else:
+            embeddings = np.memmap(embeddings_path, dtype=np.float32, mode='r', shape=(rows, self.dimension))
+            photo_ids = np.memmap(ids_path, dtype=np.int64, mode='r', shape=(rows,))
+
+        with self._lock:
+            self._maps[event_id] = (signature, embeddings, photo_ids)
+        return embeddings, photo_ids
+
+    def search(self, event_id: int, query: np.ndarray, threshold: float,
+               limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Busca a consulta no índice do evento"""
+        embeddings, photo_ids = self.load(event_id)
+        return match_embeddings(query, embeddings, photo_ids, threshold, limit)
+
+    def stats(self) -> Dict[str, Any]:
+        """Eventos mapeados neste processo e total de faces"""
+        with self._lock:
+            maps = list(self._maps.values())
+        return {
+            'events_mapped': len(maps),
+            'faces_mapped': int(sum(entry[2].shape[0] for entry in maps))
+        }
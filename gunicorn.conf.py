@@ -0,0 +1,67 @@
+"""Configuração do gunicorn para produção (ajustes em SERVER_CONFIG, config.py)
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+    python run.py --production
+
+O mestre importa wsgi.py uma vez (preload_app): a aplicação é criada e
+preparada antes do fork, e cada worker já nasce com templates compilados,
+cache de catálogo, modelos e índices faciais mapeados, compartilhados por
+copy-on-write. Workers reiniciados (max_requests, timeout) também nascem prontos.
+
+Deploy sem tempo frio: o código está carregado no mestre, então um novo
+mestre sobe com o código novo, se prepara e só então o antigo sai:
+
+    kill -USR2 <mestre>     # novo mestre (código novo) e seus workers
+    kill -WINCH <antigo>    # quando o novo estiver atendendo: workers antigos terminam o que têm
+    kill -QUIT <antigo>
+
+``kill -HUP <mestre>`` troca os workers aos poucos com esta configuração
+relida, sem recarregar o código.
+"""
+import multiprocessing
+import os
+import sys
+
+# Lido pelo gunicorn a partir de qualquer pasta: config.py e wsgi.py vêm da pasta do projeto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import SERVER_CONFIG
+
+bind = SERVER_CONFIG['bind']
+workers = SERVER_CONFIG['workers'] or multiprocessing.cpu_count() * 2 + 1
+# Threads por worker: as rotas esperam pelo banco, pelo disco e pelo pool de hash de senhas
+worker_class = 'gthread'
+threads = SERVER_CONFIG['threads']
+preload_app = True
+
+timeout = SERVER_CONFIG['timeout']
+graceful_timeout = SERVER_CONFIG['graceful_timeout']
+keepalive = SERVER_CONFIG['keepalive']
+max_requests = SERVER_CONFIG['max_requests']
+max_requests_jitter = max_requests // 10
+
+accesslog = SERVER_CONFIG['access_log'] or None
+# Batimento dos workers em memória: um disco lento não faz o mestre matar workers saudáveis
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def pre_fork(server, worker):
+    """No mestre, antes de cada fork: fecha as conexões abertas na preparação
+
+    O pool de cada worker recomeça vazio após o fork; sem isso, cada um
+    herdaria os sockets do mestre e os fecharia ao descartá-los.
+    """
+    if server.cfg.preload_app:
+        server.app.wsgi().extensions['data_manager'].close()
+
+
+def post_worker_init(worker):
+    """No worker, antes de aceitar conexões: abre a primeira conexão do pool"""
+    worker.wsgi.extensions['data_manager'].test_connection()
+
+
+def worker_exit(server, worker):
+    """Encerra os processos de hash de senhas junto com o worker"""
+    application = getattr(worker, 'wsgi', None)
+    if application is not None:
+        application.extensions['password_hasher'].shutdown()
@@ -0,0 +1,321 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ExifTags
+
+from photo_store import PhotoStore, find_near_duplicate, perceptual_hash
+from renditions import RenditionService
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueue:
+    """Processa uploads de fotos em segundo plano
+
+    A rota de upload apenas grava os arquivos no PhotoStore e cria um job;
+    um pool de threads faz o trabalho pesado de cada foto (metadados, versões
+    redimensionadas e faces). Reenvios de uma foto que o evento já tem são
+    descartados pelo hash antes desse processamento. As fotos prontas são
+    gravadas no banco em lotes de ``batch_size`` com ``save_photos_bulk``. O
+    estado de cada job fica em ``<upload_folder>/jobs/<job_id>.json``, visível
+    para todos os workers do gunicorn.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+
+    def __init__(self, data_manager, face_engine, photo_store: PhotoStore, renditions: RenditionService,
+                 upload_folder: str, workers: int = 4, batch_size: int = 50,
+                 perceptual_hash: bool = True, near_duplicate_distance: int = 6):
+        self.data_manager = data_manager
+        self.face_engine = face_engine
+        self.photo_store = photo_store
+        self.renditions = renditions
+        self.upload_folder = upload_folder
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self.perceptual_hash = perceptual_hash
+        self.near_duplicate_distance = near_duplicate_distance
+
+        self.incoming_dir = os.path.join(upload_folder, 'incoming')
+        self.jobs_dir = os.path.join(upload_folder, 'jobs')
+        for directory in (self.incoming_dir, self.jobs_dir):
+            os.makedirs(directory, exist_ok=True)
+
+        self._executor = None
+        self._executor_pid = None
+        self._jobs = {}
+        # Fotos prontas aguardando gravação e quantos arquivos já foram preparados, por job
+        self._pending = {}
+        self._prepared = {}
+        # Fotos que o evento já tem: hashes de conteúdo e (PhotoId, hash perceptual), por job
+        self._known = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Pool de threads criado sob demanda (e recriado após um fork)"""
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest')
+                self._executor_pid = os.getpid()
+                self._jobs = {}
+                self._pending = {}
+                self._prepared = {}
+                self._known = {}
+            return self._executor
+
+    # Jobs
+
+    def staging_dir(self, job_id: str) -> str:
+        """Pasta para arquivos ainda sem hash, movidos ao PhotoStore depois de processados"""
+        path = os.path.join(self.incoming_dir, job_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def new_job_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def submit(self, job_id: str, event_id: int, files: List[Tuple[str, str, Optional[str]]],
+               rejected: List[str] = ()) -> Dict[str, Any]:
+        """Enfileira um lote de arquivos já gravados em disco
+
+        ``files`` é uma lista de (caminho, nome original, hash). Com o hash
+        já calculado (upload em streaming) o arquivo já está no PhotoStore;
+        sem ele, está em ``staging_dir(job_id)`` e é movido depois de
+        processado. ``rejected`` são mensagens de arquivos recusados no
+        recebimento, contados como falhas do job.
+        """
+        now = datetime.now().isoformat()
+        job = {
+            'job_id': job_id,
+            'event_id': event_id,
+            'status': self.STATUS_QUEUED,
+            'total': len(files) + len(rejected),
+            'processed': len(rejected),
+            'saved': 0,
+            'failed': len(rejected),
+            'duplicates': 0,
+            'near_duplicates': 0,
+            'errors': list(rejected[:50]),
+            'created_at': now,
+            'updated_at': now
+        }
+        # Uma consulta por job: as fotos que o evento já tem
+        existing = self.data_manager.get_photo_hashes(event_id)
+        with_perceptual = [photo for photo in existing if photo['PerceptualHash'] is not None]
+        known = {
+            'hashes': {photo['ContentHash'] for photo in existing},
+            'photo_ids': [photo['PhotoId'] for photo in with_perceptual],
+            'perceptual': [photo['PerceptualHash'] for photo in with_perceptual]
+        }
+
+        executor = self.executor
+        with self._lock:
+            self._jobs[job_id] = job
+            self._pending[job_id] = []
+            self._prepared[job_id] = len(rejected)
+            self._known[job_id] = known
+            self._write_status(job)
+
+        for path, filename, content_hash in files:
+            # Cada arquivo roda no contexto da requisição de upload: os registros
+            # do processamento levam o mesmo request_id
+            executor.submit(contextvars.copy_context().run, self._run_file, job_id, event_id, path, filename,
+                            content_hash)
+        logger.info("Job %s: %d foto(s) enfileirada(s) para o evento %s", job_id, len(files), event_id)
+        return dict(job)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Estado de um job (de qualquer worker, lido do disco)"""
+        with self._lock:
+            if job_id in self._jobs:
+                return dict(self._jobs[job_id])
+        try:
+            with open(self._status_path(job_id)) as handle:
+                return json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _status_path(self, job_id: str) -> str:
+        # job_id vem da URL: aceita apenas o formato gerado por new_job_id
+        if not job_id.isalnum():
+            raise ValueError('job_id inválido')
+        return os.path.join(self.jobs_dir, f'{job_id}.json')
+
+    def _write_status(self, job: Dict[str, Any]):
+        path = self._status_path(job['job_id'])
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as handle:
+            json.dump(job, handle)
+        os.replace(tmp_path, path)
+
+    def _finish_files(self, job_id: str, saved: int = 0, failed: int = 0, errors: List[str] = (),
+                      duplicates: int = 0, near_duplicates: int = 0):
+        with self._lock:
+            job = self._jobs[job_id]
+            job['processed'] += saved + failed + duplicates
+            job['saved'] += saved
+            job['failed'] += failed
+            job['duplicates'] += duplicates
+            job['near_duplicates'] += near_duplicates
+            job['errors'].extend(errors[:max(0, 50 - len(job['errors']))])
+            job['status'] = self.STATUS_DONE if job['processed'] >= job['total'] else self.STATUS_PROCESSING
+            job['updated_at'] = datetime.now().isoformat()
+            self._write_status(job)
+            done = job['status'] == self.STATUS_DONE
+
+        if done:
+            shutil.rmtree(os.path.join(self.incoming_dir, job_id), ignore_errors=True)
+            logger.info("Job %s concluído: %d salva(s), %d duplicada(s), %d com erro",
+                        job_id, job['saved'], job['duplicates'], job['failed'])
+            with self._lock:
+                self._jobs.pop(job_id, None)
+                self._pending.pop(job_id, None)
+                self._prepared.pop(job_id, None)
+                self._known.pop(job_id, None)
+
+    def _take_batch(self, job_id: str, item: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Registra um arquivo preparado e devolve o lote a gravar, se completo"""
+        with self._lock:
+            pending = self._pending.get(job_id)
+            if pending is None:
+                # Job já concluído: o último arquivo era repetido ou falhou
+                return []
+            if item is not None:
+                pending.append(item)
+            self._prepared[job_id] += 1
+            last_file = self._prepared[job_id] >= self._jobs[job_id]['total']
+            if pending and (len(pending) >= self.batch_size or last_file):
+                self._pending[job_id] = []
+                return pending
+        return []
+
+    def _claim_hash(self, job_id: str, content_hash: str) -> bool:
+        """Reserva o hash para este job; False se o evento (ou o job) já tem a foto"""
+        with self._lock:
+            hashes = self._known[job_id]['hashes']
+            if content_hash in hashes:
+                return False
+            hashes.add(content_hash)
+            return True
+
+    def _find_near_duplicates(self, job_id: str, photo_ids: List[int],
+                              batch: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+        """Compara as fotos recém-gravadas com as do evento pelo hash perceptual
+
+        Retorna pares (PhotoId, PhotoId parecido) e acrescenta as novas fotos
+        às comparações dos próximos lotes.
+        """
+        pairs = []
+        with self._lock:
+            known = self._known[job_id]
+            for photo_id, item in zip(photo_ids, batch):
+                value = item.get('perceptual_hash')
+                if value is None:
+                    continue
+                similar = find_near_duplicate(np.asarray(known['perceptual'], dtype=np.int64),
+                                              np.asarray(known['photo_ids'], dtype=np.int64),
+                                              value, self.near_duplicate_distance)
+                if similar is not None and similar != photo_id:
+                    pairs.append((photo_id, similar))
+                known['photo_ids'].append(photo_id)
+                known['perceptual'].append(value)
+        return pairs
+
+    def _save_batch(self, job_id: str, event_id: int, batch: List[Dict[str, Any]]):
+        photo_ids = self.data_manager.save_photos_bulk(event_id, batch)
+        if not photo_ids:
+            self._finish_files(job_id, failed=len(batch),
+                               errors=[f"{item['filename']}: erro ao salvar" for item in batch])
+            return
+
+        near_duplicates = self._find_near_duplicates(job_id, photo_ids, batch) if self.perceptual_hash else []
+        if near_duplicates:
+            self.data_manager.set_near_duplicates(near_duplicates)
+        self._finish_files(job_id, saved=len(photo_ids), near_duplicates=len(near_duplicates))
+
+    # Processamento de uma foto
+
+    def _run_file(self, job_id: str, event_id: int, path: str, filename: str, content_hash: Optional[str]):
+        item = None
+        try:
+            if content_hash is None:
+                content_hash = self.file_hash(path)
+            if self._claim_hash(job_id, content_hash):
+                item = self.prepare_file(path, filename, content_hash)
+            else:
+                # Reenvio: sem versões, faces nem INSERT. Um arquivo ainda na pasta
+                # de preparação é apagado; o objeto do PhotoStore pertence à foto existente
+                if path != self.photo_store.path_for(content_hash):
+                    os.remove(path)
+                self._finish_files(job_id, duplicates=1)
+        except Exception:
+            # O detalhe (com caminhos do servidor) fica no log; o cliente vê só o nome do arquivo
+            logger.warning("Erro ao processar %s (job %s)", filename, job_id, exc_info=True)
+            self._finish_files(job_id, failed=1, errors=[f'{filename}: imagem inválida ou erro no processamento'])
+
+        batch = self._take_batch(job_id, item)
+        if batch:
+            self._save_batch(job_id, event_id, batch)
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """SHA-256 do arquivo, lido em blocos"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def extract_metadata(image: Image.Image) -> Dict[str, Any]:
+        """Dimensões e data de captura (EXIF DateTimeOriginal)"""
+        metadata = {'width': image.width, 'height': image.height, 'taken_at': None}
+        try:
+            exif = image.getexif()
+            value = exif.get_ifd(ExifTags.IFD.Exif).get(ExifTags.Base.DateTimeOriginal) or exif.get(ExifTags.Base.DateTime)
+            if value:
+                metadata['taken_at'] = datetime.strptime(value.strip('\x00 '), '%Y:%m:%d %H:%M:%S')
+        except (ValueError, TypeError, AttributeError):
+            pass
+        return metadata
+
+    def prepare_file(self, path: str, filename: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Hash, metadados, versões redimensionadas e faces de uma foto
+
+        Retorna o item no formato de ``DatabaseManager.save_photos_bulk``.
+        """
+        started = time.monotonic()
+        if content_hash is None:
+            content_hash = self.file_hash(path)
+
+        with Image.open(path) as image:
+            image.load()
+            metadata = self.extract_metadata(image)
+            self.renditions.generate_all(content_hash, image)
+            if self.perceptual_hash:
+                metadata['perceptual_hash'] = perceptual_hash(image)
+
+        faces = []
+        if self.face_engine is not None and self.face_engine.available:
+            with open(path, 'rb') as handle:
+                faces = self.face_engine.extract(handle.read())
+
+        size = os.path.getsize(path)
+        self.photo_store.put(path, content_hash)
+
+        logger.debug("%s processada em %.2fs", filename, time.monotonic() - started)
+        return {'filename': filename, 'faces': faces, 'content_hash': content_hash, 'size': size, **metadata}
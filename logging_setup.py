@@ -0,0 +1,149 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+# ID da requisição atual; aparece em todo registro feito durante ela,
+# inclusive nos do DatabaseManager e das threads que herdam o contexto
+request_id_var: ContextVar[str] = ContextVar('request_id', default='-')
+
+# IDs recebidos no cabeçalho X-Request-ID (do proxy ou do cliente) são aceitos só neste formato
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Campos padrão de um LogRecord; os demais (``extra=``) vão para o JSON
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+# Bibliotecas que registram detalhes internos em DEBUG (ex.: cada plugin do Pillow)
+QUIET_LOGGERS = ('PIL',)
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """ID de correlação: o recebido, se válido, ou um novo"""
+    if incoming and _VALID_REQUEST_ID.match(incoming):
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+class RequestIdFilter(logging.Filter):
+    """Copia o ID da requisição para o registro na thread que o criou"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha, com os campos passados em ``extra=``"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z'
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloqueia a requisição
+
+    Só a mensagem é montada na thread que registra; a formatação e a escrita
+    ficam com a thread do QueueListener. Com a fila cheia (saída lenta), o
+    registro é descartado e contado em ``dropped``.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            # A exceção não atravessa a fila: o traceback vai como texto
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # handle() já segura self.lock durante emit()
+            self.dropped += 1
+
+
+_listener = None
+_handler = None
+
+
+def setup_logging(level: str = 'INFO', fmt: str = 'text', queue_size: int = 10000, stream=None):
+    """Configura o logger raiz com saída assíncrona em ``stream`` (stderr)
+
+    ``fmt`` é ``json`` (uma linha por registro, para agregadores) ou
+    ``text``. Registros abaixo de ``level`` custam só a comparação do nível:
+    as mensagens usam argumentos ``%s`` e não são montadas. Chamadas
+    repetidas (várias aplicações no mesmo processo) apenas ajustam o nível.
+    """
+    global _handler
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(root.level, logging.INFO))
+    if _handler is not None:
+        return _handler
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    _handler.addFilter(RequestIdFilter())
+    root.addHandler(_handler)
+    _start_listener(output)
+    # A thread do listener não sobrevive ao fork (gunicorn --preload): cada
+    # worker cria a sua, com uma fila nova
+    os.register_at_fork(after_in_child=lambda: _start_listener(output, fresh_queue=True))
+    atexit.register(_stop_listener)
+    return _handler
+
+
+def _start_listener(output: logging.Handler, fresh_queue: bool = False):
+    global _listener
+    if fresh_queue:
+        _handler.queue = queue.Queue(maxsize=_handler.queue.maxsize)
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    # Esvazia a fila ao sair, para não perder os últimos registros
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def dropped_records() -> int:
+    """Registros descartados por fila cheia desde o início do processo"""
+    return _handler.dropped if _handler is not None else 0
@@ -0,0 +1,401 @@
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+# Limites (segundos) dos histogramas de latência por rota
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Métodos do DatabaseManager que não fazem consultas
+NOT_INSTRUMENTED = {'get_connection', 'pool_stats', 'readiness', 'close', 'hash_password', 'verify_password',
+                    'check_connection_async'}
+
+# Medições da requisição atual e do método do DatabaseManager em execução
+_request: ContextVar[Optional['RequestTimer']] = ContextVar('metrics_request', default=None)
+_method: ContextVar[Optional['_MethodCall']] = ContextVar('metrics_method', default=None)
+
+
+class RequestTimer:
+    """Tempos de uma requisição, somados pelos cursores e métodos instrumentados
+
+    - ``db``: tempo dentro de execute/fetch no driver
+    - ``dm``: tempo total nos métodos do DatabaseManager (``dm - db`` é o
+      Python em volta das consultas, como a conversão das linhas em dicts)
+    - ``tpl``: renderização dos templates
+    """
+
+    __slots__ = ('started', 'queries', 'rows', 'db', 'dm', 'tpl', '_template_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.rows = 0
+        self.db = 0.0
+        self.dm = 0.0
+        self.tpl = 0.0
+        self._template_started = None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def template_started(self):
+        self._template_started = time.perf_counter()
+
+    def template_finished(self):
+        if self._template_started is not None:
+            self.tpl += time.perf_counter() - self._template_started
+            self._template_started = None
+
+    def server_timing(self) -> str:
+        """Valor do cabeçalho Server-Timing (durações em ms)"""
+        total = self.elapsed()
+        return ', '.join((
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} consulta(s), {self.rows} linha(s)"',
+            f'dm;dur={self.dm * 1000:.1f};desc="DatabaseManager"',
+            f'tpl;dur={self.tpl * 1000:.1f};desc="templates"',
+            f'app;dur={total * 1000:.1f}'
+        ))
+
+
+class _MethodCall:
+    __slots__ = ('queries', 'rows', 'db')
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.db = 0.0
+
+
+def _record(seconds: float, queries: int = 0, rows: int = 0):
+    call = _method.get()
+    if call is not None:
+        call.queries += queries
+        call.rows += rows
+        call.db += seconds
+    timer = _request.get()
+    if timer is not None:
+        timer.queries += queries
+        timer.rows += rows
+        timer.db += seconds
+
+
+class _TimedCursor:
+    """Cursor do driver com o tempo de execute/fetch e as linhas lidas medidos"""
+
+    __slots__ = ('_cursor',)
+
+    def __init__(self, cursor):
+        object.__setattr__(self, '_cursor', cursor)
+
+    def execute(self, *args):
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(*args)
+        finally:
+            _record(time.perf_counter() - started, queries=1)
+        # pyodbc devolve o próprio cursor (cursor.execute(...).fetchone())
+        return self
+
+    def executemany(self, *args):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(*args)
+        finally:
+            _record(time.perf_counter() - started, queries=1)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        _record(time.perf_counter() - started, rows=0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(*args)
+        _record(time.perf_counter() - started, rows=len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        _record(time.perf_counter() - started, rows=len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # ex.: cursor.fast_executemany = True no SQL Server
+        setattr(self._cursor, name, value)
+
+
+class _TimedConnection:
+    """Conexão do pool cujos cursores são medidos"""
+
+    __slots__ = ('_conn',)
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args):
+        return _TimedCursor(self._conn.cursor(*args))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics:
+    """Métricas do processo: latência por rota e consultas por método do DatabaseManager
+
+    Os contadores ficam na memória do worker. Com ``shared_dir``, cada worker
+    grava um resumo em ``<shared_dir>/<pid>.json`` (no máximo a cada
+    ``export_interval`` segundos, ao fim das requisições) e ``/metrics``
+    soma os resumos dos workers vivos, então qualquer worker que atenda o
+    Prometheus responde pelo nó inteiro.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, shared_dir: Optional[str] = None,
+                 export_interval: float = 5):
+        self.buckets = tuple(sorted(buckets))
+        self.shared_dir = shared_dir
+        self.export_interval = export_interval
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._requests: Dict[tuple, _Histogram] = {}
+        self._statuses: Dict[tuple, int] = {}
+        # método -> [chamadas, segundos, consultas, segundos no driver, linhas]
+        self._db: Dict[str, List[float]] = {}
+        self._next_export = 0.0
+
+    # Medição
+
+    def start_request(self) -> RequestTimer:
+        timer = RequestTimer()
+        _request.set(timer)
+        return timer
+
+    def current_request(self) -> Optional[RequestTimer]:
+        return _request.get()
+
+    def finish_request(self, timer: RequestTimer, endpoint: str, method: str, status: int):
+        seconds = timer.elapsed()
+        _request.set(None)
+        with self._lock:
+            histogram = self._requests.get((endpoint, method))
+            if histogram is None:
+                histogram = self._requests[(endpoint, method)] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[bisect_left(self.buckets, seconds)] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+            key = (endpoint, method, str(status))
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+        self._maybe_export()
+
+    @contextmanager
+    def connection(self, pooled):
+        """Envolve ``pool.connection()``: a conexão entregue tem cursores medidos"""
+        with pooled as conn:
+            yield _TimedConnection(conn)
+
+    def instrument(self, manager, names: Optional[Iterable[str]] = None):
+        """Mede os métodos públicos de ``manager`` (substituídos na instância)
+
+        Chamadas aninhadas (um método que chama outro) contam para o método
+        externo, que é o que a rota chamou.
+        """
+        if names is None:
+            names = [name for name in dir(type(manager))
+                     if not name.startswith('_') and name not in NOT_INSTRUMENTED
+                     and callable(getattr(type(manager), name))]
+        for name in names:
+            setattr(manager, name, self._timed_method(name, getattr(manager, name)))
+
+    def _timed_method(self, name: str, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if _method.get() is not None:
+                return method(*args, **kwargs)
+            call = _MethodCall()
+            token = _method.set(call)
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - started
+                _method.reset(token)
+                timer = _request.get()
+                if timer is not None:
+                    timer.dm += seconds
+                with self._lock:
+                    stats = self._db.get(name)
+                    if stats is None:
+                        stats = self._db[name] = [0, 0.0, 0, 0.0, 0]
+                    stats[0] += 1
+                    stats[1] += seconds
+                    stats[2] += call.queries
+                    stats[3] += call.db
+                    stats[4] += call.rows
+        return wrapper
+
+    def reset(self):
+        """Zera os contadores (as consultas da preparação não são tráfego)"""
+        with self._lock:
+            self._requests.clear()
+            self._statuses.clear()
+            self._db.clear()
+
+    # Exportação
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'buckets': list(self.buckets),
+                'requests': [[endpoint, method, h.counts[:], h.sum, h.count]
+                             for (endpoint, method), h in self._requests.items()],
+                'statuses': [[*key, count] for key, count in self._statuses.items()],
+                'db': {name: stats[:] for name, stats in self._db.items()}
+            }
+
+    def _maybe_export(self):
+        if not self.shared_dir:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_export:
+                return
+            self._next_export = now + self.export_interval
+        self.export()
+
+    def export(self):
+        """Grava o resumo deste worker em ``shared_dir``"""
+        path = os.path.join(self.shared_dir, f'{os.getpid()}.json')
+        try:
+            with open(f'{path}.tmp', 'w') as handle:
+                json.dump(self.snapshot(), handle)
+            os.replace(f'{path}.tmp', path)
+        except OSError:
+            pass
+
+    def collect(self) -> Dict[str, Any]:
+        """Resumo do nó: a soma dos workers vivos (ou só deste, sem ``shared_dir``)"""
+        if not self.shared_dir:
+            return self.snapshot()
+        self.export()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.shared_dir, '*.json')):
+            pid = int(os.path.basename(path).split('.')[0])
+            if not _process_alive(pid):
+                # Worker reiniciado: os contadores dele saem (o Prometheus trata como reset)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as handle:
+                    snapshots.append(json.load(handle))
+            except (OSError, ValueError):
+                continue
+        return merge_snapshots(snapshots, self.buckets)
+
+    def render(self) -> str:
+        """Métricas no formato texto do Prometheus"""
+        return render_prometheus(self.collect())
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]], buckets) -> Dict[str, Any]:
+    requests: Dict[tuple, list] = {}
+    statuses: Dict[tuple, int] = {}
+    db: Dict[str, list] = {}
+    for snapshot in snapshots:
+        if tuple(snapshot['buckets']) != tuple(buckets):
+            continue
+        for endpoint, method, counts, total, count in snapshot['requests']:
+            entry = requests.setdefault((endpoint, method), [[0] * len(counts), 0.0, 0])
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += total
+            entry[2] += count
+        for endpoint, method, status, count in snapshot['statuses']:
+            statuses[(endpoint, method, status)] = statuses.get((endpoint, method, status), 0) + count
+        for name, stats in snapshot['db'].items():
+            entry = db.setdefault(name, [0, 0.0, 0, 0.0, 0])
+            for i, value in enumerate(stats):
+                entry[i] += value
+    return {
+        'buckets': list(buckets),
+        'requests': [[endpoint, method, *entry] for (endpoint, method), entry in requests.items()],
+        'statuses': [[*key, count] for key, count in statuses.items()],
+        'db': db
+    }
+
+
+def _labels(**labels) -> str:
+    escaped = (f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def render_prometheus(snapshot: Dict[str, Any]) -> str:
+    lines = [
+        '# HELP photocap_request_duration_seconds Latência das requisições por rota',
+        '# TYPE photocap_request_duration_seconds histogram'
+    ]
+    buckets = snapshot['buckets']
+    for endpoint, method, counts, total, count in sorted(snapshot['requests']):
+        cumulative = 0
+        for bound, value in zip([*buckets, '+Inf'], counts):
+            cumulative += value
+            lines.append(f'photocap_request_duration_seconds_bucket'
+                         f'{_labels(endpoint=endpoint, method=method, le=bound)} {cumulative}')
+        lines.append(f'photocap_request_duration_seconds_sum{_labels(endpoint=endpoint, method=method)} {total:.6f}')
+        lines.append(f'photocap_request_duration_seconds_count{_labels(endpoint=endpoint, method=method)} {count}')
+
+    lines += ['# HELP photocap_requests_total Requisições por rota e status',
+              '# TYPE photocap_requests_total counter']
+    for endpoint, method, status, count in sorted(snapshot['statuses']):
+        lines.append(f'photocap_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+    db_metrics = (
+        ('photocap_db_method_calls_total', 0, 'Chamadas por método do DatabaseManager'),
+        ('photocap_db_method_seconds_total', 1, 'Tempo total nos métodos do DatabaseManager'),
+        ('photocap_db_queries_total', 2, 'Consultas executadas por método'),
+        ('photocap_db_query_seconds_total', 3, 'Tempo no driver (execute/fetch) por método'),
+        ('photocap_db_rows_total', 4, 'Linhas lidas por método')
+    )
+    for name, index, description in db_metrics:
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+        for method, stats in sorted(snapshot['db'].items()):
+            value = stats[index]
+            lines.append(f'{name}{_labels(method=method)} {value:.6f}' if isinstance(value, float)
+                         else f'{name}{_labels(method=method)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,140 @@
+import hashlib
+import hmac
+import multiprocessing
+import multiprocessing.forkserver
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+# Iterações das senhas gravadas antes da coluna Users.PasswordIterations
+LEGACY_ITERATIONS = 100000
+
+# Os processos do pool não são cópias (fork) do worker da aplicação, que tem
+# threads, travas e conexões abertas: vêm de um servidor de fork limpo, ou
+# são iniciados do zero onde ele não existe (Windows)
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def _forget_forkserver():
+    """Num processo criado por fork (ex.: workers do gunicorn), esquece o servidor do pai
+
+    O multiprocessing guarda o PID do servidor de fork e confere se ele está
+    vivo com waitpid, que falha (ECHILD) em quem não é o pai dele: cada
+    processo filho sobe o seu próprio servidor no primeiro hash.
+    """
+    server = multiprocessing.forkserver._forkserver
+    if server._forkserver_alive_fd is not None:
+        os.close(server._forkserver_alive_fd)
+    server._forkserver_address = None
+    server._forkserver_alive_fd = None
+    server._forkserver_pid = None
+
+
+if START_METHOD == 'forkserver':
+    os.register_at_fork(after_in_child=_forget_forkserver)
+
+
+class PasswordHasherBusy(Exception):
+    """Fila de hashing cheia: a requisição deve ser recusada com 503"""
+
+    def __init__(self, retry_after: int):
+        super().__init__('Muitas autenticações em andamento')
+        self.retry_after = retry_after
+
+
+def _pbkdf2(password: bytes, salt: bytes, iterations: int) -> bytes:
+    # Executada nos processos do pool: precisa ser uma função de módulo
+    return hashlib.pbkdf2_hmac('sha256', password, salt, iterations)
+
+
+class PasswordHasher:
+    """PBKDF2-SHA256 das senhas em um pool de processos limitado
+
+    Cada hash custa dezenas de milissegundos de CPU. O pool limita quantos
+    rodam ao mesmo tempo (``workers`` núcleos por processo da aplicação), e a
+    thread da requisição só espera o resultado. Acima de ``max_pending``
+    hashes na fila, ``hash``/``verify`` levantam PasswordHasherBusy em vez
+    de enfileirar: a aplicação responde 503 com Retry-After e o restante do
+    site continua respondendo. Com ``workers=0`` o hash roda na própria thread.
+    """
+
+    def __init__(self, iterations: int = LEGACY_ITERATIONS, workers: int = 2, max_pending: int = 32,
+                 timeout: float = 10, retry_after: int = 2):
+        self.iterations = iterations
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+        self._executor = None
+        self._executor_pid = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Pool criado sob demanda em cada processo (os workers do gunicorn não o herdam)"""
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context(START_METHOD))
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _derive(self, password: str, salt: bytes, iterations: int) -> bytes:
+        password_bytes = password.encode('utf-8')
+        if self.workers <= 0:
+            return _pbkdf2(password_bytes, salt, iterations)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy(self.retry_after)
+        future = None
+        try:
+            future = self.executor.submit(_pbkdf2, password_bytes, salt, iterations)
+            # A vaga só volta quando o hash termina: após um timeout ele continua rodando no pool
+            future.add_done_callback(self._release_slot)
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy(self.retry_after)
+        except (BrokenProcessPool, OSError):
+            # Um processo do pool morreu ou não pôde ser criado: o próximo pedido cria outro pool
+            with self._lock:
+                self._executor = None
+            raise PasswordHasherBusy(self.retry_after)
+        finally:
+            if future is None:
+                # Nada foi enfileirado
+                self._slots.release()
+
+    def _release_slot(self, future):
+        self._slots.release()
+
+    def hash(self, password: str) -> Tuple[bytes, bytes, int]:
+        """Retorna (hash, salt, iterações) de uma senha nova"""
+        salt = os.urandom(32)
+        return self._derive(password, salt, self.iterations), salt, self.iterations
+
+    def verify(self, password: str, stored_hash: bytes, salt: bytes, iterations: Optional[int] = None) -> bool:
+        """Compara a senha com o hash gravado, em tempo constante"""
+        derived = self._derive(password, bytes(salt), iterations or LEGACY_ITERATIONS)
+        return hmac.compare_digest(derived, bytes(stored_hash))
+
+    def needs_rehash(self, iterations: Optional[int]) -> bool:
+        """True se a senha foi gravada com parâmetros diferentes dos atuais"""
+        return (iterations or LEGACY_ITERATIONS) != self.iterations
+
+    def stats(self) -> dict:
+        return {'workers': self.workers, 'max_pending': self.max_pending, 'iterations': self.iterations,
+                'rejected': self.rejected}
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,145 @@
+import os
+import shutil
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+from PIL import Image
+
+
+def check_hash(content_hash: str) -> str:
+    """Valida um SHA-256 hexadecimal (ele compõe caminhos em disco)"""
+    if len(content_hash) != 64 or not all(c in '0123456789abcdef' for c in content_hash):
+        raise ValueError('Hash de conteúdo inválido')
+    return content_hash
+
+
+class PhotoStore:
+    """Armazenamento de fotos endereçado por conteúdo
+
+    Cada arquivo fica em ``<root>/objects/<h[0:2]>/<h[2:4]>/<sha256>``: o nome é
+    o próprio hash, então duas câmeras com ``IMG_0001.jpg`` não colidem e
+    reenvios do mesmo cartão não duplicam bytes em disco. A divisão em dois
+    níveis mantém cada diretório com poucos milhares de arquivos.
+
+    As referências (quantas fotos usam cada objeto) ficam na tabela
+    PhotoObjects, mantida pelo DatabaseManager; o arquivo é apagado quando a
+    última foto que o usa é removida.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        # Arquivos em recebimento: no mesmo sistema de arquivos, para o rename ser atômico
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path_for(self, content_hash: str) -> str:
+        """Caminho do objeto com o hash informado"""
+        content_hash = check_hash(content_hash)
+        return os.path.join(self.objects_dir, content_hash[:2], content_hash[2:4], content_hash)
+
+    def exists(self, content_hash: str) -> bool:
+        return os.path.exists(self.path_for(content_hash))
+
+    def put(self, path: str, content_hash: str) -> str:
+        """Move um arquivo já com hash calculado para o seu local definitivo
+
+        Se o objeto já existe o conteúdo é o mesmo: a cópia é descartada.
+        """
+        final_path = self.path_for(content_hash)
+        if os.path.exists(final_path):
+            if os.path.abspath(path) != os.path.abspath(final_path):
+                os.remove(path)
+            return final_path
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(path, final_path)
+        return final_path
+
+    def remove(self, content_hash: str):
+        """Apaga um objeto sem referências"""
+        try:
+            os.remove(self.path_for(content_hash))
+        except FileNotFoundError:
+            pass
+
+    def iter_hashes(self) -> Iterator[str]:
+        """Hashes de todos os objetos em disco"""
+        for first in os.listdir(self.objects_dir):
+            first_dir = os.path.join(self.objects_dir, first)
+            if not os.path.isdir(first_dir):
+                continue
+            for second in os.listdir(first_dir):
+                second_dir = os.path.join(first_dir, second)
+                if os.path.isdir(second_dir):
+                    yield from (name for name in os.listdir(second_dir) if len(name) == 64)
+
+    def sweep(self, is_referenced: Callable[[Iterable[str]], set], min_age: float = 3600) -> int:
+        """Remove objetos que nenhuma foto usa (ex.: uploads que falharam)
+
+        ``is_referenced`` recebe um lote de hashes e devolve os que têm
+        referência no banco. Objetos mais novos que ``min_age`` segundos são
+        mantidos, pois podem pertencer a um upload ainda em processamento.
+        """
+        removed = 0
+        now = time.time()
+        batch = []
+
+        def flush():
+            nonlocal removed
+            referenced = is_referenced(batch)
+            for content_hash in batch:
+                path = self.path_for(content_hash)
+                if content_hash not in referenced and now - os.path.getmtime(path) > min_age:
+                    self.remove(content_hash)
+                    removed += 1
+            batch.clear()
+
+        for content_hash in self.iter_hashes():
+            batch.append(content_hash)
+            if len(batch) >= 500:
+                flush()
+        if batch:
+            flush()
+
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            if now - os.path.getmtime(path) > min_age:
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+        return removed
+
+
+def perceptual_hash(image) -> int:
+    """dHash de 64 bits de uma imagem PIL
+
+    Compara o brilho de pixels vizinhos em uma miniatura 9x8 em tons de
+    cinza: recompressões, redimensionamentos e pequenos ajustes de cor mudam
+    poucos bits, então fotos quase iguais ficam a uma distância de Hamming
+    pequena. Retorna um inteiro com sinal (cabe em BIGINT).
+    """
+    pixels = np.asarray(image.convert('L').resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    value = int(np.packbits(bits).view('>u8')[0])
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def hamming_distances(hashes: np.ndarray, value: int) -> np.ndarray:
+    """Distância de Hamming entre ``value`` e cada hash (vetor int64)"""
+    if len(hashes) == 0:
+        return np.empty(0, dtype=np.int64)
+    xor = np.asarray(hashes, dtype=np.int64) ^ np.int64(value)
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def find_near_duplicate(hashes: np.ndarray, photo_ids: np.ndarray, value: Optional[int],
+                        max_distance: int) -> Optional[int]:
+    """PhotoId mais parecido a até ``max_distance`` bits, ou None"""
+    if value is None or len(hashes) == 0:
+        return None
+    distances = hamming_distances(hashes, value)
+    best = int(np.argmin(distances))
+    return int(photo_ids[best]) if distances[best] <= max_distance else None
@@ -0,0 +1,214 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from photo_store import PhotoStore, check_hash
+
+logger = logging.getLogger(__name__)
+
+
+class RenditionService:
+    """Versões redimensionadas das fotos, em cache no disco
+
+    - ``grid``: miniatura da galeria (``grid_size`` px no maior lado)
+    - ``preview``: visualização ampliada (``preview_size`` px)
+    - ``watermarked``: a visualização ampliada com marca d'água, exibida
+      publicamente no lugar da foto original
+
+    Os arquivos ficam em ``<root>/<tipo>/<h[0:2]>/<sha256>.jpg``. As versões
+    são geradas de uma vez na ingestão (``generate_all``, a partir da imagem
+    já decodificada) e, se tiverem sido removidas do cache, recriadas sob
+    demanda a partir do PhotoStore (``get``). O cache tem um limite de
+    tamanho: ao ultrapassá-lo os arquivos usados há mais tempo são apagados.
+    """
+
+    KINDS = ('grid', 'preview', 'watermarked')
+
+    def __init__(self, photo_store: PhotoStore, root: str, grid_size: int = 300, preview_size: int = 1200,
+                 quality: int = 85, max_bytes: int = 2 * 1024 ** 3, watermark_text: str = 'PhotoCap'):
+        self.photo_store = photo_store
+        self.root = root
+        self.sizes = {'grid': grid_size, 'preview': preview_size, 'watermarked': preview_size}
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.watermark_text = watermark_text
+        for kind in self.KINDS:
+            os.makedirs(os.path.join(root, kind), exist_ok=True)
+
+        # Tamanho do cache neste processo: medido na primeira gravação e
+        # recalculado a cada limpeza (outros workers também gravam)
+        self._bytes = None
+        self._lock = threading.Lock()
+        self._generating = {}
+
+    def path_for(self, content_hash: str, kind: str) -> str:
+        if kind not in self.KINDS:
+            raise ValueError(f'Tipo de versão desconhecido: {kind}')
+        content_hash = check_hash(content_hash)
+        return os.path.join(self.root, kind, content_hash[:2], f'{content_hash}.jpg')
+
+    # Geração
+
+    def _watermark(self, image: Image.Image) -> Image.Image:
+        """Repete o texto na diagonal, semitransparente, sobre toda a imagem"""
+        base = image.convert('RGBA')
+        font_size = max(16, base.width // 16)
+        try:
+            font = ImageFont.load_default(size=font_size)
+        except TypeError:  # Pillow < 10.1
+            font = ImageFont.load_default()
+
+        tile = Image.new('RGBA', (font_size * len(self.watermark_text), font_size * 3), (0, 0, 0, 0))
+        ImageDraw.Draw(tile).text((0, font_size), self.watermark_text, font=font, fill=(255, 255, 255, 96))
+        tile = tile.rotate(30, expand=True)
+
+        overlay = Image.new('RGBA', base.size, (0, 0, 0, 0))
+        for y in range(0, base.height, tile.height):
+            for x in range(0, base.width, tile.width):
+                overlay.alpha_composite(tile, (x, y))
+        return Image.alpha_composite(base, overlay).convert('RGB')
+
+    def _render(self, image: Image.Image, kind: str) -> Image.Image:
+        size = self.sizes[kind]
+        rendition = image.copy()
+        rendition.thumbnail((size, size), Image.LANCZOS if kind != 'grid' else Image.BILINEAR)
+        if kind == 'watermarked':
+            return self._watermark(rendition)
+        return rendition
+
+    def _write(self, rendition: Image.Image, path: str) -> int:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        rendition.save(tmp_path, 'JPEG', quality=self.quality, optimize=True, progressive=rendition.width > 600)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def generate_all(self, content_hash: str, image: Image.Image) -> Dict[str, str]:
+        """Gera as versões que faltam a partir de uma imagem já aberta
+
+        As versões menores partem da maior já reduzida, para não redimensionar
+        a foto original mais de uma vez.
+        """
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        # Maior primeiro: a prévia serve de base para as demais
+        base = image.copy()
+        base.thumbnail((self.sizes['preview'], self.sizes['preview']), Image.LANCZOS)
+
+        paths, written = {}, 0
+        for kind in ('preview', 'watermarked', 'grid'):
+            path = self.path_for(content_hash, kind)
+            if not os.path.exists(path):
+                written += self._write(self._render(base, kind), path)
+            paths[kind] = path
+        self._account(written)
+        return paths
+
+    def _generate(self, content_hash: str, kind: str) -> Optional[str]:
+        source = self.photo_store.path_for(content_hash)
+        if not os.path.exists(source):
+            return None
+        with Image.open(source) as image:
+            image.load()
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            path = self.path_for(content_hash, kind)
+            self._account(self._write(self._render(image, kind), path))
+        return path
+
+    # Leitura
+
+    def get(self, content_hash: str, kind: str) -> Optional[str]:
+        """Caminho da versão, recriando-a se não estiver no cache
+
+        Retorna None se a foto original não existe. Requisições simultâneas
+        pela mesma versão ausente esperam uma única geração.
+        """
+        path = self.path_for(content_hash, kind)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return self._get_missing(content_hash, kind, path)
+
+        # Marca o uso para o LRU (no máximo uma vez por hora por arquivo)
+        now = time.time()
+        if now - stat.st_mtime > 3600:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return path
+
+    def _get_missing(self, content_hash: str, kind: str, path: str) -> Optional[str]:
+        key = (content_hash, kind)
+        with self._lock:
+            event = self._generating.get(key)
+            owner = event is None
+            if owner:
+                event = self._generating[key] = threading.Event()
+
+        if not owner:
+            event.wait(30)
+            return path if os.path.exists(path) else None
+
+        try:
+            return self._generate(content_hash, kind)
+        finally:
+            with self._lock:
+                self._generating.pop(key, None)
+            event.set()
+
+    # Limite de tamanho (LRU)
+
+    def _scan(self):
+        entries = []
+        for kind in self.KINDS:
+            for directory, _, names in os.walk(os.path.join(self.root, kind)):
+                for name in names:
+                    if name.endswith('.jpg'):
+                        try:
+                            stat = os.stat(os.path.join(directory, name))
+                        except FileNotFoundError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, os.path.join(directory, name)))
+        return entries
+
+    def _account(self, written: int):
+        if not written:
+            return
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._bytes += written
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self, target: float = 0.9) -> int:
+        """Apaga as versões usadas há mais tempo até o cache ficar abaixo de
+        ``target`` x ``max_bytes``; retorna quantos arquivos foram removidos"""
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        limit = self.max_bytes * target
+        removed = 0
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self._bytes = total
+        if removed:
+            logger.info("Cache de versões: %d arquivo(s) removido(s), %dMB em uso", removed, total // (1024 * 1024))
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'bytes': self._bytes, 'max_bytes': self.max_bytes}
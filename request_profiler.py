@@ -0,0 +1,109 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+_UNSAFE_NAME = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+class SlowRequestProfiler:
+    """Amostragem das pilhas das requisições lentas (desligado por padrão)
+
+    Enquanto uma requisição sorteada (``sample_rate``) está em andamento, uma
+    thread lê a pilha da thread dela a cada ``interval`` segundos. Se a
+    requisição levar ``threshold`` segundos ou mais, as pilhas são gravadas
+    em ``<folder>/<horário>-<rota>-<request_id>.folded``, no formato "folded"
+    aceito por flamegraph.pl e speedscope; as demais são descartadas. Só os
+    ``keep`` perfis mais recentes são mantidos.
+    """
+
+    def __init__(self, folder: str, threshold: float, interval: float = 0.005, sample_rate: float = 1.0,
+                 keep: int = 50, max_depth: int = 100):
+        self.folder = folder
+        self.threshold = threshold
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.max_depth = max_depth
+        os.makedirs(folder, exist_ok=True)
+
+        self.saved = 0
+        self._reset()
+        # A thread de amostragem não sobrevive ao fork: cada worker cria a sua
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._active = {}
+        self._cond = threading.Condition(threading.Lock())
+        self._thread = None
+
+    def start(self) -> Optional[Tuple[int, float]]:
+        """Começa a amostrar a thread atual; devolve o identificador para ``stop``"""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None
+        ident = threading.get_ident()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+            self._active[ident] = Counter()
+            self._cond.notify()
+        return ident, time.perf_counter()
+
+    def stop(self, token: Optional[Tuple[int, float]], name: str, request_id: str = '-') -> Optional[str]:
+        """Encerra a amostragem; grava o perfil se a requisição foi lenta"""
+        if token is None:
+            return None
+        ident, started = token
+        seconds = time.perf_counter() - started
+        with self._cond:
+            samples = self._active.pop(ident, None)
+        if not samples or seconds < self.threshold:
+            return None
+        return self._save(samples, seconds, name, request_id)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._active:
+                    self._cond.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._cond:
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[self._stack(frame)] += 1
+            del frames
+
+    def _stack(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _save(self, samples: Counter, seconds: float, name: str, request_id: str) -> str:
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        filename = _UNSAFE_NAME.sub('_', f'{stamp}-{name}-{request_id}-{int(seconds * 1000)}ms') + '.folded'
+        path = os.path.join(self.folder, filename)
+        with open(path, 'w') as handle:
+            for stack, count in samples.most_common():
+                handle.write(f'{stack} {count}\n')
+        self.saved += 1
+        self._prune()
+        return path
+
+    def _prune(self):
+        try:
+            profiles = sorted((entry for entry in os.scandir(self.folder) if entry.name.endswith('.folded')),
+                              key=lambda entry: entry.stat().st_mtime)
+            for entry in profiles[:-self.keep]:
+                os.remove(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,78 @@
+import functools
+from collections import namedtuple
+from typing import Any, List, Type, TypeVar
+
+# Linhas lidas do driver por vez: só um lote fica em memória junto das linhas já convertidas
+FETCH_BATCH = 1000
+
+T = TypeVar('T', bound=tuple)
+
+
+class _RowAccess:
+    """Acesso por nome de coluna (``row['Name']``), como nos dicts usados antes
+
+    As linhas são tuplas nomeadas: sem ``__dict__`` por linha, construídas
+    direto da tupla do cursor e serializadas pelo cache como tuplas.
+    Nos templates, ``row.Name`` é um atributo comum.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return super().__getitem__(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def keys(self):
+        return self._fields
+
+
+class Event(_RowAccess, namedtuple('Event', 'EventId Name Date OwnerId')):
+    __slots__ = ()
+
+
+class Photo(_RowAccess, namedtuple('Photo', 'PhotoId EventId Filename UploadDate ContentHash')):
+    __slots__ = ()
+
+
+class PhotoHash(_RowAccess, namedtuple('PhotoHash', 'PhotoId ContentHash PerceptualHash')):
+    __slots__ = ()
+
+
+class User(_RowAccess, namedtuple('User', 'UserId Username Email UserType FullName CPF Phone CreatedDate')):
+    __slots__ = ()
+
+
+def fetch_rows(cursor, row_type: Type[T]) -> List[T]:
+    """Todas as linhas do cursor como ``row_type``, lidas em lotes
+
+    O SELECT traz as colunas na ordem dos campos do tipo: cada linha vira
+    a tupla nomeada direto em C (sem o ``_make``, que é uma função Python).
+    """
+    make = functools.partial(tuple.__new__, row_type)
+    rows = []
+    while True:
+        batch = cursor.fetchmany(FETCH_BATCH)
+        rows.extend(map(make, batch))
+        # Lote incompleto: acabou (sem outra ida ao driver, o caso das páginas)
+        if len(batch) < FETCH_BATCH:
+            return rows
+
+
+def format_date(value: Any, fmt: str = '%d/%m/%Y') -> str:
+    """Data (date/datetime) formatada para exibição; filtro ``format_date`` dos templates
+
+    As linhas guardam as datas como vieram do banco: a formatação acontece
+    uma vez, só para o que o template mostra.
+    """
+    if value is None:
+        return ''
+    if hasattr(value, 'strftime'):
+        return value.strftime(fmt)
+    return str(value)
@@ -5,18 +5,40 @@ Sistema de gerenciamento de fotos de eventos
 """
 
 from app import create_app
-from db_manager import DatabaseManager
 import os
+import sys
+
+def run_production():
+    """Sobe o gunicorn com gunicorn.conf.py: aplicação pré-carregada, preparada e em vários workers"""
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("❌ O modo produção requer o gunicorn (pip install -r requirements.txt, Linux/macOS)")
+        return
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    # Substitui este processo pelo script do gunicorn do mesmo ambiente: o mestre
+    # se reexecuta com o mesmo comando no deploy (kill -USR2)
+    script = os.path.join(os.path.dirname(sys.executable), 'gunicorn')
+    command = [script] if os.path.exists(script) else [sys.executable, '-m', 'gunicorn']
+    sys.stdout.flush()
+    os.execv(command[0], command + ['--config', os.path.join(base_dir, 'gunicorn.conf.py'), 'wsgi:application'])
 
 def main():
     """Função principal para iniciar a aplicação"""
+    if '--production' in sys.argv[1:]:
+        print("🚀 Iniciando PhotoCap em modo produção (gunicorn)...")
+        run_production()
+        return
+    
     print("🚀 Iniciando PhotoCap...")
     
+    # Criar a aplicação (o gerenciador de dados é criado em create_app)
+    app = create_app()
+    
     # Verificar conexão com banco de dados
-    data_manager = DatabaseManager()
+    data_manager = app.extensions['data_manager']
     if data_manager.test_connection():
-        print("✅ Conexão com SQL Server estabelecida com sucesso!")
-        print("✅ Gerenciador de dados SQL Server carregado")
+        print(f"✅ Gerenciador de dados {data_manager.backend.display_name} carregado")
     else:
         print("❌ Erro ao conectar com o banco de dados")
         return
@@ -37,9 +59,6 @@ def main():
     
     print("🔧 Configurações carregadas")
     
-    # Criar e executar a aplicação
-    app = create_app()
-    
     # Configurações de desenvolvimento
     app.config['DEBUG'] = True
     app.config['HOST'] = '0.0.0.0'
@@ -48,6 +67,7 @@ def main():
     print(f"🌐 Servidor iniciado em http://localhost:{app.config['PORT']}")
     print("📝 Modo debug ativado")
     print("🔄 Para parar o servidor, pressione Ctrl+C")
+    print("🏭 Em produção: python run.py --production")
     
     # Executar a aplicação
     app.run(
@@ -0,0 +1,159 @@
+import logging
+import os
+import pickle
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger(__name__)
+
+
+def load_secret_key(path: str) -> bytes:
+    """Chave secreta das sessões lida de ``path``, criada na primeira vez
+
+    Todos os workers do nó leem o mesmo arquivo; em vários nós, defina
+    PHOTOCAP_SECRET_KEY com o mesmo valor em todos.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        # O_EXCL: se dois workers sobem juntos, só um grava
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, 'rb') as handle:
+            return handle.read()
+    key = secrets.token_bytes(32)
+    with os.fdopen(fd, 'wb') as handle:
+        handle.write(key)
+    return key
+
+
+class StoredSession(CallbackDict, SessionMixin):
+    """Sessão cujos dados ficam no servidor; o cookie leva apenas o ID"""
+
+    def __init__(self, initial=None, sid=None, expires=None):
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.modified = False
+        # Usuário da sessão como foi lida: se mudar, o ID é trocado ao gravar
+        self.loaded_user_id = self.get('user_id')
+
+
+class SQLiteSessionInterface(SessionInterface):
+    """Sessões em um arquivo SQLite local, comum a todos os workers do nó
+
+    Os dados só são gravados quando a sessão muda; a validade de uma sessão
+    apenas lida é renovada no máximo a cada ``refresh_interval`` segundos.
+    Quando o ``user_id`` muda (login, troca de usuário), a sessão é gravada
+    com um ID novo e a antiga é apagada: um ID obtido ou plantado antes do
+    login não dá acesso à conta (fixação de sessão).
+    Uma requisição comum custa um SELECT por chave primária. As sessões
+    vencidas são apagadas a cada ``sweep_interval`` segundos, então o
+    arquivo não cresce sem limite.
+    """
+
+    session_class = StoredSession
+
+    def __init__(self, path: str, sweep_interval: float = 300, refresh_interval: float = 60):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self.refresh_interval = refresh_interval
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+        self._connection().execute("""
+            CREATE TABLE IF NOT EXISTS Sessions (
+                SessionId TEXT NOT NULL PRIMARY KEY,
+                Data BLOB NOT NULL,
+                Expires REAL NOT NULL
+            )
+        """)
+        self._connection().execute("CREATE INDEX IF NOT EXISTS IX_Sessions_Expires ON Sessions (Expires)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Uma conexão por thread e por processo (as do processo pai não valem após o fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _lifetime(self, app) -> float:
+        return app.permanent_session_lifetime.total_seconds()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self._connection().execute(
+                "SELECT Data, Expires FROM Sessions WHERE SessionId = ? AND Expires > ?", (sid, time.time())
+            ).fetchone()
+            if row is not None:
+                return self.session_class(pickle.loads(row[0]), sid=sid, expires=row[1])
+        return self.session_class(sid=secrets.token_urlsafe(32))
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        conn = self._connection()
+        now = time.time()
+        self._sweep(now)
+
+        if not session:
+            if session.modified and session.expires is not None:
+                # Logout: remove a sessão gravada e o cookie
+                conn.execute("DELETE FROM Sessions WHERE SessionId = ?", (session.sid,))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.expires is not None and session.get('user_id') != session.loaded_user_id:
+            self.regenerate(session)
+
+        expires = now + self._lifetime(app)
+        if session.modified or session.expires is None:
+            conn.execute("INSERT OR REPLACE INTO Sessions (SessionId, Data, Expires) VALUES (?, ?, ?)",
+                         (session.sid, pickle.dumps(dict(session), pickle.HIGHEST_PROTOCOL), expires))
+        elif expires - session.expires >= self.refresh_interval and self.should_set_cookie(app, session):
+            conn.execute("UPDATE Sessions SET Expires = ? WHERE SessionId = ?", (expires, session.sid))
+        else:
+            return
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+    def regenerate(self, session):
+        """Troca o ID da sessão e apaga a gravada com o ID antigo"""
+        self._connection().execute("DELETE FROM Sessions WHERE SessionId = ?", (session.sid,))
+        session.sid = secrets.token_urlsafe(32)
+        session.expires = None
+        session.loaded_user_id = session.get('user_id')
+
+    def _sweep(self, now: float):
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        try:
+            removed = self._connection().execute("DELETE FROM Sessions WHERE Expires <= ?", (now,)).rowcount
+            if removed:
+                logger.info("%d sessão(ões) vencida(s) removida(s)", removed)
+        except sqlite3.Error as e:
+            logger.warning("Erro ao limpar sessões vencidas: %s", e)
@@ -0,0 +1,65 @@
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app import create_app
+from db_backends import create_backend
+from db_manager import DatabaseManager
+
+
+def jpeg_bytes(color='red', size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Aplicação com banco SQLite e pastas (uploads, índices) em tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    manager = DatabaseManager(backend=create_backend('sqlite', sqlite_path=str(tmp_path / 'photocap.db')))
+    app = create_app(manager)
+    app.config['TESTING'] = True
+    yield app
+    app.extensions['password_hasher'].shutdown()
+
+
+@pytest.fixture
+def data_manager(app):
+    return app.extensions['data_manager']
+
+
+@pytest.fixture
+def jpeg():
+    return jpeg_bytes
+
+
+@pytest.fixture
+def add_photo(app, data_manager):
+    """Grava uma foto no PhotoStore e no banco, como a ingestão; retorna (PhotoId, hash)"""
+    store = app.extensions['photo_store']
+
+    def add(event_id, data, filename='foto.jpg'):
+        content_hash = hashlib.sha256(data).hexdigest()
+        staged = os.path.join(store.tmp_dir, content_hash)
+        with open(staged, 'wb') as handle:
+            handle.write(data)
+        store.put(staged, content_hash)
+        photo_ids = data_manager.save_photos_bulk(event_id, [
+            {'filename': filename, 'content_hash': content_hash, 'size': len(data)}
+        ])
+        return photo_ids[0], content_hash
+    return add
+
+
+@pytest.fixture
+def log_in():
+    """Coloca o usuário na sessão do cliente de teste"""
+    def log_in(client, user_id, user_type='photographer'):
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+            session['user_type'] = user_type
+    return log_in
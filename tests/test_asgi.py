@@ -0,0 +1,156 @@
+import asyncio
+import time
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import pytest
+
+from asgi import create_asgi_app
+
+
+@pytest.fixture
+def asgi(app):
+    asgi = create_asgi_app(app)
+    yield asgi
+    asgi.wsgi_executor.shutdown(wait=True)
+    app.extensions['async_data_manager'].shutdown()
+    app.extensions['async_io'].shutdown()
+
+
+class Response:
+    def __init__(self, messages):
+        start = messages[0]
+        assert start['type'] == 'http.response.start'
+        self.status = start['status']
+        self.headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in start['headers']]
+        self.chunks = [message['body'] for message in messages[1:] if message.get('body')]
+        self.body = b''.join(self.chunks)
+        assert not messages[-1].get('more_body', False)
+
+    def header(self, name):
+        return next((value for key, value in self.headers if key == name), None)
+
+
+def request(asgi, method, path, body=b'', headers=(), chunk=None, cookie=None):
+    """Chama a aplicação ASGI como o uvicorn; ``chunk`` divide o corpo em várias mensagens"""
+    path, _, query = path.partition('?')
+    headers = [(name.encode(), value.encode()) for name, value in headers]
+    if cookie:
+        headers.append((b'cookie', cookie.encode()))
+    if chunk is None:
+        headers.append((b'content-length', str(len(body)).encode()))
+    parts = [body[start:start + chunk] for start in range(0, len(body), chunk)] if chunk else [body]
+    messages = [{'type': 'http.request', 'body': part, 'more_body': index < len(parts) - 1}
+                for index, part in enumerate(parts or [b''])]
+    scope = {'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http', 'path': path,
+             'root_path': '', 'query_string': query.encode(), 'headers': headers,
+             'server': ('testserver', 80), 'client': ('127.0.0.1', 5000)}
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi(scope, receive, send))
+    return Response(sent)
+
+
+def not_in_flask(app, endpoint):
+    """Troca a view do Flask por uma que falha: a resposta tem de vir da corrotina"""
+    def view(**kwargs):
+        raise AssertionError(f'{endpoint} atendido pelo Flask')
+    app.view_functions[endpoint] = view
+
+
+def log_in(asgi, data_manager, email='ana@example.com', user_type='photographer'):
+    """Login pelo formulário (rota do Flask); retorna (UserId, cookie da sessão)"""
+    user_id = data_manager.create_user(email.split('@')[0], 'senha123', email, user_type)
+    response = request(asgi, 'POST', '/auth/login', urlencode({'email': email, 'password': 'senha123'}).encode(),
+                       headers=[('content-type', 'application/x-www-form-urlencoded')])
+    assert response.status == 302
+    return user_id, response.header('set-cookie').split(';', 1)[0]
+
+
+@pytest.fixture
+def event(data_manager, add_photo, jpeg):
+    """Evento de outro fotógrafo com uma foto; retorna (EventId, hash)"""
+    event_id = data_manager.create_event('Maratona do Rio', '2024-06-01', owner_id=999)
+    _, content_hash = add_photo(event_id, jpeg('green'))
+    return event_id, content_hash
+
+
+def test_read_routes_are_served_by_coroutines(app, asgi, event):
+    event_id, content_hash = event
+    for endpoint in ('dashboard.index', 'search.index', 'search.event_details', 'search.event_photos'):
+        not_in_flask(app, endpoint)
+
+    assert 'Maratona do Rio' in request(asgi, 'GET', '/').body.decode()
+    assert 'Maratona do Rio' in request(asgi, 'GET', '/search/?event_name=maratona').body.decode()
+    page = request(asgi, 'GET', f'/search/event/{event_id}')
+    assert page.status == 200 and content_hash in page.body.decode()
+    photos = request(asgi, 'GET', f'/search/event/{event_id}/photos')
+    assert photos.header('content-type') == 'application/json'
+    assert b'grid_url' in photos.body
+
+
+def test_async_responses_match_flask(app, asgi, event):
+    event_id, content_hash = event
+    client = app.test_client()
+
+    for path in (f'/search/event/{event_id}/photos', f'/photos/grid/{content_hash}.jpg'):
+        expected = client.get(path)
+        response = request(asgi, 'GET', path)
+        assert response.status == expected.status_code
+        assert response.body == expected.get_data()
+
+
+def test_file_is_streamed_in_chunks(app, asgi, event):
+    _, content_hash = event
+    asgi.chunk_size = 256
+    not_in_flask(app, 'photos.rendition')
+
+    response = request(asgi, 'GET', f'/photos/watermarked/{content_hash}.jpg')
+
+    assert response.status == 200
+    assert len(response.chunks) > 1 and all(len(chunk) <= 256 for chunk in response.chunks)
+    assert response.body[:2] == b'\xff\xd8'
+
+
+def test_unknown_path_and_redirects_fall_back_to_flask(asgi):
+    assert request(asgi, 'GET', '/nao-existe').status == 404
+    assert request(asgi, 'GET', '/search').status == 308
+
+
+def test_session_from_flask_login_reaches_async_views(asgi, data_manager, add_photo, jpeg):
+    user_id, cookie = log_in(asgi, data_manager)
+    event_id = data_manager.create_event('Corrida', '2024-05-01', owner_id=user_id)
+    photo_id, content_hash = add_photo(event_id, jpeg('red'))
+
+    assert request(asgi, 'GET', f'/photos/{photo_id}/original', cookie=cookie).status == 200
+    assert request(asgi, 'GET', f'/photos/preview/{content_hash}.jpg', cookie=cookie).status == 200
+    assert request(asgi, 'GET', f'/photos/preview/{content_hash}.jpg').status == 403
+    assert request(asgi, 'GET', f'/photos/{photo_id}/original').status == 302
+
+
+def test_streamed_upload_goes_through_flask(app, asgi, data_manager, jpeg):
+    user_id, cookie = log_in(asgi, data_manager)
+    event_id = data_manager.create_event('Corrida', '2024-05-01', owner_id=user_id)
+    boundary = 'photocapasgi'
+    photo = jpeg('blue', (400, 300))
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="event_id"\r\n\r\n{event_id}\r\n'
+            f'--{boundary}\r\nContent-Disposition: form-data; name="photos"; filename="a.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n').encode() + photo + f'\r\n--{boundary}--\r\n'.encode()
+
+    # Sem Content-Length (chunked), em mensagens de 1 KB
+    response = request(asgi, 'POST', '/events/upload_photos', body, chunk=1024, cookie=cookie,
+                       headers=[('content-type', f'multipart/form-data; boundary={boundary}')])
+
+    assert response.status == 302
+    job_id = parse_qs(urlsplit(response.header('location')).query)['job'][0]
+    queue = app.extensions['ingestion']
+    deadline = time.monotonic() + 30
+    while queue.status(job_id)['status'] != queue.STATUS_DONE:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert data_manager.count_photos(event_id) == 1
@@ -0,0 +1,25 @@
+from db_cache import MISS, SharedCache
+
+
+def test_shared_cache_hit_does_not_write_within_touch_interval(tmp_path):
+    cache = SharedCache(str(tmp_path / 'cache.db'), touch_interval=60)
+    cache.set('key', 'events', [1, 2, 3])
+    conn = cache._connection()
+    writes = conn.total_changes
+
+    for _ in range(100):
+        assert cache.get('key') == [1, 2, 3]
+
+    assert conn.total_changes == writes
+    assert cache.get('other') is MISS
+
+
+def test_shared_cache_hit_refreshes_last_used_after_touch_interval(tmp_path):
+    cache = SharedCache(str(tmp_path / 'cache.db'), touch_interval=0)
+    cache.set('key', 'events', [1])
+    conn = cache._connection()
+    conn.execute("UPDATE CacheEntries SET LastUsed = 0")
+
+    assert cache.get('key') == [1]
+
+    assert conn.execute("SELECT LastUsed FROM CacheEntries").fetchone()[0] > 0
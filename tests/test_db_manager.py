@@ -0,0 +1,24 @@
+import pytest
+
+
+def test_add_photos_keeps_each_photo_in_its_event(data_manager):
+    first = data_manager.create_event('Um', '2024-01-01', owner_id=1)
+    second = data_manager.create_event('Dois', '2024-01-02', owner_id=1)
+
+    photo_ids = data_manager.add_photos([
+        {'event_id': first, 'filename': 'a.jpg', 'image_data': b'a'},
+        {'event_id': second, 'filename': 'b.jpg', 'image_data': b'b'},
+        {'event_id': first, 'filename': 'c.jpg', 'image_data': b'c'},
+    ])
+
+    assert [data_manager.get_photo_by_id(photo_id)['Filename'] for photo_id in photo_ids] == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert [data_manager.get_photo_by_id(photo_id)['EventId'] for photo_id in photo_ids] == [first, second, first]
+    assert data_manager.count_photos(first) == 2 and data_manager.count_photos(second) == 1
+
+
+def test_add_photos_requires_event_id(data_manager):
+    event_id = data_manager.create_event('Um', '2024-01-01', owner_id=1)
+
+    with pytest.raises(ValueError):
+        data_manager.add_photos([{'event_id': event_id, 'filename': 'a.jpg'}, {'filename': 'b.jpg'}])
+    assert data_manager.count_photos(event_id) == 0
@@ -0,0 +1,67 @@
+import pytest
+
+
+def legacy_event(data_manager, name='Antigo'):
+    """Evento criado antes da coluna OwnerId"""
+    return data_manager.create_event(name, '2020-01-01')
+
+
+@pytest.fixture
+def photographers(data_manager):
+    return [data_manager.create_user(name, 'senha123', f'{name}@example.com', 'photographer')
+            for name in ('ana', 'bia')]
+
+
+def test_orphan_event_is_nobody_s(data_manager, photographers):
+    legacy = legacy_event(data_manager)
+
+    assert [event.EventId for event in data_manager.get_events_page(10, owner_id=photographers[0])] == []
+    assert data_manager.count_events(photographers[0]) == 0
+    assert data_manager.count_events() == 1
+    assert data_manager.get_event_by_id(legacy).OwnerId is None
+
+
+def test_orphan_event_accepts_no_upload_or_original(app, data_manager, log_in, add_photo, jpeg, photographers):
+    legacy = legacy_event(data_manager)
+    photo_id, _ = add_photo(legacy, jpeg('red'))
+    client = app.test_client()
+    log_in(client, photographers[0])
+
+    assert client.get(f'/photos/{photo_id}/original').status_code == 403
+    response = client.post('/events/upload_photos', data={'event_id': str(legacy)},
+                           content_type='multipart/form-data')
+    assert 'Selecione um evento' in response.get_data(as_text=True)
+
+
+def test_single_photographer_claims_orphans(data_manager):
+    owner = data_manager.create_user('ana', 'senha123', 'ana@example.com', 'photographer')
+    data_manager.create_user('cliente', 'senha123', 'c@example.com', 'customer')
+    legacy = legacy_event(data_manager)
+
+    assert data_manager.claim_orphan_events() == 1
+    assert data_manager.get_event_by_id(legacy).OwnerId == owner
+    assert data_manager.count_events(owner) == 1
+
+
+def test_orphans_stay_unowned_with_several_photographers(data_manager, photographers):
+    legacy = legacy_event(data_manager)
+
+    assert data_manager.claim_orphan_events() == 0
+    assert data_manager.get_event_by_id(legacy).OwnerId is None
+
+
+def test_claim_events_command(app, data_manager, photographers):
+    first, second = legacy_event(data_manager, 'Um'), legacy_event(data_manager, 'Dois')
+    owned = data_manager.create_event('Novo', '2024-01-01', owner_id=photographers[1])
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['claim-events', 'ana', '--event', str(first), '--event', str(owned)])
+    assert result.exit_code == 0 and '1 evento(s)' in result.output
+    assert data_manager.get_event_by_id(first).OwnerId == photographers[0]
+    assert data_manager.get_event_by_id(second).OwnerId is None
+    assert data_manager.get_event_by_id(owned).OwnerId == photographers[1]
+
+    assert runner.invoke(args=['claim-events', 'bia']).exit_code == 0
+    assert data_manager.get_event_by_id(second).OwnerId == photographers[1]
+
+    assert runner.invoke(args=['claim-events', 'ninguem']).exit_code != 0
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+
+@pytest.fixture
+def event_id(data_manager):
+    """Evento do fotógrafo 1"""
+    return data_manager.create_event('Corrida', '2024-05-01', owner_id=1)
+
+
+def post_photo(client, jpeg, event_id=None):
+    data = {'event_id': str(event_id)} if event_id is not None else {}
+    data['photos'] = (io.BytesIO(jpeg('blue')), 'foto.jpg')
+    return client.post('/events/upload_photos', data=data, content_type='multipart/form-data')
+
+
+def stored_objects(app):
+    return list(app.extensions['photo_store'].iter_hashes())
+
+
+def test_owner_upload_is_stored_and_queued(app, log_in, jpeg, event_id):
+    client = app.test_client()
+    log_in(client, 1)
+
+    response = post_photo(client, jpeg, event_id)
+
+    assert response.status_code == 302
+    assert 'job=' in response.headers['Location']
+    assert len(stored_objects(app)) == 1
+
+
+@pytest.mark.parametrize('target', ['other', 'missing', None])
+def test_upload_to_event_not_owned_stores_nothing(app, data_manager, log_in, jpeg, event_id, target):
+    client = app.test_client()
+    log_in(client, 2)
+    target_id = {'other': event_id, 'missing': 999, None: None}[target]
+
+    response = post_photo(client, jpeg, target_id)
+
+    assert response.status_code == 200
+    assert 'Selecione um evento' in response.get_data(as_text=True)
+    assert stored_objects(app) == []
+    assert data_manager.count_photos(event_id) == 0
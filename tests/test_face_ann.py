@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pytest
+
+from config import FACE_ANN_CONFIG
+from face_ann import FaceANNIndex
+from face_engine import normalize_rows
+from face_index import FaceIndexStore
+
+DIMENSION = 32
+EVENTS = 4
+FACES_PER_EVENT = 500
+
+
+@pytest.fixture
+def faces():
+    """Faces agrupadas (pessoas com variações), como embeddings reais: {EventId: (vetores, PhotoIds)}"""
+    rng = np.random.default_rng(7)
+    people = normalize_rows(rng.normal(size=(60, DIMENSION)).astype(np.float32))
+    faces = {}
+    for event_id in range(1, EVENTS + 1):
+        who = rng.integers(0, len(people), FACES_PER_EVENT)
+        vectors = normalize_rows(people[who] + 0.1 * rng.normal(size=(FACES_PER_EVENT, DIMENSION)).astype(np.float32))
+        faces[event_id] = (vectors, event_id * 10000 + np.arange(FACES_PER_EVENT))
+    return faces
+
+
+@pytest.fixture
+def store(tmp_path, faces):
+    store = FaceIndexStore(str(tmp_path / 'face_index'), DIMENSION)
+    for event_id, (vectors, photo_ids) in faces.items():
+        store.build(event_id, [{'PhotoId': int(photo_id), 'Embedding': vector.tobytes()}
+                               for vector, photo_id in zip(vectors, photo_ids)])
+    return store
+
+
+def make_index(store, **overrides):
+    return FaceANNIndex(store, dict(FACE_ANN_CONFIG, **overrides))
+
+
+def test_build_writes_every_vector_next_to_its_photo(store, faces):
+    index = make_index(store, nlist=16)
+    meta = index.build()
+    loaded = index._load()
+
+    assert meta['count'] == EVENTS * FACES_PER_EVENT
+    expected = {int(photo_id): (event_id, vector)
+                for event_id, (vectors, photo_ids) in faces.items()
+                for vector, photo_id in zip(vectors, photo_ids)}
+    for row, photo_id in enumerate(loaded['photo_ids']):
+        event_id, vector = expected[int(photo_id)]
+        assert loaded['event_ids'][row] == event_id
+        np.testing.assert_array_equal(loaded['vectors'][row], vector)
+        np.testing.assert_allclose(loaded['vectors16'][row], vector, atol=1e-3)
+    assert loaded['offsets'][-1] == meta['count']
+
+
+def test_approximate_search_recall_against_exact(store, faces):
+    exact = make_index(store, nlist=32, min_vectors=10 ** 9)
+    approximate = make_index(store, nlist=32, nprobe=8, rerank=200, min_vectors=0)
+    exact.build()
+
+    rng = np.random.default_rng(11)
+    found = total = 0
+    for _ in range(50):
+        event_id = int(rng.integers(1, EVENTS + 1))
+        vectors, _ = faces[event_id]
+        query = normalize_rows(vectors[rng.integers(len(vectors))][None] +
+                               0.05 * rng.normal(size=(1, DIMENSION)).astype(np.float32))
+        truth = {photo_id for photo_id, _, _ in exact.search(query, -1.0, limit=10)}
+        result = {photo_id for photo_id, _, _ in approximate.search(query, -1.0, limit=10)}
+        found += len(truth & result)
+        total += len(truth)
+
+    assert found / total >= 0.9
+
+
+def test_exact_search_with_event_filter(store, faces):
+    index = make_index(store, min_vectors=10 ** 9)
+    vectors, photo_ids = faces[2]
+
+    matches = index.search(vectors[0], 0.99, event_ids=[2, 3])
+
+    assert matches[0][:2] == (int(photo_ids[0]), 2)
+    assert {event_id for _, event_id, _ in index.search(vectors[0], -1.0, event_ids=[3])} == {3}
+
+
+def test_rebuild_skipped_when_another_process_already_replaced_the_version(store):
+    index = make_index(store, nlist=8)
+    first = index.build()['version']
+
+    # Outro worker também viu o índice ausente e esperou a trava
+    assert index._rebuild(None) is None
+    assert index._current_version() == first
+
+    replaced = index._rebuild(first)
+    assert replaced['version'] != first
+    assert index._current_version() == replaced['version']
+    assert os.path.isdir(os.path.join(index.root, replaced['version']))
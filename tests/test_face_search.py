@@ -0,0 +1,45 @@
+import pytest
+
+
+@pytest.fixture
+def events(data_manager):
+    """Eventos de 2022 a 2024; retorna {ano: [EventId]}"""
+    return {year: [data_manager.create_event(f'Corrida {year} {n}', f'{year}-0{n}-15', owner_id=1)
+                   for n in (1, 2)]
+            for year in (2022, 2023, 2024)}
+
+
+def test_event_years_are_distinct_and_descending(data_manager, events):
+    assert data_manager.get_event_years() == [2024, 2023, 2022]
+
+
+def test_event_ids_by_year_uses_the_whole_year(data_manager, events):
+    last_day = data_manager.create_event('Réveillon', '2023-12-31', owner_id=1)
+
+    assert sorted(data_manager.get_event_ids_by_year(2023)) == sorted(events[2023] + [last_day])
+    assert data_manager.get_event_ids_by_year(2021) == []
+
+
+def test_events_by_ids(data_manager, events):
+    wanted = {events[2022][0], events[2024][1], 999}
+
+    assert {event.EventId for event in data_manager.get_events_by_ids(wanted)} == wanted - {999}
+
+
+def test_form_lists_recent_events_and_the_chosen_one(app, events):
+    app.config['FACE_SEARCH_EVENTS'] = 2
+    client = app.test_client()
+
+    page = client.get('/search/face_search').get_data(as_text=True)
+    assert 'Corrida 2024 2' in page and 'Corrida 2024 1' in page
+    assert 'Corrida 2022 1' not in page
+    assert all(f'<option value="{year}"' in page for year in (2022, 2023, 2024))
+
+    page = client.get(f'/search/face_search?event_id={events[2022][0]}').get_data(as_text=True)
+    assert f'<option value="{events[2022][0]}" selected>' in page
+
+
+def test_form_does_not_scan_all_events(app, data_manager, events, monkeypatch):
+    monkeypatch.setattr(data_manager, 'get_all_events', lambda: pytest.fail('varredura de Events'))
+
+    assert app.test_client().get('/search/face_search').status_code == 200
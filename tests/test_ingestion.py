@@ -0,0 +1,107 @@
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from ingestion import IngestionQueue
+from photo_store import PhotoStore
+from renditions import RenditionService
+
+EVENT_ID = 1
+
+
+class InlineExecutor:
+    """Roda cada arquivo na hora: uma exceção chega ao teste em vez de sumir no pool"""
+
+    def submit(self, function, *args, **kwargs):
+        function(*args, **kwargs)
+
+
+class FakeDataManager:
+    """Só o que a IngestionQueue usa do DatabaseManager"""
+
+    def __init__(self, existing_hashes=()):
+        self.existing_hashes = list(existing_hashes)
+        self.saved = []
+
+    def get_photo_hashes(self, event_id):
+        return [{'PhotoId': photo_id, 'ContentHash': content_hash, 'PerceptualHash': None}
+                for photo_id, content_hash in enumerate(self.existing_hashes, start=1)]
+
+    def save_photos_bulk(self, event_id, batch):
+        start = len(self.existing_hashes) + len(self.saved) + 1
+        self.saved.extend(batch)
+        return list(range(start, start + len(batch)))
+
+    def set_near_duplicates(self, pairs):
+        pass
+
+
+def jpeg(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    def make(data_manager):
+        store = PhotoStore(str(tmp_path / 'store'))
+        renditions = RenditionService(store, str(tmp_path / 'renditions'))
+        queue = IngestionQueue(data_manager, None, store, renditions, str(tmp_path / 'uploads'),
+                               perceptual_hash=False)
+        queue._executor = InlineExecutor()
+        queue._executor_pid = os.getpid()
+        return queue
+    return make
+
+
+def submit(queue, contents):
+    """Grava os arquivos na pasta de preparação do job e o enfileira"""
+    job_id = queue.new_job_id()
+    files = []
+    for index, data in enumerate(contents):
+        path = os.path.join(queue.staging_dir(job_id), f'{index}.jpg')
+        with open(path, 'wb') as handle:
+            handle.write(data)
+        files.append((path, f'foto{index}.jpg', None))
+    queue.submit(job_id, EVENT_ID, files)
+    return job_id
+
+
+def test_job_of_only_duplicates_finishes(make_queue):
+    photos = [jpeg('red'), jpeg('blue')]
+    data_manager = FakeDataManager(hashlib.sha256(data).hexdigest() for data in photos)
+    queue = make_queue(data_manager)
+
+    job = queue.status(submit(queue, photos))
+
+    assert job['status'] == IngestionQueue.STATUS_DONE
+    assert (job['processed'], job['duplicates'], job['saved']) == (2, 2, 0)
+    assert data_manager.saved == []
+
+
+def test_job_of_one_corrupt_file_finishes(make_queue):
+    data_manager = FakeDataManager()
+    queue = make_queue(data_manager)
+
+    job = queue.status(submit(queue, [b'isto nao e uma imagem']))
+
+    assert job['status'] == IngestionQueue.STATUS_DONE
+    assert (job['processed'], job['failed'], job['saved']) == (1, 1, 0)
+    # Sem a mensagem da exceção, que traz o caminho da pasta de preparação
+    assert job['errors'] == ['foto0.jpg: imagem inválida ou erro no processamento']
+
+
+def test_pending_photo_is_saved_when_last_file_is_duplicate(make_queue):
+    existing = jpeg('green')
+    data_manager = FakeDataManager([hashlib.sha256(existing).hexdigest()])
+    queue = make_queue(data_manager)
+
+    job = queue.status(submit(queue, [jpeg('yellow'), existing]))
+
+    assert job['status'] == IngestionQueue.STATUS_DONE
+    assert (job['saved'], job['duplicates']) == (1, 1)
+    assert [item['filename'] for item in data_manager.saved] == ['foto0.jpg']
@@ -0,0 +1,61 @@
+import os
+import time
+
+import pytest
+
+from password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(iterations=1000, workers=1, max_pending=1, timeout=10)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_pool_hash_matches_inline(hasher):
+    password_hash, salt, iterations = hasher.hash('senha')
+
+    assert PasswordHasher(iterations, workers=0).verify('senha', password_hash, salt, iterations)
+    assert hasher.verify('senha', password_hash, salt, iterations)
+    assert not hasher.verify('outra', password_hash, salt, iterations)
+
+
+def test_timed_out_hash_keeps_its_slot_until_it_finishes(hasher):
+    hasher.hash('aquece o pool')
+    hasher.timeout = 0.01
+    with pytest.raises(PasswordHasherBusy):
+        hasher._derive('senha', b'salt', 3000000)
+
+    # O hash que estourou o tempo ainda ocupa a única vaga
+    with pytest.raises(PasswordHasherBusy):
+        hasher._derive('senha', b'salt', 1000)
+    assert hasher.rejected == 1
+
+    hasher.timeout = 10
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            hasher._derive('senha', b'salt', 1000)
+            break
+        except PasswordHasherBusy:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+
+
+def test_verify_in_process_forked_after_pool_started(hasher):
+    password_hash, salt, iterations = hasher.hash('senha')
+
+    pid = os.fork()
+    if pid == 0:
+        # Como um worker do gunicorn criado depois que o mestre usou o pool
+        status = 1
+        try:
+            status = 0 if hasher.verify('senha', password_hash, salt, iterations) else 1
+        finally:
+            hasher.shutdown()
+            os._exit(status)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert hasher.verify('senha', password_hash, salt, iterations)
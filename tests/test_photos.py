@@ -0,0 +1,69 @@
+import pytest
+
+
+@pytest.fixture
+def owned_photo(data_manager, add_photo, jpeg):
+    """Foto de um evento do fotógrafo 1; retorna (PhotoId, hash)"""
+    event_id = data_manager.create_event('Corrida', '2024-05-01', owner_id=1)
+    return add_photo(event_id, jpeg('red'))
+
+
+@pytest.mark.parametrize('user_id, user_type, status', [
+    (1, 'photographer', 200),
+    (2, 'photographer', 403),
+    (1, 'customer', 403),
+])
+def test_original_only_for_event_owner(app, log_in, owned_photo, user_id, user_type, status):
+    photo_id, _ = owned_photo
+    client = app.test_client()
+    log_in(client, user_id, user_type)
+
+    assert client.get(f'/photos/{photo_id}/original').status_code == status
+
+
+def test_original_requires_login(app, owned_photo):
+    photo_id, _ = owned_photo
+
+    response = app.test_client().get(f'/photos/{photo_id}/original')
+
+    assert response.status_code == 302
+
+
+@pytest.mark.parametrize('user_id, user_type, status', [
+    (1, 'photographer', 200),
+    (2, 'photographer', 403),
+    (1, 'customer', 403),
+    (None, None, 403),
+])
+def test_preview_only_for_event_owner(app, log_in, owned_photo, user_id, user_type, status):
+    _, content_hash = owned_photo
+    client = app.test_client()
+    if user_id is not None:
+        log_in(client, user_id, user_type)
+
+    assert client.get(f'/photos/preview/{content_hash}.jpg').status_code == status
+
+
+def test_preview_allowed_when_photo_is_also_in_own_event(app, data_manager, log_in, add_photo, jpeg, owned_photo):
+    _, content_hash = owned_photo
+    add_photo(data_manager.create_event('Outra', '2024-05-02', owner_id=2), jpeg('red'))
+    client = app.test_client()
+    log_in(client, 2)
+
+    assert client.get(f'/photos/preview/{content_hash}.jpg').status_code == 200
+
+
+def test_public_renditions_need_no_login(app, owned_photo):
+    _, content_hash = owned_photo
+    client = app.test_client()
+
+    for kind in ('grid', 'watermarked'):
+        assert client.get(f'/photos/{kind}/{content_hash}.jpg').status_code == 200
+
+
+def test_gallery_json_has_no_original_url(app, data_manager, owned_photo):
+    event_id = data_manager.get_photo_by_id(owned_photo[0])['EventId']
+
+    photos = app.test_client().get(f'/search/event/{event_id}/photos').get_json()['photos']
+
+    assert photos and all('original_url' not in photo for photo in photos)
@@ -0,0 +1,61 @@
+from flask import Flask, session
+
+from session_store import SQLiteSessionInterface
+
+
+def make_app(tmp_path):
+    app = Flask(__name__)
+    app.secret_key = 'teste'
+    app.session_interface = SQLiteSessionInterface(str(tmp_path / 'sessions.db'))
+
+    @app.route('/visit')
+    def visit():
+        session['visits'] = session.get('visits', 0) + 1
+        return str(session['visits'])
+
+    @app.route('/login/<int:user_id>')
+    def login(user_id):
+        session['user_id'] = user_id
+        return 'ok'
+
+    @app.route('/whoami')
+    def whoami():
+        return str(session.get('user_id'))
+
+    return app
+
+
+def stored_ids(app):
+    return {row[0] for row in app.session_interface._connection().execute("SELECT SessionId FROM Sessions")}
+
+
+def test_login_issues_new_session_id(tmp_path):
+    app = make_app(tmp_path)
+    client = app.test_client()
+    client.get('/visit')
+    planted = client.get_cookie('session').value
+
+    client.get('/login/7')
+
+    sid = client.get_cookie('session').value
+    assert sid != planted
+    assert stored_ids(app) == {sid}
+
+    # Quem guardou o ID anterior ao login não entra na conta
+    attacker = app.test_client()
+    attacker.set_cookie('session', planted)
+    assert attacker.get('/whoami').text == 'None'
+    assert client.get('/whoami').text == '7'
+
+
+def test_session_id_kept_while_user_is_unchanged(tmp_path):
+    app = make_app(tmp_path)
+    client = app.test_client()
+    client.get('/login/7')
+    sid = client.get_cookie('session').value
+
+    client.get('/visit')
+    client.get('/login/7')
+
+    assert client.get_cookie('session').value == sid
+    assert client.get('/visit').text == '2'
@@ -0,0 +1,101 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from upload_stream import UploadRejected, receive_multipart
+
+BOUNDARY = b'----photocap'
+
+
+def body(fields=(), files=()):
+    parts = []
+    for name, value in fields:
+        parts.append(b'--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n%s\r\n'
+                     % (BOUNDARY, name.encode(), value.encode()))
+    for name, filename, data in files:
+        parts.append(b'--%s\r\nContent-Disposition: form-data; name="%s"; filename="%s"\r\n'
+                     b'Content-Type: image/jpeg\r\n\r\n%s\r\n' % (BOUNDARY, name.encode(), filename.encode(), data))
+    return b''.join(parts) + b'--%s--\r\n' % BOUNDARY
+
+
+@pytest.fixture
+def store(tmp_path):
+    """PhotoStore simplificado: move o arquivo para <store>/<hash>"""
+    root = tmp_path / 'store'
+    root.mkdir()
+
+    def put(path, content_hash):
+        final = str(root / content_hash)
+        os.replace(path, final)
+        return final
+    put.root = root
+    return put
+
+
+def receive(data, tmp_path, store, **kwargs):
+    return receive_multipart(io.BytesIO(data), BOUNDARY, str(tmp_path), store, chunk_size=1024, **kwargs)
+
+
+def test_files_are_hashed_and_stored(tmp_path, store):
+    photos = [os.urandom(5000), os.urandom(300)]
+
+    upload = receive(body([('event_id', '7')], [('photos', 'a.jpg', photos[0]), ('photos', 'b.jpg', photos[1])]),
+                     tmp_path, store, max_file_size=10000)
+
+    assert upload.fields['event_id'] == '7'
+    assert [file.filename for file in upload.saved] == ['a.jpg', 'b.jpg']
+    for file, data in zip(upload.saved, photos):
+        assert file.content_hash == hashlib.sha256(data).hexdigest()
+        assert file.size == len(data)
+        assert open(file.path, 'rb').read() == data
+
+
+def test_file_over_limit_is_rejected_and_the_rest_kept(tmp_path, store):
+    small = os.urandom(1000)
+
+    upload = receive(body(files=[('photos', 'grande.jpg', os.urandom(20000)), ('photos', 'ok.jpg', small)]),
+                     tmp_path, store, max_file_size=10000)
+
+    assert [file.filename for file in upload.rejected] == ['grande.jpg']
+    assert 'limite' in upload.rejected[0].error
+    assert [file.filename for file in upload.saved] == ['ok.jpg']
+    assert sorted(os.listdir(store.root)) == [hashlib.sha256(small).hexdigest()]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
+
+
+def test_truncated_body_discards_the_incomplete_file(tmp_path, store):
+    complete = os.urandom(1000)
+    data = body(files=[('photos', 'a.jpg', complete), ('photos', 'b.jpg', os.urandom(8000))])
+
+    with pytest.raises(ValueError):
+        receive(data[:-3000], tmp_path, store, max_file_size=100000)
+
+    # O arquivo completo já está no store (sem foto, sai na limpeza); o parcial não
+    assert os.listdir(store.root) == [hashlib.sha256(complete).hexdigest()]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
+
+
+def test_disallowed_type_is_not_written(tmp_path, store):
+    upload = receive(body(files=[('photos', 'script.exe', b'MZ' * 100)]), tmp_path, store,
+                     max_file_size=10000, accept=lambda name: name.endswith('.jpg'))
+
+    assert upload.rejected[0].error == 'tipo de arquivo não permitido'
+    assert os.listdir(store.root) == []
+
+
+def test_check_fields_rejects_before_anything_is_stored(tmp_path, store):
+    seen = []
+
+    def check(fields):
+        seen.append(fields.to_dict())
+        raise UploadRejected('Selecione um evento')
+
+    with pytest.raises(UploadRejected):
+        receive(body([('event_id', '99')], [('photos', 'a.jpg', os.urandom(1000))]), tmp_path, store,
+                max_file_size=10000, check_fields=check)
+
+    assert seen == [{'event_id': '99'}]
+    assert os.listdir(store.root) == []
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
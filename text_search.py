@@ -0,0 +1,37 @@
+import re
+import unicodedata
+from typing import List, Optional
+
+# Palavras comuns em nomes de eventos que não ajudam a encontrar nenhum
+STOPWORDS = {'a', 'as', 'o', 'os', 'e', 'de', 'da', 'das', 'do', 'dos', 'em', 'na', 'nas', 'no', 'nos'}
+
+# Tamanho máximo de um termo no índice (coluna EventTokens.Token)
+MAX_TOKEN_LENGTH = 64
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos e só letras e números: "São Paulo!" -> "sao paulo" """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(' ', without_accents.lower()).strip()
+
+
+def tokenize(text: str, min_length: int = 1) -> List[str]:
+    """Termos distintos do texto normalizado, na ordem em que aparecem"""
+    tokens = []
+    for token in normalize(text).split():
+        token = token[:MAX_TOKEN_LENGTH]
+        if token not in STOPWORDS and len(token) >= min_length and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def event_tokens(name: str, date: Optional[str] = None) -> List[str]:
+    """Termos indexados de um evento: as palavras do nome e o ano"""
+    tokens = tokenize(name)
+    year = str(date)[:4] if date else ''
+    if year.isdigit() and year not in tokens:
+        tokens.append(year)
+    return tokens
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import uuid
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from werkzeug.utils import secure_filename
+
+
+class UploadRejected(ValueError):
+    """Upload recusado pelos campos enviados antes dos arquivos (ex.: evento inválido)"""
+
+
+class StreamedFile:
+    """Arquivo recebido de um upload multipart em streaming"""
+
+    __slots__ = ('field_name', 'filename', 'path', 'content_hash', 'size', 'error')
+
+    def __init__(self, field_name: str, filename: str):
+        self.field_name = field_name
+        self.filename = filename
+        self.path = None
+        self.content_hash = None
+        self.size = 0
+        self.error = None
+
+
+class StreamedUpload:
+    """Resultado de ``receive_multipart``: campos de texto e arquivos"""
+
+    def __init__(self):
+        self.fields = MultiDict()
+        self.files: List[StreamedFile] = []
+
+    @property
+    def saved(self) -> List[StreamedFile]:
+        return [file for file in self.files if file.error is None]
+
+    @property
+    def rejected(self) -> List[StreamedFile]:
+        return [file for file in self.files if file.error is not None]
+
+
+def receive_multipart(stream: BinaryIO, boundary: bytes, tmp_dir: str,
+                      store: Callable[[str, str], str], max_file_size: int,
+                      accept: Optional[Callable[[str], bool]] = None,
+                      chunk_size: int = 64 * 1024, max_field_size: int = 64 * 1024,
+                      max_parts: Optional[int] = 1000,
+                      check_fields: Optional[Callable[[MultiDict], None]] = None) -> StreamedUpload:
+    """Lê um corpo multipart/form-data direto do stream WSGI
+
+    Cada arquivo é gravado em ``tmp_dir`` à medida que chega, com o SHA-256
+    calculado no caminho, e ao final da parte é entregue a
+    ``store(caminho temporário, hash)``, que o move para o local definitivo
+    e devolve o novo caminho (ex.: ``PhotoStore.put``). Nada é acumulado em memória além de um bloco de
+    ``chunk_size`` e dos campos de texto, então o consumo é constante
+    independentemente do tamanho do lote.
+
+    Arquivos acima de ``max_file_size`` ou recusados por ``accept`` são
+    descartados e marcados com ``error``; o restante do lote segue normalmente.
+
+    ``check_fields`` recebe os campos de texto enviados antes do primeiro
+    arquivo, antes de qualquer gravação, e pode recusar o upload inteiro
+    levantando UploadRejected (os formulários mandam os campos antes dos arquivos).
+    """
+    upload = StreamedUpload()
+    # O decoder devolve os dados até a última quebra de linha do buffer; em
+    # fotos reais isso é no máximo um bloco, mas um arquivo sem nenhum \r/\n
+    # ficaria inteiro no buffer, então o teto é o limite por arquivo
+    decoder = MultipartDecoder(boundary, max_form_memory_size=max_file_size + chunk_size, max_parts=max_parts)
+
+    part: Any = None
+    field_data: List[bytes] = []
+    field_size = 0
+    handle = None
+    digest = None
+    fields_checked = check_fields is None
+
+    def discard(error: str):
+        nonlocal handle
+        if handle is not None:
+            handle.close()
+            os.remove(part.path)
+            handle = None
+        part.path = None
+        part.error = error
+
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File):
+                    if not fields_checked:
+                        fields_checked = True
+                        check_fields(upload.fields)
+                    part = StreamedFile(event.name, secure_filename(event.filename or ''))
+                    if not part.filename:
+                        # Campo de arquivo enviado vazio
+                        part = None
+                    elif accept is not None and not accept(part.filename):
+                        part.error = 'tipo de arquivo não permitido'
+                        upload.files.append(part)
+                    else:
+                        part.path = os.path.join(tmp_dir, f'.{uuid.uuid4().hex}.part')
+                        handle = open(part.path, 'wb')
+                        digest = hashlib.sha256()
+                        upload.files.append(part)
+
+                elif isinstance(event, Field):
+                    part = event
+                    field_data, field_size = [], 0
+
+                elif isinstance(event, Data) and part is not None:
+                    if isinstance(part, Field):
+                        field_size += len(event.data)
+                        if field_size > max_field_size:
+                            raise ValueError(f'Campo {part.name} excede o tamanho máximo')
+                        field_data.append(event.data)
+                        if not event.more_data:
+                            upload.fields.add(part.name, b''.join(field_data).decode('utf-8', 'replace'))
+                    elif handle is not None:
+                        part.size += len(event.data)
+                        if part.size > max_file_size:
+                            discard(f'excede o limite de {max_file_size // (1024 * 1024)}MB por foto')
+                        else:
+                            handle.write(event.data)
+                            digest.update(event.data)
+                            if not event.more_data:
+                                handle.close()
+                                handle = None
+                                part.content_hash = digest.hexdigest()
+                                part.path = store(part.path, part.content_hash)
+
+                event = decoder.next_event()
+            if not chunk:
+                break
+    finally:
+        if handle is not None:
+            # Corpo truncado: descarta o arquivo incompleto
+            discard('upload interrompido')
+
+    return upload
@@ -0,0 +1,93 @@
+import logging
+import mmap
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _touch(array) -> int:
+    """Lê um elemento por página de um array mapeado, trazendo o arquivo para a memória"""
+    flat = np.asarray(array).reshape(-1)
+    if flat.size:
+        flat[::max(1, mmap.PAGESIZE // flat.itemsize)].sum()
+    return flat.nbytes
+
+
+def warm_up(app, events: int = 20) -> Dict[str, Any]:
+    """Prepara o processo antes de atender: templates, cache de catálogo e índices faciais
+
+    - compila todos os templates (o Jinja compila cada um no primeiro uso);
+    - lê pelo ``DatabaseManager`` o que a página inicial e as galerias dos
+      ``events`` eventos mais recentes consultam, deixando-os no cache;
+    - mapeia os índices faciais desses eventos e o índice global, com as
+      páginas já lidas do disco, e roda o pipeline facial uma vez.
+
+    No gunicorn com preload (gunicorn.conf.py) roda uma vez no mestre,
+    antes do fork: os workers nascem com tudo isso, compartilhado por
+    copy-on-write, e a primeira requisição depois de um deploy não paga a
+    preparação. Falhas de banco ou dos índices só deixam a etapa fria; erros
+    de template interrompem a subida. O resumo fica em ``/readyz``.
+    """
+    started = time.perf_counter()
+    manager = app.extensions['data_manager']
+    summary = {'templates': 0, 'events': 0, 'photos': 0, 'faces': 0, 'mapped_mb': 0.0, 'seconds': {}}
+
+    def finish(step: str, step_started: float):
+        summary['seconds'][step] = round(time.perf_counter() - step_started, 3)
+
+    # Templates
+    step_started = time.perf_counter()
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+        summary['templates'] += 1
+    finish('templates', step_started)
+
+    # Catálogo: as mesmas chamadas (e chaves de cache) das rotas
+    step_started = time.perf_counter()
+    manager.get_recent_events(app.config['RECENT_EVENTS'])
+    manager.get_all_events()
+    hot_events = manager.get_recent_events(events) if events > 0 else []
+    for event in hot_events:
+        manager.get_event_by_id(event.EventId)
+        photos, _ = manager.get_photos_page(event.EventId, app.config['PHOTOS_PER_PAGE'])
+        manager.count_photos(event.EventId)
+        summary['photos'] += len(photos)
+    summary['events'] = len(hot_events)
+    finish('catalog', step_started)
+
+    # Índices faciais e pipeline de reconhecimento
+    step_started = time.perf_counter()
+    mapped = 0
+    try:
+        face_index = app.extensions['face_index']
+        for event in hot_events:
+            embeddings, photo_ids = face_index.load(event.EventId)
+            mapped += _touch(embeddings) + _touch(photo_ids)
+            summary['faces'] += len(photo_ids)
+        index = app.extensions['face_ann'].preload()
+        mapped += _touch(index['vectors16']) + _touch(index['event_ids'])
+
+        engine = app.extensions['face_engine']
+        if engine.available:
+            image = np.zeros((160, 160, 3), dtype=np.uint8)
+            engine.detect(image)
+            engine.embed(image, [(0, 0, 112, 112)])
+    except Exception:
+        logger.exception("Preparação dos índices faciais falhou; as buscas os carregam sob demanda")
+    summary['mapped_mb'] = round(mapped / (1024 * 1024), 1)
+    finish('faces', step_started)
+
+    # As consultas acima não são tráfego
+    metrics = app.extensions.get('metrics')
+    if metrics is not None:
+        metrics.reset()
+
+    summary['seconds']['total'] = round(time.perf_counter() - started, 3)
+    app.extensions['warmup'] = summary
+    logger.info("Preparação concluída em %.2fs: %d templates, %d eventos, %d fotos, %d faces (%.1f MB mapeados)",
+                summary['seconds']['total'], summary['templates'], summary['events'], summary['photos'],
+                summary['faces'], summary['mapped_mb'])
+    return summary
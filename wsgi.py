@@ -0,0 +1,15 @@
+"""Ponto de entrada WSGI do PhotoCap (produção)
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Cria a aplicação e a prepara (warmup.py) antes de atender. Com o preload
+do gunicorn.conf.py isso acontece uma vez, no mestre, antes do fork dos workers.
+"""
+from app import create_app
+from config import SERVER_CONFIG
+from warmup import warm_up
+
+application = create_app()
+
+if SERVER_CONFIG['warmup']:
+    warm_up(application, SERVER_CONFIG['warmup_events'])